@@ -0,0 +1,42 @@
+"""Add filemeta.generation
+
+Revision ID: 3f2a9c41d7e5
+Revises: 847d840fcbfa
+Create Date: 2026-10-18 17:20:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f2a9c41d7e5'
+down_revision: Union[str, Sequence[str], None] = '847d840fcbfa'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _has_generation() -> bool:
+    columns = sa.inspect(op.get_bind()).get_columns('filemeta')
+    return any(c['name'] == 'generation' for c in columns)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # create_all (src/db.py) adds new tables such as filetombstone on startup
+    # but never alters existing ones; databases created after this change
+    # already have the column.
+    if not _has_generation():
+        op.add_column(
+            'filemeta',
+            sa.Column('generation', sa.Integer(), nullable=False, server_default='0'),
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if _has_generation():
+        with op.batch_alter_table('filemeta') as batch_op:
+            batch_op.drop_column('generation')
@@ -0,0 +1,43 @@
+"""Add indexstate.base_generation
+
+Revision ID: 8c5d0e7b2a16
+Revises: 3f2a9c41d7e5
+Create Date: 2026-10-18 19:05:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8c5d0e7b2a16'
+down_revision: Union[str, Sequence[str], None] = '3f2a9c41d7e5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _has_base_generation() -> bool:
+    inspector = sa.inspect(op.get_bind())
+    if not inspector.has_table('indexstate'):
+        return True  # created with the column by create_all (src/db.py)
+    return any(c['name'] == 'base_generation' for c in inspector.get_columns('indexstate'))
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # 0 makes the next watcher batch of every project do one full merge
+    if not _has_base_generation():
+        op.add_column(
+            'indexstate',
+            sa.Column('base_generation', sa.Integer(), nullable=False, server_default='0'),
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    inspector = sa.inspect(op.get_bind())
+    if inspector.has_table('indexstate') and _has_base_generation():
+        with op.batch_alter_table('indexstate') as batch_op:
+            batch_op.drop_column('base_generation')
@@ -0,0 +1,52 @@
+"""Time DiffService on a large, heavily edited file.
+
+Usage::
+
+    python -m benchmarks.bench_diff [lines] [edit_ratio]
+
+Compares the ``difflib`` fallback with ``diff_rs`` (Myers and patience) when
+the native module is installed.
+"""
+import random
+import sys
+import time
+
+from src.services.diff_service import diff_rs, difflib_hunks
+
+
+def _sample(lines: int, edit_ratio: float):
+    rng = random.Random(0)
+    before = [f"line {i} {rng.random():.6f}" for i in range(lines)]
+    after = list(before)
+    for _ in range(int(lines * edit_ratio)):
+        i = rng.randrange(len(after))
+        op = rng.random()
+        if op < 0.4:
+            after[i] = f"edited {rng.random():.6f}"
+        elif op < 0.7:
+            del after[i]
+        else:
+            after.insert(i, f"inserted {rng.random():.6f}")
+    return before, after
+
+
+def _time(label: str, fn) -> None:
+    start = time.perf_counter()
+    hunks = fn()
+    elapsed = time.perf_counter() - start
+    print(f"{label:10s} {elapsed * 1000:9.1f} ms  {len(hunks)} hunks")
+
+
+def main(lines: int = 20_000, edit_ratio: float = 0.3) -> None:
+    before, after = _sample(lines, edit_ratio)
+    print(f"lines={lines} edit_ratio={edit_ratio}")
+    _time("difflib", lambda: difflib_hunks(before, after))
+    if diff_rs is None:
+        print("diff_rs not installed (run build_native.sh)")
+        return
+    for algorithm in ("myers", "patience"):
+        _time(algorithm, lambda: diff_rs.compute_hunks(before, after, 3, algorithm))
+
+
+if __name__ == "__main__":
+    main(*(cast(a) for cast, a in zip((int, float), sys.argv[1:3])))
@@ -0,0 +1,52 @@
+"""Peak Python memory of a large diff response, lines vs compact ops.
+
+Usage::
+
+    python -m benchmarks.bench_diff_memory [lines] [edit_ratio]
+
+Diffs a heavily rewritten generated file with ``DiffService`` and encodes
+the response the way the diff route does. Reports the memory held by the
+resulting hunks and the peaks while diffing and encoding, measured with
+``tracemalloc`` (so native buffers of ``diff_rs`` are not included).
+"""
+import asyncio
+import json
+import sys
+import time
+import tracemalloc
+
+from benchmarks.bench_diff import _sample
+from src.services import diff_service
+from src.services.diff_service import DiffService
+
+
+def _measure(before: str, after: str, compact: bool) -> None:
+    diff_service._diff_cache.clear()
+    tracemalloc.start()
+    start = time.perf_counter()
+    hunks = asyncio.run(DiffService().compute_diff(before, after, compact=compact))
+    elapsed = time.perf_counter() - start
+    retained, diff_peak = tracemalloc.get_traced_memory()
+    tracemalloc.reset_peak()
+    body = json.dumps({"hunks": hunks}).encode()
+    _, encode_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    mib = 1 << 20
+    print(
+        f"{'ops' if compact else 'lines':6s}"
+        f" hunks {retained / mib:7.1f} MiB  diff peak {diff_peak / mib:7.1f} MiB"
+        f"  encode peak {encode_peak / mib:7.1f} MiB  body {len(body) / mib:6.2f} MiB"
+        f"  {elapsed * 1000:8.1f} ms"
+    )
+
+
+def main(lines: int = 50_000, edit_ratio: float = 1.0) -> None:
+    a, b = _sample(lines, edit_ratio)
+    before, after = "\n".join(a) + "\n", "\n".join(b) + "\n"
+    print(f"lines={lines} edit_ratio={edit_ratio} native={diff_service.diff_rs is not None}")
+    for compact in (False, True):
+        _measure(before, after, compact)
+
+
+if __name__ == "__main__":
+    main(*(cast(a) for cast, a in zip((int, float), sys.argv[1:3])))
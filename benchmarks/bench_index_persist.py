@@ -0,0 +1,96 @@
+"""Compare per-file commits against FileMetaStore batching.
+
+Usage::
+
+    python -m benchmarks.bench_index_persist [rows] [batch_size]
+
+Runs against a throwaway SQLite database unless ``BENCH_DATABASE_URL`` points
+at an async Postgres URL. Reports commit count and wall time for a full
+index pass followed by a pass where 10% of the rows go stale.
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+from sqlalchemy import delete, event
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlmodel import SQLModel
+
+from src.models import FileMeta
+from src.services.file_meta_store import FileMetaStore
+
+
+def _rows(n: int):
+    now = datetime.utcnow()
+    for i in range(n):
+        yield dict(
+            path=f"src/module_{i}.py",
+            size=i,
+            mtime=float(i),
+            hash=f"{i:064x}",
+            lang="py",
+            symbols_count=0,
+            last_indexed_at=now,
+        )
+
+
+async def _per_file(session: AsyncSession, project_id: int, rows, stale) -> None:
+    for row in rows:
+        session.add(FileMeta(project_id=project_id, **row))
+        await session.commit()
+    for path in stale:
+        await session.execute(
+            delete(FileMeta).where(FileMeta.project_id == project_id, FileMeta.path == path)
+        )
+    if stale:
+        await session.commit()
+
+
+async def _batched(session: AsyncSession, project_id: int, rows, stale, batch_size: int) -> None:
+    store = FileMetaStore(session, project_id, batch_size=batch_size)
+    for row in rows:
+        await store.upsert(**row)
+    await store.delete_paths(stale)
+    await store.flush()
+
+
+async def main(n: int, batch_size: int) -> None:
+    url = os.environ.get("BENCH_DATABASE_URL")
+    tmpdir = None
+    if not url:
+        tmpdir = tempfile.TemporaryDirectory()
+        url = f"sqlite+aiosqlite:///{tmpdir.name}/bench.db"
+    engine = create_async_engine(url)
+    commits = {"n": 0}
+    event.listen(engine.sync_engine, "commit", lambda conn: commits.__setitem__("n", commits["n"] + 1))
+    async with engine.begin() as conn:
+        await conn.run_sync(SQLModel.metadata.create_all)
+    Session = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+    rows = list(_rows(n))
+    stale = [r["path"] for r in rows[: n // 10]]
+    print(f"rows={n} stale={len(stale)} batch_size={batch_size} db={engine.dialect.name}")
+    for project_id, (label, fn) in enumerate(
+        [("per-file", _per_file), ("batched", _batched)], start=1
+    ):
+        args = (batch_size,) if fn is _batched else ()
+        commits["n"] = 0
+        async with Session() as session:
+            start = time.perf_counter()
+            await fn(session, project_id, rows, stale, *args)
+            elapsed = time.perf_counter() - start
+        print(f"{label:>9}: commits={commits['n']:>6} wall={elapsed:8.3f}s")
+
+    await engine.dispose()
+    if tmpdir:
+        tmpdir.cleanup()
+
+
+if __name__ == "__main__":
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    batch = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+    asyncio.run(main(rows, batch))
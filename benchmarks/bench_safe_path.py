@@ -0,0 +1,55 @@
+"""Per-call cost of FSService._safe_path against a plain ``resolve()`` check.
+
+Usage::
+
+    python -m benchmarks.bench_safe_path [depth] [calls]
+
+Builds a throwaway tree ``depth`` directories deep and resolves the same set
+of file paths repeatedly, as a tree walk or repeated route calls would.
+"""
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from src.services.fs_service import FSService
+
+
+def _baseline(root: Path, path: str) -> Path:
+    from fastapi import HTTPException
+
+    p = (root / path).resolve()
+    try:
+        p.relative_to(root)
+    except ValueError as exc:
+        raise HTTPException(status_code=403) from exc
+    return p
+
+
+def _time(fn, paths, calls: int) -> float:
+    start = time.perf_counter()
+    for i in range(calls):
+        fn(paths[i % len(paths)])
+    return (time.perf_counter() - start) / calls * 1e6
+
+
+def main(depth: int = 8, calls: int = 50_000) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp).resolve()
+        rel_dir = os.path.join(*(f"d{i}" for i in range(depth)))
+        (root / rel_dir).mkdir(parents=True)
+        paths = [os.path.join(rel_dir, f"f{i}.py") for i in range(100)]
+        for p in paths:
+            (root / p).write_text("")
+
+        service = FSService(root=root)
+        base = _time(lambda p: _baseline(root, p), paths, calls)
+        fast = _time(service._safe_path, paths, calls)
+        print(f"depth={depth} calls={calls}")
+        print(f"resolve():  {base:7.2f} us/call")
+        print(f"_safe_path: {fast:7.2f} us/call ({base / fast:.1f}x)")
+
+
+if __name__ == "__main__":
+    main(*(int(a) for a in sys.argv[1:3]))
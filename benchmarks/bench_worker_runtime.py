@@ -0,0 +1,60 @@
+"""Task throughput with a loop per task vs the persistent worker runtime.
+
+Usage::
+
+    python -m benchmarks.bench_worker_runtime [tasks]
+
+Each "task" runs one small query, as most Celery tasks here touch the DB.
+The per-task variant mirrors ``asyncio.run`` in a task body: a new loop
+and, since pooled connections cannot cross loops, a new engine every time.
+The runtime variant uses ``worker_runtime.run`` with one pooled engine.
+Runs against a throwaway SQLite database unless ``BENCH_DATABASE_URL``
+points at an async Postgres URL.
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from src.services import worker_runtime
+
+
+async def _task(engine) -> int:
+    async with engine.connect() as conn:
+        return (await conn.execute(text("SELECT 1"))).scalar()
+
+
+def main(tasks: int = 2000) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        url = os.environ.get("BENCH_DATABASE_URL") or f"sqlite+aiosqlite:///{tmp}/bench.db"
+
+        async def per_task() -> int:
+            engine = create_async_engine(url)
+            try:
+                return await _task(engine)
+            finally:
+                await engine.dispose()
+
+        start = time.perf_counter()
+        for _ in range(tasks):
+            asyncio.run(per_task())
+        before = tasks / (time.perf_counter() - start)
+
+        shared = create_async_engine(url)
+        start = time.perf_counter()
+        for _ in range(tasks):
+            worker_runtime.run(_task(shared))
+        after = tasks / (time.perf_counter() - start)
+        worker_runtime.run(shared.dispose())
+
+    print(f"tasks={tasks}")
+    print(f"asyncio.run per task:  {before:8.0f} tasks/s")
+    print(f"worker_runtime.run:    {after:8.0f} tasks/s ({after / before:.1f}x)")
+
+
+if __name__ == "__main__":
+    main(*(int(a) for a in sys.argv[1:2]))
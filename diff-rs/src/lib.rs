@@ -1,17 +1,137 @@
+use pyo3::exceptions::PyValueError;
 use pyo3::prelude::*;
-use diff::lines;
+use similar::{capture_diff_slices, group_diff_ops, Algorithm, DiffOp, DiffTag};
 
-#[pyfunction]
-fn compute_diff(a: &str, b: &str) -> PyResult<Vec<String>> {
-    let mut result = Vec::new();
-    for diff in lines(a, b) {
-        result.push(format!("{:?}", diff));
+/// (old_start, old_lines, new_start, new_lines, lines) with unified-diff prefixes.
+type Hunk = (usize, usize, usize, usize, Vec<String>);
+/// Same header with run-length ops (' ', '-', '+', count) instead of lines.
+type OpHunk = (usize, usize, usize, usize, Vec<(char, usize)>);
+
+fn parse_algorithm(name: &str) -> PyResult<Algorithm> {
+    match name {
+        "myers" => Ok(Algorithm::Myers),
+        "patience" => Ok(Algorithm::Patience),
+        _ => Err(PyValueError::new_err(format!("unknown diff algorithm: {name}"))),
+    }
+}
+
+/// 1-based start as printed in `@@` headers; empty ranges point at the line before.
+fn range_start(start: usize, len: usize) -> usize {
+    if len == 0 {
+        start
+    } else {
+        start + 1
     }
-    Ok(result)
+}
+
+fn prefixed(out: &mut Vec<String>, prefix: char, lines: &[&str]) {
+    out.extend(lines.iter().map(|l| {
+        let mut s = String::with_capacity(l.len() + 1);
+        s.push(prefix);
+        s.push_str(l);
+        s
+    }));
+}
+
+/// Header of a group of ops: (old_start, old_lines, new_start, new_lines).
+fn header(group: &[DiffOp]) -> (usize, usize, usize, usize) {
+    let (_, first_old, first_new) = group[0].as_tag_tuple();
+    let (_, last_old, last_new) = group[group.len() - 1].as_tag_tuple();
+    let old_len = last_old.end - first_old.start;
+    let new_len = last_new.end - first_new.start;
+    (
+        range_start(first_old.start, old_len),
+        old_len,
+        range_start(first_new.start, new_len),
+        new_len,
+    )
+}
+
+fn groups(old: &[&str], new: &[&str], context: usize, algorithm: Algorithm) -> Vec<Vec<DiffOp>> {
+    group_diff_ops(capture_diff_slices(algorithm, old, new), context)
+}
+
+fn hunks(old: &[&str], new: &[&str], context: usize, algorithm: Algorithm) -> Vec<Hunk> {
+    groups(old, new, context, algorithm)
+        .into_iter()
+        .map(|group| {
+            let (old_start, old_len, new_start, new_len) = header(&group);
+            let mut lines = Vec::with_capacity(old_len.max(new_len));
+            for op in &group {
+                let (tag, o, n) = op.as_tag_tuple();
+                match tag {
+                    DiffTag::Equal => prefixed(&mut lines, ' ', &old[o]),
+                    DiffTag::Delete => prefixed(&mut lines, '-', &old[o]),
+                    DiffTag::Insert => prefixed(&mut lines, '+', &new[n]),
+                    DiffTag::Replace => {
+                        prefixed(&mut lines, '-', &old[o]);
+                        prefixed(&mut lines, '+', &new[n]);
+                    }
+                }
+            }
+            (old_start, old_len, new_start, new_len, lines)
+        })
+        .collect()
+}
+
+fn op_hunks(old: &[&str], new: &[&str], context: usize, algorithm: Algorithm) -> Vec<OpHunk> {
+    groups(old, new, context, algorithm)
+        .into_iter()
+        .map(|group| {
+            let (old_start, old_len, new_start, new_len) = header(&group);
+            let mut ops = Vec::with_capacity(group.len() + 1);
+            for op in &group {
+                let (tag, o, n) = op.as_tag_tuple();
+                match tag {
+                    DiffTag::Equal => ops.push((' ', o.len())),
+                    DiffTag::Delete => ops.push(('-', o.len())),
+                    DiffTag::Insert => ops.push(('+', n.len())),
+                    DiffTag::Replace => {
+                        ops.push(('-', o.len()));
+                        ops.push(('+', n.len()));
+                    }
+                }
+            }
+            (old_start, old_len, new_start, new_len, ops)
+        })
+        .collect()
+}
+
+/// Line diff of two line lists grouped into unified-diff hunks.
+///
+/// Uses linear-space Myers (or patience) from `similar`; the GIL is released
+/// while diffing.
+#[pyfunction]
+#[pyo3(signature = (old, new, context=3, algorithm="myers"))]
+fn compute_hunks(
+    py: Python<'_>,
+    old: Vec<&str>,
+    new: Vec<&str>,
+    context: usize,
+    algorithm: &str,
+) -> PyResult<Vec<Hunk>> {
+    let algorithm = parse_algorithm(algorithm)?;
+    Ok(py.allow_threads(|| hunks(&old, &new, context, algorithm)))
+}
+
+/// Like `compute_hunks`, but each hunk lists run-length ops referring to
+/// the input lines instead of copying them.
+#[pyfunction]
+#[pyo3(signature = (old, new, context=3, algorithm="myers"))]
+fn compute_ops(
+    py: Python<'_>,
+    old: Vec<&str>,
+    new: Vec<&str>,
+    context: usize,
+    algorithm: &str,
+) -> PyResult<Vec<OpHunk>> {
+    let algorithm = parse_algorithm(algorithm)?;
+    Ok(py.allow_threads(|| op_hunks(&old, &new, context, algorithm)))
 }
 
 #[pymodule]
 fn diff_rs(_py: Python, m: &PyModule) -> PyResult<()> {
-    m.add_function(wrap_pyfunction!(compute_diff, m)?)?;
+    m.add_function(wrap_pyfunction!(compute_hunks, m)?)?;
+    m.add_function(wrap_pyfunction!(compute_ops, m)?)?;
     Ok(())
 }
@@ -1,20 +1,124 @@
+use pyo3::exceptions::PyBufferError;
+use pyo3::ffi;
 use pyo3::prelude::*;
-use std::fs;
+use pyo3::types::PyBytes;
+use memmap2::Mmap;
+use sha2::{Digest, Sha256};
+use std::fs::{self, File, OpenOptions};
+use std::io::{self, Read, Write};
+use std::os::raw::{c_int, c_void};
+use std::path::{Path, PathBuf};
+use std::sync::atomic::{AtomicUsize, Ordering};
 
+const DEFAULT_MMAP_THRESHOLD: usize = 1 << 20;
+const WRITE_CHUNK: usize = 1 << 20;
+
+static TMP_SEQ: AtomicUsize = AtomicUsize::new(0);
+
+/// Read-only memory map of a file exposed through the buffer protocol, so
+/// ``memoryview(mapped)`` reads the page cache without copying.
+#[pyclass(frozen, module = "fsops_rs")]
+struct MappedFile {
+    map: Mmap,
+}
+
+#[pymethods]
+impl MappedFile {
+    unsafe fn __getbuffer__(slf: Bound<'_, Self>, view: *mut ffi::Py_buffer, flags: c_int) -> PyResult<()> {
+        if view.is_null() {
+            return Err(PyBufferError::new_err("View is null"));
+        }
+        if (flags & ffi::PyBUF_WRITABLE) == ffi::PyBUF_WRITABLE {
+            return Err(PyBufferError::new_err("MappedFile is read-only"));
+        }
+        let data = &slf.get().map[..];
+        // fills the view and takes a reference to ``slf``, keeping the map alive
+        let ret = ffi::PyBuffer_FillInfo(
+            view,
+            slf.as_ptr(),
+            data.as_ptr() as *mut c_void,
+            data.len() as ffi::Py_ssize_t,
+            1,
+            flags,
+        );
+        if ret == -1 {
+            return Err(PyErr::fetch(slf.py()));
+        }
+        Ok(())
+    }
+
+    unsafe fn __releasebuffer__(&self, _view: *mut ffi::Py_buffer) {}
+
+    fn __len__(&self) -> usize {
+        self.map.len()
+    }
+}
+
+/// Read a file as a buffer: ``bytes`` filled in place below ``mmap_threshold``
+/// bytes, a :class:`MappedFile` above it. No UTF-8 decoding is done.
 #[pyfunction]
-fn read_file(path: &str) -> PyResult<String> {
-    let content = fs::read_to_string(path)?;
-    Ok(content)
+#[pyo3(signature = (path, mmap_threshold = DEFAULT_MMAP_THRESHOLD))]
+fn read_file(py: Python, path: &str, mmap_threshold: usize) -> PyResult<PyObject> {
+    let mut file = File::open(path)?;
+    let len = file.metadata()?.len() as usize;
+    if len > 0 && len >= mmap_threshold {
+        let map = py.allow_threads(|| unsafe { Mmap::map(&file) })?;
+        return Ok(Py::new(py, MappedFile { map })?.into_py(py));
+    }
+    let bytes = PyBytes::new_bound_with(py, len, |buf| {
+        file.read_exact(buf).map_err(PyErr::from)
+    })?;
+    Ok(bytes.into_py(py))
+}
+
+fn hex(bytes: &[u8]) -> String {
+    bytes.iter().map(|b| format!("{:02x}", b)).collect()
 }
 
+/// Write ``content`` to a fresh temp file in the target's directory, hashing
+/// each chunk as it is written, fsync it, rename it over ``target`` and fsync
+/// the directory so the rename itself survives a crash.
+fn write_atomic(target: &Path, content: &[u8]) -> io::Result<String> {
+    let dir = match target.parent() {
+        Some(p) if !p.as_os_str().is_empty() => p,
+        _ => Path::new("."),
+    };
+    let name = target.file_name().map(|n| n.to_string_lossy().into_owned()).unwrap_or_default();
+    let tmp: PathBuf = dir.join(format!(
+        ".{}.{}.{}.tmp",
+        name,
+        std::process::id(),
+        TMP_SEQ.fetch_add(1, Ordering::Relaxed)
+    ));
+    let mut hasher = Sha256::new();
+    let result = (|| -> io::Result<()> {
+        let mut file = OpenOptions::new().write(true).create_new(true).open(&tmp)?;
+        for chunk in content.chunks(WRITE_CHUNK) {
+            hasher.update(chunk);
+            file.write_all(chunk)?;
+        }
+        file.sync_all()?;
+        fs::rename(&tmp, target)?;
+        File::open(dir)?.sync_all()
+    })();
+    if let Err(e) = result {
+        let _ = fs::remove_file(&tmp);
+        return Err(e);
+    }
+    Ok(hex(&hasher.finalize()))
+}
+
+/// Atomically and durably replace ``path`` with ``content`` (any bytes) and
+/// return its SHA-256 hex digest. The GIL is released for the whole write.
 #[pyfunction]
-fn write_file(path: &str, content: &str) -> PyResult<()> {
-    fs::write(path, content)?;
-    Ok(())
+fn write_file(py: Python, path: &str, content: &[u8]) -> PyResult<String> {
+    let target = PathBuf::from(path);
+    Ok(py.allow_threads(move || write_atomic(&target, content))?)
 }
 
 #[pymodule]
 fn fsops_rs(_py: Python, m: &PyModule) -> PyResult<()> {
+    m.add_class::<MappedFile>()?;
     m.add_function(wrap_pyfunction!(read_file, m)?)?;
     m.add_function(wrap_pyfunction!(write_file, m)?)?;
     Ok(())
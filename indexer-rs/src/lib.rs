@@ -1,33 +1,677 @@
+use pyo3::exceptions::PyRuntimeError;
 use pyo3::prelude::*;
-use walkdir::WalkDir;
+use std::collections::{HashMap, HashSet};
+use std::fs;
+use std::io::{BufWriter, Read, Write};
+use std::path::{Path, PathBuf};
+use std::sync::atomic::{AtomicUsize, Ordering};
+use std::sync::{Arc, Mutex, OnceLock};
+use std::time::SystemTime;
 
+// On-disk layout:
+//
+//   <store>/<sha256[..2]>/<sha256>   sorted, unique u32 LE trigrams of one
+//                                    file's content, shared by all projects
+//   <index_dir>/postings.bin         merged inverted index of one project
+//   <index_dir>/delta.bin            overlay: postings of the documents
+//                                    changed since postings.bin was written,
+//                                    plus the paths it hides in postings.bin
+//
+// Segments are content addressed, so identical files (vendored deps, forked
+// templates) are tokenized once across the whole fleet. `build_index` merges
+// the segments of a project's current document set into a fresh postings
+// file which is swapped in atomically. `build_delta` only rewrites the small
+// overlay, so a watcher batch costs O(changed files) instead of O(project);
+// searches read both files through a `View`.
+
+const MAGIC: &[u8; 4] = b"DXIX";
+const VERSION: u32 = 1;
+
+fn io_err(e: std::io::Error) -> PyErr {
+    PyRuntimeError::new_err(e.to_string())
+}
+
+fn trigrams(data: &[u8]) -> Vec<u32> {
+    let mut out: Vec<u32> = data
+        .windows(3)
+        .filter(|w| !w.contains(&b'\n'))
+        .map(|w| {
+            ((w[0].to_ascii_lowercase() as u32) << 16)
+                | ((w[1].to_ascii_lowercase() as u32) << 8)
+                | (w[2].to_ascii_lowercase() as u32)
+        })
+        .collect();
+    out.sort_unstable();
+    out.dedup();
+    out
+}
+
+fn segment_path(store: &Path, hash: &str) -> PathBuf {
+    store.join(&hash[..hash.len().min(2)]).join(hash)
+}
+
+fn read_u32s(bytes: &[u8]) -> Vec<u32> {
+    bytes
+        .chunks_exact(4)
+        .map(|c| u32::from_le_bytes([c[0], c[1], c[2], c[3]]))
+        .collect()
+}
+
+fn write_atomic(target: &Path, write: impl FnOnce(&mut BufWriter<fs::File>) -> std::io::Result<()>) -> std::io::Result<()> {
+    static SEQ: AtomicUsize = AtomicUsize::new(0);
+    let tmp = target.with_extension(format!(
+        "tmp{}-{}",
+        std::process::id(),
+        SEQ.fetch_add(1, Ordering::Relaxed)
+    ));
+    {
+        let mut w = BufWriter::new(fs::File::create(&tmp)?);
+        write(&mut w)?;
+        w.flush()?;
+        w.get_ref().sync_all()?;
+    }
+    fs::rename(&tmp, target)
+}
+
+/// Tokenize one file into the content-addressed segment store.
+///
+/// Returns ``False`` without reading the file when a segment for ``hash``
+/// already exists, i.e. the content was indexed before by any project.
 #[pyfunction]
-fn build_index(path: &str) -> PyResult<Vec<String>> {
-    let mut files = Vec::new();
-    for entry in WalkDir::new(path) {
-        match entry {
-            Ok(entry) => {
-                if entry.file_type().is_file() {
-                    files.push(entry.path().display().to_string());
+fn index_file(py: Python, store: &str, path: &str, hash: &str) -> PyResult<bool> {
+    let seg = segment_path(Path::new(store), hash);
+    let path = path.to_string();
+    py.allow_threads(move || -> std::io::Result<bool> {
+        if seg.exists() {
+            return Ok(false);
+        }
+        fs::create_dir_all(seg.parent().unwrap())?;
+        let mut data = Vec::new();
+        fs::File::open(&path)?.read_to_end(&mut data)?;
+        let tris = trigrams(&data);
+        write_atomic(&seg, |w| {
+            for t in &tris {
+                w.write_all(&t.to_le_bytes())?;
+            }
+            Ok(())
+        })?;
+        Ok(true)
+    })
+    .map_err(io_err)
+}
+
+struct Index {
+    docs: Vec<(String, u64)>,
+    by_path: HashMap<String, u32>,
+    total_size: f64,
+    terms: Vec<u32>,
+    offsets: Vec<u32>,
+    postings: Vec<u32>,
+    // delta.bin only: paths whose postings.bin entry is stale or gone
+    masked: Vec<String>,
+}
+
+impl Index {
+    fn postings_for(&self, tri: u32) -> &[u32] {
+        match self.terms.binary_search(&tri) {
+            Ok(i) => &self.postings[self.offsets[i] as usize..self.offsets[i + 1] as usize],
+            Err(_) => &[],
+        }
+    }
+
+    fn load(path: &Path) -> std::io::Result<Index> {
+        let bytes = fs::read(path)?;
+        let bad = || std::io::Error::new(std::io::ErrorKind::InvalidData, "corrupt postings file");
+        if bytes.len() < 16 || &bytes[0..4] != MAGIC {
+            return Err(bad());
+        }
+        let header = read_u32s(&bytes[4..16]);
+        if header[0] != VERSION {
+            return Err(bad());
+        }
+        let (ndocs, nterms) = (header[1] as usize, header[2] as usize);
+        let mut pos = 16;
+        let mut docs = Vec::with_capacity(ndocs);
+        for _ in 0..ndocs {
+            let len = read_u32s(bytes.get(pos..pos + 4).ok_or_else(bad)?)[0] as usize;
+            pos += 4;
+            let name = String::from_utf8_lossy(bytes.get(pos..pos + len).ok_or_else(bad)?).into_owned();
+            pos += len;
+            let size = u64::from_le_bytes(bytes.get(pos..pos + 8).ok_or_else(bad)?.try_into().unwrap());
+            pos += 8;
+            docs.push((name, size));
+        }
+        let table = read_u32s(bytes.get(pos..pos + nterms * 8).ok_or_else(bad)?);
+        pos += nterms * 8;
+        let mut terms = Vec::with_capacity(nterms);
+        let mut offsets = Vec::with_capacity(nterms + 1);
+        let mut total = 0u32;
+        offsets.push(0);
+        for pair in table.chunks_exact(2) {
+            terms.push(pair[0]);
+            total += pair[1];
+            offsets.push(total);
+        }
+        let postings = read_u32s(bytes.get(pos..pos + total as usize * 4).ok_or_else(bad)?);
+        pos += total as usize * 4;
+        let mut masked = Vec::new();
+        if pos < bytes.len() {
+            let count = read_u32s(bytes.get(pos..pos + 4).ok_or_else(bad)?)[0] as usize;
+            pos += 4;
+            for _ in 0..count {
+                let len = read_u32s(bytes.get(pos..pos + 4).ok_or_else(bad)?)[0] as usize;
+                pos += 4;
+                masked.push(String::from_utf8_lossy(bytes.get(pos..pos + len).ok_or_else(bad)?).into_owned());
+                pos += len;
+            }
+        }
+        let by_path = docs.iter().enumerate().map(|(i, (p, _))| (p.clone(), i as u32)).collect();
+        let total_size = docs.iter().map(|(_, s)| *s as f64).sum::<f64>();
+        Ok(Index { docs, by_path, total_size, terms, offsets, postings, masked })
+    }
+}
+
+/// Documents of ``idx`` that may contain ``term`` according to its
+/// trigrams, or None when the term is too short to have any.
+fn index_term_docs(idx: &Index, term: &str) -> Option<Vec<u32>> {
+    let mut docs: Option<Vec<u32>> = None;
+    for tri in trigrams(term.as_bytes()) {
+        let list = idx.postings_for(tri);
+        docs = Some(match docs {
+            None => list.to_vec(),
+            Some(d) => intersect(&d, list),
+        });
+    }
+    docs
+}
+
+/// postings.bin with delta.bin laid over it. Document ids below ``nbase``
+/// are base ids; the overlay's follow, so id lists stay sorted when the
+/// (unmasked) base list is followed by the overlay list.
+struct View {
+    base: Option<Arc<Index>>,
+    delta: Option<Arc<Index>>,
+    nbase: u32,
+    masked: HashSet<u32>,
+    ndocs: usize,
+    avgdl: f64,
+}
+
+impl View {
+    fn new(base: Option<Arc<Index>>, delta: Option<Arc<Index>>) -> View {
+        let nbase = base.as_ref().map_or(0, |b| b.docs.len() as u32);
+        let mut masked = HashSet::new();
+        let mut total = base.as_ref().map_or(0.0, |b| b.total_size);
+        if let (Some(b), Some(d)) = (&base, &delta) {
+            for path in &d.masked {
+                if let Some(&id) = b.by_path.get(path) {
+                    if masked.insert(id) {
+                        total -= b.docs[id as usize].1 as f64;
+                    }
                 }
             }
-            Err(e) => {
-                return Err(pyo3::exceptions::PyRuntimeError::new_err(format!("WalkDir error: {}", e)));
+        }
+        let ndelta = delta.as_ref().map_or(0, |d| d.docs.len());
+        total += delta.as_ref().map_or(0.0, |d| d.total_size);
+        let ndocs = nbase as usize - masked.len() + ndelta;
+        let avgdl = if ndocs == 0 { 1.0 } else { (total / ndocs as f64).max(1.0) };
+        View { base, delta, nbase, masked, ndocs, avgdl }
+    }
+
+    fn doc(&self, id: u32) -> &(String, u64) {
+        match &self.base {
+            Some(b) if id < self.nbase => &b.docs[id as usize],
+            _ => &self.delta.as_ref().unwrap().docs[(id - self.nbase) as usize],
+        }
+    }
+
+    fn id_of(&self, path: &str) -> Option<u32> {
+        if let Some(&id) = self.delta.as_ref().and_then(|d| d.by_path.get(path)) {
+            return Some(self.nbase + id);
+        }
+        let id = *self.base.as_ref()?.by_path.get(path)?;
+        (!self.masked.contains(&id)).then_some(id)
+    }
+
+    fn all_ids(&self) -> Vec<u32> {
+        let ndelta = self.delta.as_ref().map_or(0, |d| d.docs.len() as u32);
+        (0..self.nbase)
+            .filter(|id| !self.masked.contains(id))
+            .chain(self.nbase..self.nbase + ndelta)
+            .collect()
+    }
+
+    fn term_docs(&self, term: &str) -> Option<Vec<u32>> {
+        let base = self.base.as_ref().and_then(|b| index_term_docs(b, term));
+        let delta = self.delta.as_ref().and_then(|d| index_term_docs(d, term));
+        if base.is_none() && delta.is_none() {
+            return None;
+        }
+        let mut ids: Vec<u32> = base.unwrap_or_default();
+        ids.retain(|id| !self.masked.contains(id));
+        ids.extend(delta.unwrap_or_default().into_iter().map(|id| self.nbase + id));
+        Some(ids)
+    }
+}
+
+// Loaded indexes are kept per directory and reloaded when postings.bin changes,
+// so repeated searches never touch the disk for the index itself. Two merges
+// can land within one mtime tick, so the size (and, on unix, the inode of the
+// atomically renamed file) is part of the version too.
+type IndexVersion = (SystemTime, u64, u64);
+
+fn index_version(meta: &fs::Metadata) -> std::io::Result<IndexVersion> {
+    #[cfg(unix)]
+    let ino = std::os::unix::fs::MetadataExt::ino(meta);
+    #[cfg(not(unix))]
+    let ino = 0;
+    Ok((meta.modified()?, meta.len(), ino))
+}
+
+fn file_version(path: &Path) -> std::io::Result<Option<IndexVersion>> {
+    match fs::metadata(path) {
+        Ok(meta) => index_version(&meta).map(Some),
+        Err(e) if e.kind() == std::io::ErrorKind::NotFound => Ok(None),
+        Err(e) => Err(e),
+    }
+}
+
+type CachedView = ((Option<IndexVersion>, Option<IndexVersion>), Arc<View>);
+
+fn cached_view(index_dir: &str) -> std::io::Result<Option<Arc<View>>> {
+    static CACHE: OnceLock<Mutex<HashMap<String, CachedView>>> = OnceLock::new();
+    let dir = Path::new(index_dir);
+    let (base_path, delta_path) = (dir.join("postings.bin"), dir.join("delta.bin"));
+    let version = (file_version(&base_path)?, file_version(&delta_path)?);
+    if version == (None, None) {
+        return Ok(None);
+    }
+    let cache = CACHE.get_or_init(|| Mutex::new(HashMap::new()));
+    if let Some((v, view)) = cache.lock().unwrap().get(index_dir) {
+        if *v == version {
+            return Ok(Some(view.clone()));
+        }
+    }
+    let load = |path: &Path, present: bool| -> std::io::Result<Option<Arc<Index>>> {
+        if !present {
+            return Ok(None);
+        }
+        match Index::load(path) {
+            Ok(idx) => Ok(Some(Arc::new(idx))),
+            // replaced between the stat and the read: serve what is there
+            Err(e) if e.kind() == std::io::ErrorKind::NotFound => Ok(None),
+            Err(e) => Err(e),
+        }
+    };
+    let view = Arc::new(View::new(
+        load(&base_path, version.0.is_some())?,
+        load(&delta_path, version.1.is_some())?,
+    ));
+    cache.lock().unwrap().insert(index_dir.to_string(), (version, view.clone()));
+    Ok(Some(view))
+}
+
+/// Postings of ``docs`` (path, hash, size) from their store segments, plus
+/// the paths whose segment is missing.
+fn collect_postings(store: &Path, docs: &[(String, String, u64)]) -> (HashMap<u32, Vec<u32>>, Vec<String>) {
+    let mut postings: HashMap<u32, Vec<u32>> = HashMap::new();
+    let mut missing = Vec::new();
+    for (doc_id, (path, hash, _)) in docs.iter().enumerate() {
+        let seg = match fs::read(segment_path(store, hash)) {
+            Ok(b) => b,
+            Err(_) => {
+                missing.push(path.clone());
+                continue;
+            }
+        };
+        for tri in read_u32s(&seg) {
+            postings.entry(tri).or_default().push(doc_id as u32);
+        }
+    }
+    (postings, missing)
+}
+
+fn write_postings(
+    target: &Path,
+    docs: &[(String, String, u64)],
+    postings: &HashMap<u32, Vec<u32>>,
+    masked: &[String],
+) -> std::io::Result<()> {
+    let mut terms: Vec<u32> = postings.keys().copied().collect();
+    terms.sort_unstable();
+    write_atomic(target, |w| {
+        w.write_all(MAGIC)?;
+        for v in [VERSION, docs.len() as u32, terms.len() as u32] {
+            w.write_all(&v.to_le_bytes())?;
+        }
+        for (path, _, size) in docs {
+            w.write_all(&(path.len() as u32).to_le_bytes())?;
+            w.write_all(path.as_bytes())?;
+            w.write_all(&size.to_le_bytes())?;
+        }
+        for t in &terms {
+            w.write_all(&t.to_le_bytes())?;
+            w.write_all(&(postings[t].len() as u32).to_le_bytes())?;
+        }
+        for t in &terms {
+            for d in &postings[t] {
+                w.write_all(&d.to_le_bytes())?;
+            }
+        }
+        if !masked.is_empty() {
+            w.write_all(&(masked.len() as u32).to_le_bytes())?;
+            for path in masked {
+                w.write_all(&(path.len() as u32).to_le_bytes())?;
+                w.write_all(path.as_bytes())?;
             }
         }
+        Ok(())
+    })
+}
+
+/// Merge the segments of ``docs`` (path, hash, size) into ``postings.bin``
+/// and drop any ``delta.bin``, which the new postings supersede.
+///
+/// Returns the paths whose segment is missing from the store so the caller
+/// can tokenize them and merge again.
+#[pyfunction]
+fn build_index(
+    py: Python,
+    index_dir: &str,
+    store: &str,
+    docs: Vec<(String, String, u64)>,
+) -> PyResult<Vec<String>> {
+    let dir = PathBuf::from(index_dir);
+    let store = PathBuf::from(store);
+    py.allow_threads(move || -> std::io::Result<Vec<String>> {
+        fs::create_dir_all(&dir)?;
+        let (postings, missing) = collect_postings(&store, &docs);
+        write_postings(&dir.join("postings.bin"), &docs, &postings, &[])?;
+        match fs::remove_file(dir.join("delta.bin")) {
+            Err(e) if e.kind() != std::io::ErrorKind::NotFound => return Err(e),
+            _ => {}
+        }
+        Ok(missing)
+    })
+    .map_err(io_err)
+}
+
+/// Replace ``delta.bin`` with the segments of ``docs`` (every document
+/// written since ``postings.bin``) hiding the ``masked`` paths of
+/// ``postings.bin`` (those documents plus the removed ones).
+///
+/// Returns the paths whose segment is missing, like :func:`build_index`.
+#[pyfunction]
+fn build_delta(
+    py: Python,
+    index_dir: &str,
+    store: &str,
+    docs: Vec<(String, String, u64)>,
+    masked: Vec<String>,
+) -> PyResult<Vec<String>> {
+    let dir = PathBuf::from(index_dir);
+    let store = PathBuf::from(store);
+    py.allow_threads(move || -> std::io::Result<Vec<String>> {
+        fs::create_dir_all(&dir)?;
+        let (postings, missing) = collect_postings(&store, &docs);
+        write_postings(&dir.join("delta.bin"), &docs, &postings, &masked)?;
+        Ok(missing)
+    })
+    .map_err(io_err)
+}
+
+fn intersect(a: &[u32], b: &[u32]) -> Vec<u32> {
+    let (mut i, mut j, mut out) = (0, 0, Vec::new());
+    while i < a.len() && j < b.len() {
+        if a[i] < b[j] {
+            i += 1;
+        } else if a[i] > b[j] {
+            j += 1;
+        } else {
+            out.push(a[i]);
+            i += 1;
+            j += 1;
+        }
     }
-    Ok(files)
+    out
 }
 
+const K1: f64 = 1.2;
+const B: f64 = 0.75;
+const SNIPPET_BYTES: usize = 400;
+
+type Snippet = (usize, String, Vec<(usize, usize)>);
+type Scored = (String, f64, Vec<Snippet>);
+
+fn query_terms(query: &str) -> Vec<String> {
+    let mut terms: Vec<String> = query.split_whitespace().map(|t| t.to_ascii_lowercase()).collect();
+    terms.sort();
+    terms.dedup();
+    terms
+}
+
+fn candidate_ids(view: &View, terms: &[String], allowed: Option<Vec<String>>) -> Vec<u32> {
+    let mut candidates: Option<Vec<u32>> = None;
+    for term in terms {
+        if let Some(docs) = view.term_docs(term) {
+            candidates = Some(match candidates {
+                None => docs,
+                Some(c) => intersect(&c, &docs),
+            });
+        }
+    }
+    let mut ids = candidates.unwrap_or_else(|| view.all_ids());
+    if let Some(allowed) = allowed {
+        let allowed: HashSet<String> = allowed.into_iter().collect();
+        ids.retain(|id| allowed.contains(&view.doc(*id).0));
+    }
+    ids
+}
+
+fn idfs(view: &View, terms: &[String]) -> Vec<f64> {
+    let n = view.ndocs as f64;
+    terms
+        .iter()
+        .map(|t| {
+            let df = view.term_docs(t).map(|d| d.len() as f64).unwrap_or(n);
+            ((n - df + 0.5) / (df + 0.5) + 1.0).ln()
+        })
+        .collect()
+}
+
+fn find(haystack: &[u8], needle: &[u8]) -> Option<usize> {
+    haystack.windows(needle.len()).position(|w| w == needle)
+}
+
+fn char_offset(bytes: &[u8], byte: usize) -> usize {
+    String::from_utf8_lossy(&bytes[..byte]).chars().count()
+}
+
+/// Verify one document against all terms and compute its BM25 score plus
+/// up to ``max_snippets`` matching lines with character match offsets.
+fn score_doc(
+    view: &View,
+    root: &Path,
+    doc_id: u32,
+    terms: &[String],
+    idf: &[f64],
+    max_snippets: usize,
+) -> Option<Scored> {
+    let (rel, size) = view.doc(doc_id);
+    let data = fs::read(root.join(rel)).ok()?;
+    let lower = data.to_ascii_lowercase();
+    let mut tf = vec![0usize; terms.len()];
+    let mut snippets = Vec::new();
+    for (n, (lline, line)) in lower.split(|b| *b == b'\n').zip(data.split(|b| *b == b'\n')).enumerate() {
+        let mut ranges = Vec::new();
+        for (i, term) in terms.iter().enumerate() {
+            let needle = term.as_bytes();
+            let mut start = 0;
+            while let Some(p) = find(&lline[start..], needle) {
+                ranges.push((start + p, start + p + needle.len()));
+                tf[i] += 1;
+                start += p + needle.len();
+            }
+        }
+        if ranges.is_empty() || snippets.len() >= max_snippets {
+            continue;
+        }
+        ranges.sort_unstable();
+        let line = line.strip_suffix(b"\r").unwrap_or(line);
+        // keep snippets bounded on minified/generated files
+        let lo = ranges[0].0.saturating_sub(SNIPPET_BYTES / 4).min(line.len());
+        let hi = (lo + SNIPPET_BYTES).min(line.len());
+        let window = &line[lo..hi];
+        let offsets = ranges
+            .into_iter()
+            .filter(|(s, e)| *s >= lo && *e <= hi)
+            .map(|(s, e)| (char_offset(window, s - lo), char_offset(window, e - lo)))
+            .collect();
+        snippets.push((n + 1, String::from_utf8_lossy(window).into_owned(), offsets));
+    }
+    if tf.iter().any(|c| *c == 0) {
+        return None;
+    }
+    let norm = K1 * (1.0 - B + B * (*size as f64) / view.avgdl);
+    let score: f64 = tf
+        .iter()
+        .zip(idf)
+        .map(|(tf, idf)| idf * (*tf as f64 * (K1 + 1.0)) / (*tf as f64 + norm))
+        .sum();
+    Some((rel.clone(), score, snippets))
+}
+
+/// Score ``ids`` on all cores; results keep no particular order.
+fn score_many(view: &View, root: &Path, ids: &[u32], terms: &[String], max_snippets: usize) -> Vec<Scored> {
+    let idf = idfs(view, terms);
+    let threads = std::thread::available_parallelism().map(|n| n.get()).unwrap_or(1);
+    let chunk = ((ids.len() + threads - 1) / threads).max(16);
+    std::thread::scope(|scope| {
+        let handles: Vec<_> = ids
+            .chunks(chunk)
+            .map(|part| {
+                let idf = &idf;
+                scope.spawn(move || {
+                    part.iter()
+                        .filter_map(|id| score_doc(view, root, *id, terms, idf, max_snippets))
+                        .collect::<Vec<_>>()
+                })
+            })
+            .collect();
+        handles.into_iter().flat_map(|h| h.join().unwrap_or_default()).collect()
+    })
+}
+
+/// Paths that may match every term of ``query`` (trigram prefilter only),
+/// restricted to ``paths`` when given. Ordered by path.
+#[pyfunction]
+#[pyo3(signature = (index_dir, query, paths=None))]
+fn candidates(py: Python, index_dir: &str, query: &str, paths: Option<Vec<String>>) -> PyResult<Vec<String>> {
+    let index_dir = index_dir.to_string();
+    let terms = query_terms(query);
+    py.allow_threads(move || -> std::io::Result<Vec<String>> {
+        let view = match cached_view(&index_dir)? {
+            Some(view) if !terms.is_empty() => view,
+            _ => return Ok(Vec::new()),
+        };
+        let mut paths: Vec<String> = candidate_ids(&view, &terms, paths)
+            .into_iter()
+            .map(|id| view.doc(id).0.clone())
+            .collect();
+        paths.sort_unstable();
+        Ok(paths)
+    })
+    .map_err(io_err)
+}
+
+/// Verify and BM25-score ``docs``; non-matching documents are dropped.
+/// Returns (path, score, [(line, text, [(start, end)])]) sorted by score.
 #[pyfunction]
-fn search_index(query: &str) -> PyResult<Vec<String>> {
-    // Dummy implementation
-    Ok(vec![query.to_string()])
+#[pyo3(signature = (index_dir, root, query, docs, max_snippets=5))]
+fn score_docs(
+    py: Python,
+    index_dir: &str,
+    root: &str,
+    query: &str,
+    docs: Vec<String>,
+    max_snippets: usize,
+) -> PyResult<Vec<Scored>> {
+    let index_dir = index_dir.to_string();
+    let root = PathBuf::from(root);
+    let terms = query_terms(query);
+    py.allow_threads(move || -> std::io::Result<Vec<Scored>> {
+        let view = match cached_view(&index_dir)? {
+            Some(view) if !terms.is_empty() => view,
+            _ => return Ok(Vec::new()),
+        };
+        let ids: Vec<u32> = docs.iter().filter_map(|d| view.id_of(d)).collect();
+        let mut scored = score_many(&view, &root, &ids, &terms, max_snippets);
+        sort_scored(&mut scored);
+        Ok(scored)
+    })
+    .map_err(io_err)
+}
+
+// Best first; ties broken by path so the order is total and a (score, path)
+// key identifies a position in it.
+fn rank_cmp(a: &Scored, b: &Scored) -> std::cmp::Ordering {
+    b.1.partial_cmp(&a.1).unwrap_or(std::cmp::Ordering::Equal).then_with(|| a.0.cmp(&b.0))
+}
+
+fn sort_scored(scored: &mut [Scored]) {
+    scored.sort_by(rank_cmp);
+}
+
+/// Rank every document matching all whitespace separated terms of ``query``
+/// with BM25 and return the best ``limit`` as (path, score, snippets).
+///
+/// With ``after=(score, path)`` (the last hit of the previous page) only
+/// documents ranked below it are returned, so a page never materializes or
+/// sorts the hits of the pages before it.
+#[pyfunction]
+#[pyo3(signature = (index_dir, root, query, paths=None, limit=100, max_snippets=5, after=None))]
+fn search_index(
+    py: Python,
+    index_dir: &str,
+    root: &str,
+    query: &str,
+    paths: Option<Vec<String>>,
+    limit: usize,
+    max_snippets: usize,
+    after: Option<(f64, String)>,
+) -> PyResult<Vec<Scored>> {
+    let index_dir = index_dir.to_string();
+    let root = PathBuf::from(root);
+    let terms = query_terms(query);
+    py.allow_threads(move || -> std::io::Result<Vec<Scored>> {
+        let view = match cached_view(&index_dir)? {
+            Some(view) if !terms.is_empty() => view,
+            _ => return Ok(Vec::new()),
+        };
+        let ids = candidate_ids(&view, &terms, paths);
+        let mut scored = score_many(&view, &root, &ids, &terms, max_snippets);
+        if let Some((score, path)) = &after {
+            scored.retain(|s| s.1 < *score || (s.1 == *score && s.0 > *path));
+        }
+        if scored.len() > limit {
+            if limit > 0 {
+                scored.select_nth_unstable_by(limit - 1, rank_cmp);
+            }
+            scored.truncate(limit);
+        }
+        sort_scored(&mut scored);
+        Ok(scored)
+    })
+    .map_err(io_err)
 }
 
 #[pymodule]
 fn indexer_rs(_py: Python, m: &PyModule) -> PyResult<()> {
+    m.add_function(wrap_pyfunction!(index_file, m)?)?;
     m.add_function(wrap_pyfunction!(build_index, m)?)?;
+    m.add_function(wrap_pyfunction!(build_delta, m)?)?;
+    m.add_function(wrap_pyfunction!(candidates, m)?)?;
+    m.add_function(wrap_pyfunction!(score_docs, m)?)?;
     m.add_function(wrap_pyfunction!(search_index, m)?)?;
     Ok(())
 }
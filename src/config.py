@@ -11,6 +11,33 @@ class Settings(BaseSettings):
     FASTAPI_PORT: int = Field(default=8000, env="FASTAPI_PORT")
     LOG_LEVEL: str = Field(default="INFO", env="LOG_LEVEL")
     WEBSOCKET_URL: str = Field(default="ws://localhost:8000/ws", env="WEBSOCKET_URL")
+    PROJECTS_ROOT: str = Field(default="/projects", env="PROJECTS_ROOT")
+    INDEX_DIR: str = Field(default="/projects/.index", env="INDEX_DIR")
+    BLOB_STORE_DIR: str = Field(default="/projects/.blobs", env="BLOB_STORE_DIR")
+    BLOB_INLINE_MAX_BYTES: int = Field(default=64 << 10, env="BLOB_INLINE_MAX_BYTES")
+    BLOB_TTL_S: int = Field(default=86400, env="BLOB_TTL_S")
+    INDEX_SCAN_WORKERS: int = Field(default=8, env="INDEX_SCAN_WORKERS")
+    INDEX_HASH_CHUNK_SIZE: int = Field(default=1 << 20, env="INDEX_HASH_CHUNK_SIZE")
+    INDEX_BATCH_SIZE: int = Field(default=500, env="INDEX_BATCH_SIZE")
+    INDEX_LEASE_TTL_S: int = Field(default=120, env="INDEX_LEASE_TTL_S")
+    INDEX_DELTA_MAX_DOCS: int = Field(default=1000, env="INDEX_DELTA_MAX_DOCS")
+    INDEX_MAX_FILE_BYTES: int = Field(default=2 << 20, env="INDEX_MAX_FILE_BYTES")
+    INDEX_IGNORE: str = Field(default=".git/,node_modules/,__pycache__/", env="INDEX_IGNORE")
+    INDEX_WATCH_QUIET_MS: int = Field(default=100, env="INDEX_WATCH_QUIET_MS")
+    INDEX_WATCH_MAX_DELAY_MS: int = Field(default=1000, env="INDEX_WATCH_MAX_DELAY_MS")
+    INDEX_WATCH_FORCE_POLLING: bool = Field(default=False, env="INDEX_WATCH_FORCE_POLLING")
+    SEARCH_CACHE_SIZE: int = Field(default=1024, env="SEARCH_CACHE_SIZE")
+    SEARCH_CACHE_TTL_S: int = Field(default=300, env="SEARCH_CACHE_TTL_S")
+    SEARCH_CACHE_REDIS: bool = Field(default=False, env="SEARCH_CACHE_REDIS")
+    TREE_CACHE_SIZE: int = Field(default=256, env="TREE_CACHE_SIZE")
+    TREE_WALK_TTL_S: int = Field(default=60, env="TREE_WALK_TTL_S")
+    DIFF_ALGORITHM: str = Field(default="myers", env="DIFF_ALGORITHM")
+    DIFF_INTRALINE_MAX_CHARS: int = Field(default=4000, env="DIFF_INTRALINE_MAX_CHARS")
+    DIFF_CACHE_SIZE: int = Field(default=512, env="DIFF_CACHE_SIZE")
+    DIFF_CACHE_MAX_BYTES: int = Field(default=64 << 20, env="DIFF_CACHE_MAX_BYTES")
+    FS_META_CACHE_SIZE: int = Field(default=4096, env="FS_META_CACHE_SIZE")
+    FS_CONTENT_CACHE_SIZE: int = Field(default=256, env="FS_CONTENT_CACHE_SIZE")
+    FS_CONTENT_CACHE_MAX_FILE_BYTES: int = Field(default=256 << 10, env="FS_CONTENT_CACHE_MAX_FILE_BYTES")
     REQUIRE_APPROVAL_PLANNING: bool = Field(default=False, env="REQUIRE_APPROVAL_PLANNING")
     basic_auth_enabled: bool = Field(default=False)
     basic_auth_user: str = Field(default="admin")
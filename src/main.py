@@ -4,8 +4,9 @@ from fastapi.middleware.gzip import GZipMiddleware
 from .config import settings
 from .logging import setup_logging, StructlogMiddleware
 from .utils.security import BasicAuthMiddleware, RateLimitMiddleware
+from .utils import metrics
 from .db import init_db
-from .routes import projects, ws, index, search, diff, file
+from .routes import projects, ws, index, search, symbols, diff, file, tree
 import asyncio
 import structlog
 
@@ -28,13 +29,19 @@ def create_app() -> FastAPI:
     app.include_router(ws.router)
     app.include_router(index.router)
     app.include_router(search.router)
+    app.include_router(symbols.router)
     app.include_router(diff.router)
     app.include_router(file.router)
+    app.include_router(tree.router)
 
     @app.get("/")
     async def root():
         return {"status": "ok", "docs": "/docs", "health": "/health"}
 
+    @app.get("/metrics")
+    async def get_metrics():
+        return metrics.snapshot()
+
     @app.on_event("startup")
     async def on_startup():
         # Retry DB init to avoid crash loops if DB not ready yet
@@ -2,4 +2,6 @@
 from .project import Project
 from .file import File
 from .artifact import Artifact
-from .file_meta import FileMeta
+from .file_meta import FileMeta, FileTombstone
+from .symbol import Symbol
+from .index_state import IndexState
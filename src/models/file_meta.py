@@ -8,7 +8,10 @@ if TYPE_CHECKING:
 
 
 class FileMeta(SQLModel, table=True):
-    """Stored metadata for indexed files."""
+    """Stored metadata for indexed files.
+
+    ``generation`` is the index generation in which the row was last written.
+    """
 
     __table_args__ = (UniqueConstraint("project_id", "path"),)
 
@@ -20,6 +23,18 @@ class FileMeta(SQLModel, table=True):
     hash: str
     lang: Optional[str] = None
     symbols_count: int = 0
+    generation: int = 0
     last_indexed_at: Optional[datetime] = None
 
     project: Optional["Project"] = Relationship(back_populates="file_metas")
+
+
+class FileTombstone(SQLModel, table=True):
+    """A path dropped from the index in ``generation``, for tree deltas."""
+
+    __table_args__ = (UniqueConstraint("project_id", "path"),)
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    project_id: int = Field(foreign_key="project.id")
+    path: str
+    generation: int
@@ -0,0 +1,32 @@
+from datetime import datetime
+from typing import Optional
+
+from sqlmodel import SQLModel, Field
+
+
+class IndexState(SQLModel, table=True):
+    """Per-project search index bookkeeping.
+
+    ``generation`` is bumped every time the project's postings are rewritten;
+    anything derived from the index (e.g. cached search results) is keyed by it.
+    ``base_generation`` is the generation of the last full merge: rows written
+    after it are served from the delta overlay.
+
+    A full build holds a lease (``lease_owner`` until ``lease_expires_at``) so
+    concurrent builds of one project are deduplicated, and records a
+    checkpoint with every committed ``FileMeta`` batch. ``status`` stays
+    ``running`` until the build finished, so a retried build knows it is
+    resuming an interrupted one.
+    """
+
+    project_id: int = Field(foreign_key="project.id", primary_key=True)
+    generation: int = 0
+    base_generation: int = 0
+    updated_at: Optional[datetime] = None
+    status: Optional[str] = None
+    lease_owner: Optional[str] = None
+    lease_expires_at: Optional[datetime] = None
+    checkpoint_batch: int = 0
+    checkpoint_files: int = 0
+    checkpoint_path: Optional[str] = None
+    checkpoint_generation: Optional[int] = None
@@ -0,0 +1,21 @@
+from typing import Optional
+
+from sqlmodel import SQLModel, Field, Index
+
+
+class Symbol(SQLModel, table=True):
+    """A definition (function, class, method, ...) found while indexing."""
+
+    __table_args__ = (
+        Index("ix_symbol_project_name", "project_id", "name"),
+        Index("ix_symbol_project_path", "project_id", "path"),
+    )
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    project_id: int = Field(foreign_key="project.id")
+    path: str
+    name: str
+    kind: str
+    line: int
+    column: int
+    container: Optional[str] = None
@@ -1,12 +1,19 @@
-from fastapi import APIRouter, HTTPException
+import json
+from functools import partial
+
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel
-from typing import Optional
+from typing import List, Literal, Optional
 
 from ..services.diff_service import DiffService
 from ..services.fs_service import FSService
+from ..services.git_service import GitService
+from ..services.index_service import IndexService
 
 
 router = APIRouter()
+index_service = IndexService()
 
 
 class DiffRequest(BaseModel):
@@ -14,28 +21,74 @@ class DiffRequest(BaseModel):
     after: Optional[str] = None
     before_path: Optional[str] = None
     after_path: Optional[str] = None
+    intraline: Optional[Literal["word", "char"]] = None
+    format: Literal["lines", "ops"] = "lines"
 
 
 @router.post("/api/projects/{id}/diff")
-async def compute_diff(id: int, payload: DiffRequest):  # noqa: ARG001 - id for route parity
-    fs = FSService()
-    diff = DiffService()
+async def compute_diff(id: int, payload: DiffRequest):
+    fs = FSService(IndexService.project_root(id))
+    sides = []
+    for text, path in ((payload.before, payload.before_path), (payload.after, payload.after_path)):
+        if not path:
+            sides.append((text or "", None))
+            continue
+        # the indexed hash is the cache key, so a cached diff never reads the file
+        meta = await index_service.stat_file(fs, id, path)
+        if meta is None:
+            raise HTTPException(status_code=404, detail=f"{path} not found")
+        sides.append((partial(fs.read_text, path), meta.hash))
+    (before, before_hash), (after, after_hash) = sides
 
-    if payload.before_path:
-        before_bytes = await fs.read_file(payload.before_path)
-        before = before_bytes.tobytes().decode("utf-8")
-    else:
-        before = payload.before or ""
+    try:
+        hunks = await DiffService().compute_diff(
+            before,
+            after,
+            intraline=payload.intraline,
+            before_hash=before_hash,
+            after_hash=after_hash,
+            compact=payload.format == "ops",
+        )
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    # hunks are plain JSON types: skip jsonable_encoder's copy of every line
+    return JSONResponse({"project_id": id, "format": payload.format, "hunks": hunks})
 
-    if payload.after_path:
-        after_bytes = await fs.read_file(payload.after_path)
-        after = after_bytes.tobytes().decode("utf-8")
-    else:
-        after = payload.after or ""
 
-    if before is None or after is None:
-        raise HTTPException(status_code=400, detail="Both before and after content required")
+@router.get("/api/projects/{id}/diff/revisions")
+async def diff_revisions(
+    id: int,
+    base: str,
+    head: Optional[str] = None,
+    path: List[str] = Query([]),
+    intraline: Optional[Literal["word", "char"]] = None,
+    format: Literal["lines", "ops"] = "lines",
+):
+    if intraline and format == "ops":
+        raise HTTPException(status_code=400, detail="intraline ranges need the lines format")
+    root = IndexService.project_root(id)
+    if not root.is_dir():
+        raise HTTPException(status_code=404, detail="project not found")
+    git = GitService(str(root))
+    try:
+        changes = await git.changed_files(base, head, path)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
 
-    hunks = await diff.compute_diff(before, after)
-    return {"project_id": id, "hunks": hunks}
+    async def _ndjson():
+        diff = DiffService()
+        count = 0
+        async for entry in diff.iter_revision_diff(
+            git,
+            changes,
+            base,
+            head,
+            fs=FSService(root),
+            intraline=intraline,
+            compact=format == "ops",
+        ):
+            count += 1
+            yield json.dumps(entry) + "\n"
+        yield json.dumps({"done": True, "count": count}) + "\n"
 
+    return StreamingResponse(_ndjson(), media_type="application/x-ndjson")
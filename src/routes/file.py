@@ -1,9 +1,130 @@
-from fastapi import APIRouter
+import base64
+import binascii
+import mimetypes
+import re
+from typing import List, Literal, Optional, Tuple
+
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import BaseModel
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..db import get_session
+from ..services.blob_store import blob_store
+from ..services.fs_service import FSService
+from ..services.index_service import IndexService
 from ..services.task_queue import file_task
 
 router = APIRouter()
+index_service = IndexService()
+
+_RANGE = re.compile(r"bytes=(\d*)-(\d*)$")
+
+
+class BatchFile(BaseModel):
+    path: str
+    content: str
+    encoding: Literal["utf-8", "base64"] = "utf-8"
+
+
+class BatchWriteRequest(BaseModel):
+    files: List[BatchFile]
+    transactional: bool = False
 
 @router.post("/api/projects/{id}/file")
 async def file_ops(id: int, path: str, content: str = None):
-    task = file_task.delay(id, path, content)
+    task = file_task.delay(id, path, blob_store.pack(content))
     return {"task_id": task.id, "status": "file op started", "project_id": id, "path": path}
+
+
+def _parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """Inclusive ``(start, end)`` of a single-range header; ``None`` means serve it all."""
+    m = _RANGE.match(header.strip())
+    if not m or m.groups() == ("", ""):
+        return None  # multi-range or malformed: ignore, as RFC 9110 allows
+    first, last = m.groups()
+    if first:
+        start, end = int(first), min(int(last), size - 1) if last else size - 1
+    else:
+        start, end = max(size - int(last), 0), size - 1
+    if start >= size or start > end:
+        raise HTTPException(
+            status_code=416,
+            detail="Range not satisfiable",
+            headers={"Content-Range": f"bytes */{size}"},
+        )
+    return start, end
+
+
+@router.get("/api/projects/{id}/files/{path:path}")
+async def download_file(
+    id: int, path: str, request: Request, session: AsyncSession = Depends(get_session)
+):
+    fs = FSService(IndexService.project_root(id))
+    meta = await index_service.stat_file(fs, id, path, session)
+    if meta is None:
+        raise HTTPException(status_code=404, detail="File not found")
+    etag = f'"{meta.hash}"'
+    headers = {"ETag": etag, "Accept-Ranges": "bytes"}
+    if etag in request.headers.get("if-none-match", ""):
+        return Response(status_code=304, headers=headers)
+
+    media_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+    byte_range = None
+    if "range" in request.headers and request.headers.get("if-range", etag) == etag:
+        byte_range = _parse_range(request.headers["range"], meta.size)
+    if byte_range is None:
+        headers["Content-Length"] = str(meta.size)
+        return StreamingResponse(fs.iter_file(path), media_type=media_type, headers=headers)
+    start, end = byte_range
+    headers["Content-Range"] = f"bytes {start}-{end}/{meta.size}"
+    headers["Content-Length"] = str(end - start + 1)
+    return StreamingResponse(
+        fs.iter_file(path, start, end + 1), status_code=206, media_type=media_type, headers=headers
+    )
+
+
+@router.put("/api/projects/{id}/files/{path:path}")
+async def upload_file(
+    id: int, path: str, request: Request, session: AsyncSession = Depends(get_session)
+):
+    fs = FSService(IndexService.project_root(id))
+    if_match = request.headers.get("if-match")
+    current = await index_service.stat_file(fs, id, path, session)
+    if if_match is not None:
+        if current is None or (if_match != "*" and f'"{current.hash}"' not in if_match):
+            raise HTTPException(status_code=412, detail="File changed")
+    meta = await fs.write_stream(path, request.stream())
+    return JSONResponse(
+        {"project_id": id, "path": path, "size": meta.size, "hash": meta.hash},
+        status_code=201 if current is None else 200,
+        headers={"ETag": f'"{meta.hash}"'},
+    )
+
+
+@router.post("/api/projects/{id}/files")
+async def write_files(id: int, payload: BatchWriteRequest):
+    fs = FSService(IndexService.project_root(id))
+    files = []
+    for f in payload.files:
+        if f.encoding != "base64":
+            files.append((f.path, f.content.encode("utf-8")))
+            continue
+        try:
+            files.append((f.path, base64.b64decode(f.content, validate=True)))
+        except (binascii.Error, ValueError) as exc:
+            raise HTTPException(
+                status_code=422, detail={"path": f.path, "error": f"invalid base64: {exc}"}
+            ) from exc
+    result = await fs.write_many(files, transactional=payload.transactional)
+    body = {
+        "project_id": id,
+        "written": [
+            {"path": path, "size": meta.size, "hash": meta.hash}
+            for path, meta in result.written.items()
+        ],
+        "errors": result.errors,
+        "rolled_back": result.rolled_back,
+    }
+    status = 409 if result.rolled_back else 207 if result.errors else 200
+    return JSONResponse(body, status_code=status)
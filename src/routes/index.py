@@ -1,9 +1,18 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, HTTPException
+from ..services.index_service import IndexService
 from ..services.task_queue import index_task
 
 router = APIRouter()
+index_service = IndexService()
 
 @router.post("/api/projects/{id}/index")
 async def trigger_index(id: int):
     task = index_task.delay(id)
     return {"task_id": task.id, "status": "indexing started", "project_id": id}
+
+@router.get("/api/projects/{id}/index/report")
+async def index_report(id: int):
+    report = index_service.index_report(id)
+    if report is None:
+        raise HTTPException(status_code=404, detail="project has not been indexed")
+    return {"project_id": id, **report}
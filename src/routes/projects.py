@@ -150,8 +150,7 @@ async def list_artifacts(
     for art in artifacts:
         content = art.content
         if not content and art.uri:
-            data = await fs.read_file(art.uri)
-            content = data.tobytes().decode("utf-8")
+            content = await fs.read_text(art.uri)
         resp.append(
             {
                 "id": art.id,
@@ -174,8 +173,7 @@ async def get_contracts(project_id: int, session: AsyncSession = Depends(get_ses
     for art in artifacts:
         content = art.content
         if not content and art.uri:
-            data = await fs.read_file(art.uri)
-            content = data.tobytes().decode("utf-8")
+            content = await fs.read_text(art.uri)
         contracts[art.kind] = content
     return contracts
 
@@ -1,4 +1,7 @@
-from fastapi import APIRouter
+import json
+
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import StreamingResponse
 from typing import Optional
 
 from ..services.index_service import IndexService
@@ -9,7 +12,31 @@ index_service = IndexService()
 
 @router.get("/api/projects/{id}/search")
 async def search_project(
-    id: int, q: str, lang: Optional[str] = None, path: Optional[str] = None
+    id: int,
+    q: str,
+    lang: Optional[str] = None,
+    path: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = None,
+    stream: bool = False,
 ):
-    hits = await index_service.search_index(id, q, lang=lang, path=path)
-    return {"project_id": id, "query": q, "hits": hits}
+    if stream:
+        if cursor:
+            raise HTTPException(status_code=400, detail="cursor is not supported with stream=true")
+
+        async def _ndjson():
+            count = 0
+            async for hit in index_service.iter_search(id, q, lang=lang, path=path, limit=limit):
+                count += 1
+                yield json.dumps(hit) + "\n"
+            yield json.dumps({"done": True, "count": count}) + "\n"
+
+        return StreamingResponse(_ndjson(), media_type="application/x-ndjson")
+
+    try:
+        page = await index_service.search_index(
+            id, q, lang=lang, path=path, limit=limit, cursor=cursor
+        )
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    return {"project_id": id, "query": q, **page}
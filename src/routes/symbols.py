@@ -0,0 +1,18 @@
+from fastapi import APIRouter, Query
+from typing import Optional
+
+from ..services.symbol_service import SymbolService
+
+router = APIRouter()
+symbol_service = SymbolService()
+
+
+@router.get("/api/projects/{id}/symbols")
+async def search_symbols(
+    id: int,
+    q: str = Query(..., min_length=1),
+    kind: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=500),
+):
+    symbols = await symbol_service.search(id, q, kind=kind, limit=limit)
+    return {"project_id": id, "query": q, "symbols": symbols}
@@ -0,0 +1,25 @@
+from fastapi import APIRouter, HTTPException, Query
+from typing import Optional
+
+from ..services.tree_service import TreeService
+
+router = APIRouter()
+tree_service = TreeService()
+
+
+@router.get("/api/projects/{id}/tree")
+async def list_tree(
+    id: int,
+    path: str = "",
+    depth: Optional[int] = Query(None, ge=1),
+    since: Optional[int] = Query(None, ge=0),
+    limit: int = Query(1000, ge=1, le=10000),
+    cursor: Optional[str] = None,
+):
+    try:
+        page = await tree_service.tree(
+            id, path, depth=depth, limit=limit, cursor=cursor, since=since
+        )
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    return {"project_id": id, "path": path.strip("/"), **page}
@@ -0,0 +1,131 @@
+import hashlib
+import json
+import os
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from ..config import settings
+from ..utils import metrics
+
+
+def is_ref(value: Any) -> bool:
+    return isinstance(value, dict) and value.keys() >= {"blob", "size", "kind"}
+
+
+class BlobStore:
+    """Content-addressed local store for large task payloads.
+
+    Celery tasks exchange ``{"blob": sha256, "size": n, "kind": ...}`` refs
+    instead of the payload itself, so the bytes never pass through the
+    broker or the result backend. ``BLOB_STORE_DIR`` must be shared by the
+    API and the workers. Payloads under ``BLOB_INLINE_MAX_BYTES`` stay
+    inline, as a ref costs a file write.
+
+    Blobs are transient: they are not fsynced and are deleted once not
+    written or read for ``BLOB_TTL_S``. Collection runs from :meth:`put` at
+    most every ``ttl / 4`` seconds per process, or via ``gc_blobs_task``.
+    Hits (payload already stored) and misses are under ``task.blobs`` in
+    ``GET /metrics``.
+    """
+
+    def __init__(
+        self,
+        root: Path | str | None = None,
+        inline_max: Optional[int] = None,
+        ttl: Optional[int] = None,
+    ) -> None:
+        self.root = Path(root or settings.BLOB_STORE_DIR)
+        self.inline_max = settings.BLOB_INLINE_MAX_BYTES if inline_max is None else inline_max
+        self.ttl = ttl or settings.BLOB_TTL_S
+        self.counter = metrics.counter("task.blobs")
+        self._last_gc = time.monotonic()
+
+    def _path(self, digest: str) -> Path:
+        if len(digest) != 64 or not all(c in "0123456789abcdef" for c in digest):
+            raise ValueError(f"invalid blob id: {digest!r}")
+        return self.root / digest[:2] / digest
+
+    def put(self, data: bytes, kind: str = "bytes") -> Dict[str, Any]:
+        """Store ``data`` (once per content) and return its ref."""
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._path(digest)
+        try:
+            os.utime(path)  # already stored: keep it alive
+            self.counter.hit()
+        except FileNotFoundError:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{digest}.")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    f.write(data)
+                os.replace(tmp, path)
+            except BaseException:
+                os.unlink(tmp)
+                raise
+            self.counter.miss()
+            self.counter.incr("bytes_written", len(data))
+        if time.monotonic() - self._last_gc > self.ttl / 4:
+            self.gc()
+        return {"blob": digest, "size": len(data), "kind": kind}
+
+    def get(self, ref: Dict[str, Any]) -> bytes:
+        path = self._path(ref["blob"])
+        with open(path, "rb") as f:
+            data = f.read()
+        try:
+            os.utime(path)
+        except OSError:  # pragma: no cover - collected concurrently
+            pass
+        return data
+
+    def pack(self, value: Any) -> Any:
+        """Replace a large str, bytes or JSON-able value by a ref; small ones pass through."""
+        if value is None:
+            return None
+        if isinstance(value, str):
+            data, kind = value.encode("utf-8", errors="surrogatepass"), "text"
+        elif isinstance(value, (bytes, bytearray, memoryview)):
+            data, kind = bytes(value), "bytes"
+        else:
+            data, kind = json.dumps(value, separators=(",", ":")).encode(), "json"
+        if len(data) < self.inline_max:
+            return value
+        return self.put(data, kind)
+
+    def unpack(self, value: Any) -> Any:
+        """Inverse of :meth:`pack`; values that are not refs are returned as is."""
+        if not is_ref(value):
+            return value
+        data = self.get(value)
+        if value["kind"] == "text":
+            return data.decode("utf-8", errors="surrogatepass")
+        if value["kind"] == "json":
+            return json.loads(data)
+        return data
+
+    def gc(self) -> int:
+        """Delete blobs not touched for ``ttl`` seconds; returns how many."""
+        self._last_gc = time.monotonic()
+        cutoff = time.time() - self.ttl
+        removed = 0
+        try:
+            shards = list(os.scandir(self.root))
+        except FileNotFoundError:
+            return 0
+        for shard in shards:
+            if not shard.is_dir():
+                continue
+            for entry in os.scandir(shard.path):
+                try:
+                    if entry.stat().st_mtime < cutoff:
+                        os.unlink(entry.path)
+                        removed += 1
+                except FileNotFoundError:
+                    continue
+        self.counter.incr("collected", removed)
+        return removed
+
+
+blob_store = BlobStore()
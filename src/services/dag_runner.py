@@ -1,10 +1,10 @@
-import asyncio
 from dataclasses import dataclass, field
 from graphlib import TopologicalSorter
 from typing import Any, Dict, List
 
 from celery import group
 
+from . import worker_runtime
 from .task_queue import celery_app
 from .ws_manager import ws_broadcast
 from ..models.enums import JobState
@@ -35,7 +35,7 @@ class DAGRunner:
         self.broadcaster = broadcaster
 
     def _emit(self, event: dict) -> None:
-        asyncio.run(self.broadcaster(event))
+        worker_runtime.run(self.broadcaster(event))
 
     def run(self, plan: Dict, project_id: int, job_id: int) -> JobState:
         dag = plan["dag"]
@@ -1,56 +1,314 @@
 import asyncio
 import difflib
-from typing import Any, Dict, List
+import hashlib
+import re
+from itertools import accumulate
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Dict,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+)
+
+from fastapi import HTTPException
+
+from ..config import settings
+from ..utils import metrics
+from ..utils.cache import LRUCache
+from .fs_service import FSService
+from .git_service import FileChange, GitService
+
+try:  # pragma: no cover - optional dependency
+    import diff_rs
+except Exception:  # pragma: no cover
+    diff_rs = None
+
+# text, or a loader for it (used together with a known hash)
+Text = Union[str, Callable[[], Awaitable[str]]]
+
+
+def _range_start(start: int, length: int) -> int:
+    # as in unified diff headers: 1-based, empty ranges point at the line before
+    return start + 1 if length else start
+
+
+def difflib_ops(a: Sequence[str], b: Sequence[str], context: int = 3) -> List[tuple]:
+    """Pure-Python fallback with the same output as ``diff_rs.compute_ops``."""
+    hunks = []
+    for group in difflib.SequenceMatcher(None, a, b).get_grouped_opcodes(context):
+        i1, i2 = group[0][1], group[-1][2]
+        j1, j2 = group[0][3], group[-1][4]
+        ops: List[Tuple[str, int]] = []
+        for tag, o1, o2, n1, n2 in group:
+            if tag == "equal":
+                ops.append((" ", o2 - o1))
+                continue
+            if tag in ("replace", "delete"):
+                ops.append(("-", o2 - o1))
+            if tag in ("replace", "insert"):
+                ops.append(("+", n2 - n1))
+        hunks.append((_range_start(i1, i2 - i1), i2 - i1, _range_start(j1, j2 - j1), j2 - j1, ops))
+    return hunks
+
+
+def ops_to_lines(
+    a: Sequence[str], b: Sequence[str], old_start: int, new_start: int, ops: Sequence[tuple]
+) -> List[str]:
+    """Expand a compact hunk's ``ops`` back into prefixed lines of ``a`` and ``b``."""
+    i, j = max(old_start - 1, 0), max(new_start - 1, 0)
+    lines: List[str] = []
+    for tag, n in ops:
+        if tag == " ":
+            lines += [" " + line for line in a[i : i + n]]
+            i, j = i + n, j + n
+        elif tag == "-":
+            lines += ["-" + line for line in a[i : i + n]]
+            i += n
+        else:
+            lines += ["+" + line for line in b[j : j + n]]
+            j += n
+    return lines
+
+
+def difflib_hunks(a: Sequence[str], b: Sequence[str], context: int = 3) -> List[tuple]:
+    """Pure-Python fallback with the same output as ``diff_rs.compute_hunks``."""
+    return [
+        (old_start, old_lines, new_start, new_lines, ops_to_lines(a, b, old_start, new_start, ops))
+        for old_start, old_lines, new_start, new_lines, ops in difflib_ops(a, b, context)
+    ]
+
+
+_WORD = re.compile(r"\w+|\s+|[^\w\s]")
+
+
+def _changed_ranges(a: str, b: str, mode: str) -> Tuple[List[List[int]], List[List[int]]]:
+    """Character ranges ``[start, end)`` of ``a`` and ``b`` not common to both."""
+    if mode == "char":
+        ta, tb = list(a), list(b)
+    else:
+        ta, tb = _WORD.findall(a), _WORD.findall(b)
+    offsets_a = list(accumulate(map(len, ta), initial=0))
+    offsets_b = list(accumulate(map(len, tb), initial=0))
+    ranges_a: List[List[int]] = []
+    ranges_b: List[List[int]] = []
+    for tag, i1, i2, j1, j2 in difflib.SequenceMatcher(None, ta, tb, autojunk=False).get_opcodes():
+        if tag == "equal":
+            continue
+        for ranges, offsets, start, end in (
+            (ranges_a, offsets_a, i1, i2),
+            (ranges_b, offsets_b, j1, j2),
+        ):
+            if start == end:
+                continue
+            if ranges and ranges[-1][1] == offsets[start]:
+                ranges[-1][1] = offsets[end]
+            else:
+                ranges.append([offsets[start], offsets[end]])
+    return ranges_a, ranges_b
+
+
+def refine_lines(lines: Sequence[str], mode: str, max_chars: int) -> List[Dict[str, Any]]:
+    """Token (``word``) or ``char`` ranges changed within paired hunk lines.
+
+    Each run of ``-`` lines directly followed by ``+`` lines is paired in
+    order. Pairs longer than ``max_chars`` combined stay line-level only.
+    """
+    out: List[Dict[str, Any]] = []
+    i, n = 0, len(lines)
+    while i < n:
+        if not lines[i].startswith("-"):
+            i += 1
+            continue
+        j = i
+        while j < n and lines[j].startswith("-"):
+            j += 1
+        k = j
+        while k < n and lines[k].startswith("+"):
+            k += 1
+        for old, new in zip(range(i, j), range(j, k)):
+            a, b = lines[old][1:], lines[new][1:]
+            if len(a) + len(b) > max_chars:
+                continue
+            old_ranges, new_ranges = _changed_ranges(a, b, mode)
+            out.append({"old": old, "new": new, "old_ranges": old_ranges, "new_ranges": new_ranges})
+        i = k
+    return out
+
+
+def _sha256(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8", errors="surrogatepass")).hexdigest()
+
+
+def _hunks_size(hunks: List[Dict[str, Any]]) -> int:
+    """Rough in-memory footprint of a hunk list, for the cache's byte cap."""
+    return sum(
+        200
+        + sum(len(line) + 50 for line in h.get("lines", ()))
+        + 60 * len(h.get("ops", ()))
+        + 150 * len(h.get("intraline", ()))
+        for h in hunks
+    )
+
+
+# shared by every DiffService in the process
+_diff_cache = LRUCache(
+    settings.DIFF_CACHE_SIZE,
+    counter=metrics.counter("diff.cache"),
+    maxweight=settings.DIFF_CACHE_MAX_BYTES,
+    weigh=_hunks_size,
+)
 
 
 class DiffService:
-    """Compute diffs between two blobs and return structured hunks."""
+    """Compute diffs between two blobs and return structured hunks.
+
+    Uses the native ``diff_rs`` engine (linear-space Myers or patience, set
+    by ``DIFF_ALGORITHM``) when it is installed and ``difflib`` otherwise.
+
+    With ``intraline`` (``"word"`` or ``"char"``) every hunk also carries the
+    changed ranges within its paired ``-``/``+`` lines, see :func:`refine_lines`.
+
+    With ``compact`` hunks carry run-length ``ops`` (``[" " | "-" | "+",
+    count]``) over the input lines instead of the prefixed lines, so no
+    per-line objects are built for large diffs.
+
+    Results are kept in a process-wide LRU bounded by ``DIFF_CACHE_SIZE``
+    entries and ``DIFF_CACHE_MAX_BYTES``.
+    """
 
-    async def compute_diff(self, before: str, after: str) -> List[Dict[str, Any]]:
+    def __init__(self, algorithm: Optional[str] = None) -> None:
+        self.algorithm = algorithm or settings.DIFF_ALGORITHM
+
+    async def compute_diff(
+        self,
+        before: Text,
+        after: Text,
+        context: int = 3,
+        intraline: Optional[str] = None,
+        before_hash: Optional[str] = None,
+        after_hash: Optional[str] = None,
+        compact: bool = False,
+    ) -> List[Dict[str, Any]]:
+        """Hunks for ``before`` -> ``after``, cached by content hash and options.
+
+        A side may be given as a loader (an async callable returning the
+        text) together with its sha256, e.g. ``FileMeta.hash``; the loader
+        only runs on a cache miss. Cached hunks are shared, do not mutate them.
+        """
+        if intraline not in (None, "word", "char"):
+            raise ValueError(f"unknown intraline mode: {intraline}")
+        if compact and intraline:
+            raise ValueError("intraline ranges need the lines format")
         loop = asyncio.get_event_loop()
+        max_chars = settings.DIFF_INTRALINE_MAX_CHARS
+        options = (context, intraline, max_chars if intraline else None, compact, self.algorithm)
 
-        def _compute() -> List[Dict[str, Any]]:
-            before_lines = before.splitlines()
-            after_lines = after.splitlines()
-            diff_iter = difflib.unified_diff(before_lines, after_lines, lineterm="")
+        def _lookup() -> Tuple[tuple, Optional[List[Dict[str, Any]]]]:
+            key = (before_hash or _sha256(before), after_hash or _sha256(after), *options)
+            return key, _diff_cache.get(key)
 
-            hunks: List[Dict[str, Any]] = []
-            hunk: Dict[str, Any] | None = None
+        key, cached = await loop.run_in_executor(None, _lookup)
+        if cached is not None:
+            return cached
+        if callable(before):
+            before = await before()
+        if callable(after):
+            after = await after()
 
-            for line in diff_iter:
-                if line.startswith("---") or line.startswith("+++"):
-                    continue
-                if line.startswith("@@"):
-                    if hunk:
-                        hunks.append(hunk)
-                    header = line[3:-3]
-                    old_range, new_range = header.split(" ")
-
-                    def _parse(r: str) -> tuple[int, int]:
-                        r = r[1:]  # drop +/-
-                        if "," in r:
-                            start, count = r.split(",")
-                        else:
-                            start, count = r, "1"
-                        return int(start), int(count)
-
-                    old_start, old_len = _parse(old_range)
-                    new_start, new_len = _parse(new_range)
-                    hunk = {
-                        "old_start": old_start,
-                        "old_lines": old_len,
-                        "new_start": new_start,
-                        "new_lines": new_len,
-                        "lines": [],
-                    }
-                else:
-                    if hunk is None:
-                        continue
-                    hunk["lines"].append(line)
-
-            if hunk:
-                hunks.append(hunk)
-            return hunks
+        def _compute() -> List[Dict[str, Any]]:
+            a, b = before.splitlines(), after.splitlines()
+            if diff_rs is not None:
+                # releases the GIL, so concurrent diffs run in parallel on the pool
+                native = diff_rs.compute_ops if compact else diff_rs.compute_hunks
+                hunks = native(a, b, context, self.algorithm)
+            else:
+                hunks = (difflib_ops if compact else difflib_hunks)(a, b, context)
+            result = []
+            for old_start, old_lines, new_start, new_lines, lines in hunks:
+                hunk = {
+                    "old_start": old_start,
+                    "old_lines": old_lines,
+                    "new_start": new_start,
+                    "new_lines": new_lines,
+                    "ops" if compact else "lines": lines,
+                }
+                if intraline:
+                    hunk["intraline"] = refine_lines(lines, intraline, max_chars)
+                result.append(hunk)
+            # key loaded sides by what was read, in case a file changed since its hash
+            _diff_cache.set(
+                (
+                    _sha256(before) if before_hash else key[0],
+                    _sha256(after) if after_hash else key[1],
+                    *options,
+                ),
+                result,
+            )
+            return result
 
         return await loop.run_in_executor(None, _compute)
 
+    async def iter_revision_diff(
+        self,
+        git: GitService,
+        changes: Sequence[FileChange],
+        base: str,
+        head: Optional[str] = None,
+        fs: Optional[FSService] = None,
+        intraline: Optional[str] = None,
+        compact: bool = False,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Hunks per changed file, one file at a time.
+
+        Old contents are read from ``base`` and new ones from ``head`` (or,
+        without it, from the working tree through ``fs``), so only one
+        file pair is in memory at a time. Binary files get no hunks. A
+        working-tree file that cannot be read (outside the root, a
+        directory, no permission) gets ``{status, path, error}`` instead.
+        """
+        fs = fs or FSService(git.workdir)
+        for change in changes:
+            old_path = change.old_path or change.path
+            specs = []
+            if change.status != "added":
+                specs.append(f"{base}:./{old_path}")
+            if change.status != "deleted" and head is not None:
+                specs.append(f"{head}:./{change.path}")
+            blobs = iter(await git.read_blobs(specs) if specs else ())
+            old = next(blobs) if change.status != "added" else b""
+            entry: Dict[str, Any] = {"status": change.status, "path": change.path}
+            if change.old_path:
+                entry.update(old_path=change.old_path, similarity=change.similarity)
+            if change.status == "deleted":
+                new = b""
+            elif head is not None:
+                new = next(blobs)
+            else:
+                try:
+                    new = bytes(await fs.read_file(change.path))
+                except (FileNotFoundError, NotADirectoryError):  # vanished since the listing
+                    new = b""
+                except HTTPException as exc:
+                    yield {**entry, "error": exc.detail}
+                    continue
+                except OSError as exc:
+                    yield {**entry, "error": exc.strerror or str(exc)}
+                    continue
+            old, new = old or b"", new or b""
+
+            if b"\0" in old[:8192] or b"\0" in new[:8192]:
+                entry.update(binary=True, hunks=[])
+            else:
+                entry["hunks"] = await self.compute_diff(
+                    old.decode("utf-8", errors="replace"),
+                    new.decode("utf-8", errors="replace"),
+                    intraline=intraline,
+                    compact=compact,
+                )
+            yield entry
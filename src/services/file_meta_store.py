@@ -0,0 +1,142 @@
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional
+
+from sqlalchemy import String, any_, bindparam, delete, insert
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..config import settings
+from ..models import FileMeta, FileTombstone, Symbol
+
+_UPDATE_COLUMNS = ("size", "mtime", "hash", "lang", "symbols_count", "generation", "last_indexed_at")
+
+
+class FileMetaStore:
+    """Buffered, batched persistence of :class:`FileMeta` rows for one project.
+
+    Rows are written with a multi-row ``INSERT ... ON CONFLICT (project_id,
+    path) DO UPDATE`` and committed every ``batch_size`` rows instead of one
+    round trip per file. Stale rows are deleted ``batch_size`` paths per
+    statement, which keeps every statement within bind-parameter limits.
+
+    Symbols are buffered alongside: on flush the previous symbols of every
+    re-indexed path are deleted and the new ones bulk inserted.
+
+    Rows are stamped with ``generation`` (the generation the next merge
+    will publish) and deleted paths leave a :class:`FileTombstone`, so tree
+    listings can return only what changed since a given generation.
+
+    ``checkpoint`` is awaited right before each commit, so whatever it
+    writes lands in the same transaction as the batch.
+    """
+
+    def __init__(
+        self,
+        session: AsyncSession,
+        project_id: int,
+        batch_size: Optional[int] = None,
+        checkpoint: Optional[Callable[["FileMetaStore"], Awaitable[None]]] = None,
+        generation: int = 0,
+    ) -> None:
+        self.session = session
+        self.project_id = project_id
+        self.batch_size = batch_size or settings.INDEX_BATCH_SIZE
+        self.checkpoint = checkpoint
+        self.generation = generation
+        self.commits = 0
+        self.written = 0
+        self.last_path: Optional[str] = None
+        self._rows: List[Dict[str, Any]] = []
+        self._symbols: Dict[str, List[Dict[str, Any]]] = {}
+        self._dirty = False
+
+    @property
+    def _dialect(self) -> str:
+        return self.session.bind.dialect.name
+
+    def _insert(self, model=FileMeta):
+        if self._dialect == "postgresql":
+            return postgresql.insert(model.__table__)
+        if self._dialect == "sqlite":
+            return sqlite.insert(model.__table__)
+        raise NotImplementedError(f"upsert not supported on {self._dialect}")
+
+    def _path_in(self, column, paths: List[str]):
+        if self._dialect == "postgresql":
+            return column == any_(bindparam("paths", paths, type_=postgresql.ARRAY(String)))
+        return column.in_(paths)
+
+    async def upsert(self, symbols: Optional[List[Dict[str, Any]]] = None, **row: Any) -> None:
+        """Buffer a FileMeta row; ``symbols`` (if given) replace the path's symbols."""
+        row["project_id"] = self.project_id
+        row["generation"] = self.generation
+        self._rows.append(row)
+        if symbols is not None:
+            self._symbols[row["path"]] = symbols
+        if len(self._rows) >= self.batch_size:
+            await self.flush()
+
+    async def delete_paths(self, paths: Iterable[str]) -> int:
+        """Drop ``paths`` and tombstone them, ``batch_size`` paths per statement."""
+        paths = list(paths)
+        if not paths:
+            return 0
+        for start in range(0, len(paths), self.batch_size):
+            chunk = paths[start : start + self.batch_size]
+            for model in (FileMeta, Symbol):
+                await self.session.execute(
+                    delete(model).where(
+                        model.project_id == self.project_id, self._path_in(model.path, chunk)
+                    )
+                )
+            stmt = self._insert(FileTombstone).values(
+                [{"project_id": self.project_id, "path": p, "generation": self.generation} for p in chunk]
+            )
+            await self.session.execute(
+                stmt.on_conflict_do_update(
+                    index_elements=["project_id", "path"],
+                    set_={"generation": stmt.excluded.generation},
+                )
+            )
+        self._dirty = True
+        return len(paths)
+
+    async def flush(self) -> None:
+        """Write buffered rows and commit the current transaction."""
+        if not self._rows and not self._dirty:
+            return
+        if self._rows:
+            stmt = self._insert().values(self._rows)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=["project_id", "path"],
+                set_={col: stmt.excluded[col] for col in _UPDATE_COLUMNS},
+            )
+            await self.session.execute(stmt)
+            await self.session.execute(
+                delete(FileTombstone).where(
+                    FileTombstone.project_id == self.project_id,
+                    self._path_in(FileTombstone.path, [r["path"] for r in self._rows]),
+                )
+            )
+            self.written += len(self._rows)
+            self.last_path = self._rows[-1]["path"]
+            self._rows = []
+        if self._symbols:
+            await self.session.execute(
+                delete(Symbol).where(
+                    Symbol.project_id == self.project_id,
+                    self._path_in(Symbol.path, list(self._symbols)),
+                )
+            )
+            rows = [
+                {"project_id": self.project_id, "path": path, **sym}
+                for path, syms in self._symbols.items()
+                for sym in syms
+            ]
+            if rows:
+                await self.session.execute(insert(Symbol.__table__), rows)
+            self._symbols = {}
+        if self.checkpoint is not None:
+            await self.checkpoint(self)
+        await self.session.commit()
+        self._dirty = False
+        self.commits += 1
@@ -2,16 +2,30 @@ import asyncio
 import hashlib
 import mmap
 import os
+import stat as stat_mod
 import tempfile
-from dataclasses import dataclass
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Any, Dict
+from typing import AsyncIterable, AsyncIterator, Dict, Iterable, List, Optional, Set, Tuple
+
+from fastapi import HTTPException
+
+from ..config import settings
+from ..utils import metrics
+from ..utils.cache import LRUCache
 
 try:  # pragma: no cover - optional dependency
     import fsops_rs
 except Exception:  # pragma: no cover
     fsops_rs = None
 
+# files at least this large are memory-mapped instead of read into memory
+MMAP_THRESHOLD = 1 << 20
+STREAM_CHUNK_SIZE = 1 << 16
+
+_fdatasync = getattr(os, "fdatasync", os.fsync)
+
 
 @dataclass
 class FileMeta:
@@ -22,69 +36,355 @@ class FileMeta:
     hash: str
 
 
+@dataclass
+class BatchWriteResult:
+    """Outcome of :meth:`FSService.write_many`, keyed by the caller's paths."""
+
+    written: Dict[str, FileMeta] = field(default_factory=dict)
+    errors: Dict[str, str] = field(default_factory=dict)
+    rolled_back: bool = False
+    dir_fsyncs: int = 0
+
+
+def _fsync_dir(path: Path) -> None:
+    dir_fd = os.open(path, os.O_RDONLY | getattr(os, "O_DIRECTORY", 0))
+    try:
+        os.fsync(dir_fd)
+    finally:
+        os.close(dir_fd)
+
+
+def _no_symlinks(root: str, path: str) -> bool:
+    """Whether no existing component of ``path`` below ``root`` is a symlink."""
+    d = path
+    while d != root:
+        try:
+            mode = os.lstat(d).st_mode
+        except (FileNotFoundError, NotADirectoryError):  # cannot exist (yet)
+            mode = 0
+        if stat_mod.S_ISLNK(mode):
+            return False
+        d = os.path.dirname(d)
+    return True
+
+
+def _stage(target: Path, content: bytes) -> Tuple[str, str]:
+    """Write ``content`` to a synced temp file next to ``target``; return (tmp, sha256)."""
+    fd, tmp = tempfile.mkstemp(dir=target.parent, prefix=f".{target.name}.")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(content)
+            f.flush()
+            _fdatasync(f.fileno())
+    except BaseException:
+        os.unlink(tmp)
+        raise
+    return tmp, hashlib.sha256(content).hexdigest()
+
+
+# Process-wide caches shared by every FSService, keyed by resolved path and
+# validated against the file's current size/mtime on each lookup.
+_meta_cache = LRUCache(settings.FS_META_CACHE_SIZE, counter=metrics.counter("fs.meta"))
+_content_cache = LRUCache(settings.FS_CONTENT_CACHE_SIZE, counter=metrics.counter("fs.content"))
+
+
 class FSService:
     """File system helper with safe, atomic operations."""
 
     def __init__(self, root: str | Path | None = None) -> None:
         self.root = Path(root or Path.cwd()).resolve()
-        self.meta: Dict[str, FileMeta] = {}
+        self.meta = _meta_cache
+
+    def _remember(self, path: Path, meta: FileMeta) -> None:
+        _content_cache.pop(str(path))
+        self.meta.set(str(path), meta)
+
+    def _escape(self) -> HTTPException:
+        # Translate traversal attempts to HTTP 403 for routes using FSService
+        return HTTPException(status_code=403, detail="Path escapes root directory")
 
     def _safe_path(self, path: str) -> Path:
-        """Return an absolute path ensured to be within the root directory."""
-        from fastapi import HTTPException
-        p = Path(path)
-        if not p.is_absolute():
-            p = self.root / p
-        p = p.resolve()
+        """Return an absolute path ensured to be within the root directory.
+
+        Fast path: a lexically normalized path below root is inside it if no
+        component is a symlink, which costs one ``lstat`` per component and
+        no ``readlink``. Checking the parent alone is not enough: an ancestor
+        moved out of root and replaced by a symlink still leads to the same
+        directory. Anything involving ``..`` or a symlink goes through
+        ``resolve()``.
+        """
+        root = str(self.root)
+        joined = os.path.join(root, path)
+        if ".." not in joined.split(os.sep):
+            lexical = os.path.normpath(joined)
+            if lexical != root and not lexical.startswith(root + os.sep):
+                raise self._escape()
+            if _no_symlinks(root, lexical):
+                return Path(lexical)
+
+        p = Path(joined).resolve()
         try:
             p.relative_to(self.root)
         except ValueError as exc:  # pragma: no cover - simple guard
-            # Translate traversal attempts to HTTP 403 for routes using FSService
-            raise HTTPException(status_code=403, detail="Path escapes root directory") from exc
+            raise self._escape() from exc
         return p
 
-    async def read_file(self, path: str) -> Any:
+    async def read_file(self, path: str) -> memoryview:
+        """Read a file as a read-only ``memoryview`` without decoding it.
+
+        Small files are read into a single ``bytes``; files of at least
+        ``MMAP_THRESHOLD`` bytes are memory-mapped, so no copy of their content
+        is made. Both backends return the same type. Files up to
+        ``FS_CONTENT_CACHE_MAX_FILE_BYTES`` are served from the shared content
+        cache while their size and mtime are unchanged.
+        """
         path_obj = self._safe_path(path)
         loop = asyncio.get_event_loop()
 
-        def _read():
+        def _load() -> memoryview:
             if fsops_rs is not None:  # pragma: no cover - exercised in rust impl
-                result = fsops_rs.read_file(str(path_obj))
-                return memoryview(result) if hasattr(result, "__buffer__") else result
+                return memoryview(fsops_rs.read_file(str(path_obj), MMAP_THRESHOLD))
             with open(path_obj, "rb") as f:
-                mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
-                return memoryview(mm)
+                size = os.fstat(f.fileno()).st_size
+                if size < MMAP_THRESHOLD:
+                    return memoryview(f.read())
+                return memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+
+        def _read() -> memoryview:
+            key = str(path_obj)
+            st = os.stat(path_obj)
+            sig = (st.st_size, st.st_mtime_ns)
+            cached = _content_cache.get(key, validate=lambda entry: entry[0] == sig)
+            if cached is not None:
+                return memoryview(cached[1])
+            data = _load()
+            small = st.st_size <= settings.FS_CONTENT_CACHE_MAX_FILE_BYTES
+            if small and isinstance(data.obj, bytes):
+                _content_cache.set(key, (sig, data.obj))
+            return data
 
         return await loop.run_in_executor(None, _read)
 
+    async def read_text(self, path: str, encoding: str = "utf-8", errors: str = "strict") -> str:
+        """Read and decode a file; the buffer is decoded in place, not copied first."""
+        return str(await self.read_file(path), encoding, errors)
+
     async def write_file(self, path: str, content: bytes) -> FileMeta:
+        """Atomically and durably replace ``path`` with ``content``.
+
+        Both backends write a synced temp file, rename it over the target and
+        fsync the directory, and return the sha256 computed while writing.
+        """
         path_obj = self._safe_path(path)
         loop = asyncio.get_event_loop()
 
         def _write() -> FileMeta:
             path_obj.parent.mkdir(parents=True, exist_ok=True)
             if fsops_rs is not None:  # pragma: no cover - exercised in rust impl
-                fsops_rs.write_file(str(path_obj), content)
+                file_hash = fsops_rs.write_file(str(path_obj), bytes(content))
             else:
-                with tempfile.NamedTemporaryFile(dir=path_obj.parent, delete=False) as tmp:
-                    tmp.write(content)
-                    tmp.flush()
-                    os.fsync(tmp.fileno())
-                    tmp_path = Path(tmp.name)
-                os.replace(tmp_path, path_obj)
-                dir_fd = os.open(
-                    path_obj.parent,
-                    os.O_RDONLY | getattr(os, "O_DIRECTORY", 0),
-                )
-                try:  # ensure rename is durable
-                    os.fsync(dir_fd)
-                finally:
-                    os.close(dir_fd)
+                tmp, file_hash = _stage(path_obj, content)
+                try:
+                    os.replace(tmp, path_obj)
+                except BaseException:
+                    os.unlink(tmp)
+                    raise
+                _fsync_dir(path_obj.parent)  # ensure rename is durable
 
             stat = path_obj.stat()
-            file_hash = hashlib.sha256(content).hexdigest()
             meta = FileMeta(size=stat.st_size, mtime=stat.st_mtime, hash=file_hash)
-            self.meta[str(path_obj)] = meta
+            self._remember(path_obj, meta)
             return meta
 
         return await loop.run_in_executor(None, _write)
+
+    async def stat(self, path: str, known: Optional[FileMeta] = None) -> FileMeta:
+        """Size, mtime and sha256 of a file.
+
+        The hash of ``known`` (e.g. from the index) or of a previous call is
+        reused while size and mtime still match; otherwise the file is hashed.
+        """
+        path_obj = self._safe_path(path)
+        loop = asyncio.get_event_loop()
+
+        def _stat() -> FileMeta:
+            st = path_obj.stat()
+
+            def fresh(meta: FileMeta) -> bool:
+                return (meta.size, meta.mtime) == (st.st_size, st.st_mtime)
+
+            if known is not None and fresh(known):
+                return known
+            cached = self.meta.get(str(path_obj), validate=fresh)
+            if cached is not None:
+                return cached
+            digest = hashlib.sha256()
+            with open(path_obj, "rb") as f:
+                for chunk in iter(lambda: f.read(MMAP_THRESHOLD), b""):
+                    digest.update(chunk)
+            meta = FileMeta(size=st.st_size, mtime=st.st_mtime, hash=digest.hexdigest())
+            self.meta.set(str(path_obj), meta)
+            return meta
+
+        return await loop.run_in_executor(None, _stat)
+
+    async def iter_file(
+        self,
+        path: str,
+        start: int = 0,
+        end: Optional[int] = None,
+        chunk_size: int = STREAM_CHUNK_SIZE,
+    ) -> AsyncIterator[memoryview]:
+        """Yield ``[start, end)`` of a file as slices of the :meth:`read_file` buffer."""
+        data = await self.read_file(path)
+        end = len(data) if end is None else min(end, len(data))
+        for offset in range(start, end, chunk_size):
+            yield data[offset : min(offset + chunk_size, end)]
+
+    async def write_stream(self, path: str, chunks: AsyncIterable[bytes]) -> FileMeta:
+        """Write chunks to a temp file next to ``path``, then fsync and rename it into place.
+
+        Readers see either the old or the complete new content; nothing is
+        left behind if the stream fails part-way.
+        """
+        path_obj = self._safe_path(path)
+        loop = asyncio.get_event_loop()
+        digest = hashlib.sha256()
+        await loop.run_in_executor(None, lambda: path_obj.parent.mkdir(parents=True, exist_ok=True))
+        fd, tmp_name = tempfile.mkstemp(dir=path_obj.parent, prefix=f".{path_obj.name}.")
+        try:
+            with os.fdopen(fd, "wb") as tmp:
+                async for chunk in chunks:
+                    if chunk:
+                        digest.update(chunk)
+                        await loop.run_in_executor(None, tmp.write, chunk)
+                await loop.run_in_executor(None, tmp.flush)
+                await loop.run_in_executor(None, os.fsync, tmp.fileno())
+        except BaseException:
+            os.unlink(tmp_name)
+            raise
+
+        def _commit() -> FileMeta:
+            os.replace(tmp_name, path_obj)
+            dir_fd = os.open(path_obj.parent, os.O_RDONLY | getattr(os, "O_DIRECTORY", 0))
+            try:  # ensure rename is durable
+                os.fsync(dir_fd)
+            finally:
+                os.close(dir_fd)
+            st = path_obj.stat()
+            meta = FileMeta(size=st.st_size, mtime=st.st_mtime, hash=digest.hexdigest())
+            self._remember(path_obj, meta)
+            return meta
+
+        return await loop.run_in_executor(None, _commit)
+
+    async def write_many(
+        self,
+        files: Iterable[Tuple[str, bytes]],
+        transactional: bool = False,
+        workers: int = 8,
+    ) -> BatchWriteResult:
+        """Atomically write many files with one directory fsync per touched directory.
+
+        All contents are staged into temp files first (written and synced
+        concurrently on ``workers`` threads), then renamed into place, then
+        every touched directory is fsynced once. Without ``transactional``
+        each file succeeds or fails on its own. With it, any failure undoes
+        every rename already made, so the batch lands completely or not at all.
+        """
+        targets: Dict[Path, Tuple[str, bytes]] = {}
+        for path, content in files:  # validate everything before touching disk
+            targets[self._safe_path(path)] = (path, content)
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(None, self._write_many, targets, transactional, workers)
+
+    def _write_many(
+        self, targets: Dict[Path, Tuple[str, bytes]], transactional: bool, workers: int
+    ) -> BatchWriteResult:
+        result = BatchWriteResult()
+        dirs: Set[Path] = set()
+        for parent in {t.parent for t in targets}:
+            existing = parent
+            while not existing.exists():
+                existing = existing.parent
+            try:
+                parent.mkdir(parents=True, exist_ok=True)
+            except OSError as e:
+                for target, (path, _) in targets.items():
+                    if target.parent == parent:
+                        result.errors[path] = str(e)
+                continue
+            # each newly created dir is an entry of its parent, up to the
+            # first ancestor that already existed
+            d = parent
+            dirs.add(d)
+            while d != existing:
+                d = d.parent
+                dirs.add(d)
+
+        staged: List[Tuple[Path, str, str]] = []
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="fs-batch") as pool:
+            futures = [
+                (target, pool.submit(_stage, target, content))
+                for target, (_, content) in targets.items()
+                if target.parent in dirs
+            ]
+            for target, fut in futures:
+                try:
+                    tmp, digest = fut.result()
+                except OSError as e:
+                    result.errors[targets[target][0]] = str(e)
+                    continue
+                staged.append((target, tmp, digest))
+
+        if result.errors and transactional:
+            for _, tmp, _ in staged:
+                os.unlink(tmp)
+            result.rolled_back = True
+            return result
+
+        committed: List[Tuple[Path, str, Optional[str]]] = []
+        for i, (target, tmp, digest) in enumerate(staged):
+            backup = None
+            try:
+                if transactional and target.exists():
+                    backup = tmp + ".bak"
+                    os.link(target, backup)
+                os.replace(tmp, target)
+            except OSError as e:
+                result.errors[targets[target][0]] = str(e)
+                if not transactional:
+                    os.unlink(tmp)
+                    continue
+                for _, pending, _ in staged[i:]:
+                    if os.path.exists(pending):
+                        os.unlink(pending)
+                if backup and os.path.exists(backup):
+                    os.unlink(backup)
+                self._rollback(committed)
+                result.rolled_back = True
+                break
+            committed.append((target, digest, backup))
+
+        for d in dirs:
+            _fsync_dir(d)
+            result.dir_fsyncs += 1
+        if result.rolled_back:
+            return result
+
+        for target, digest, backup in committed:
+            if backup:
+                os.unlink(backup)
+            st = target.stat()
+            meta = FileMeta(size=st.st_size, mtime=st.st_mtime, hash=digest)
+            self._remember(target, meta)
+            result.written[targets[target][0]] = meta
+        return result
+
+    @staticmethod
+    def _rollback(committed: List[Tuple[Path, str, Optional[str]]]) -> None:
+        for target, _, backup in reversed(committed):
+            if backup:
+                os.replace(backup, target)
+            else:
+                os.unlink(target)
@@ -1,7 +1,7 @@
 import asyncio
 import subprocess
 from dataclasses import dataclass
-from typing import Optional
+from typing import List, Optional, Sequence
 
 
 @dataclass
@@ -11,6 +11,31 @@ class GitResult:
     stderr: str = ""
 
 
+@dataclass
+class FileChange:
+    """One entry of ``git diff --name-status``; ``old_path`` is set for renames/copies."""
+
+    status: str
+    path: str
+    old_path: Optional[str] = None
+    similarity: Optional[int] = None
+
+
+_STATUSES = {
+    "A": "added",
+    "M": "modified",
+    "D": "deleted",
+    "R": "renamed",
+    "C": "copied",
+    "T": "type_changed",
+}
+
+
+def _check_ref(ref: str) -> None:
+    if not ref or ref.startswith("-"):
+        raise ValueError(f"invalid revision: {ref!r}")
+
+
 class GitService:
     """Minimal git wrapper used by implementer/reviewer flow.
 
@@ -74,3 +99,68 @@ class GitService:
         # Return a synthetic URL; tests can monkeypatch this.
         return f"https://example.local/pr?title={title.replace(' ', '+')}"
 
+    async def changed_files(
+        self, base: str, head: Optional[str] = None, paths: Sequence[str] = ()
+    ) -> List[FileChange]:
+        """Files changed from ``base`` to ``head`` (the working tree if ``None``), with renames.
+
+        Paths are relative to ``workdir``. Raises ``ValueError`` for bad revisions.
+        """
+        _check_ref(base)
+        revs = [base]
+        if head is not None:
+            _check_ref(head)
+            revs.append(head)
+        res = await self._run(
+            "diff", "--name-status", "-z", "-M", "--relative", *revs, "--", *paths
+        )
+        if not res.ok:
+            raise ValueError(res.stderr.strip() or "git diff failed")
+        fields = res.stdout.split("\0")
+        changes: List[FileChange] = []
+        i = 0
+        while i + 1 < len(fields):
+            code = fields[i]
+            kind = _STATUSES.get(code[:1], "modified")
+            if code[:1] in "RC":
+                changes.append(FileChange(kind, fields[i + 2], fields[i + 1], int(code[1:] or 0)))
+                i += 3
+            else:
+                changes.append(FileChange(kind, fields[i + 1]))
+                i += 2
+        return changes
+
+    async def read_blobs(self, specs: Sequence[str]) -> List[Optional[bytes]]:
+        """Contents of ``rev:path`` specs via one ``git cat-file --batch``; missing ones are ``None``.
+
+        Use ``rev:./path`` for paths relative to ``workdir``.
+        """
+        loop = asyncio.get_event_loop()
+
+        def _read() -> List[Optional[bytes]]:
+            proc = subprocess.run(
+                ["git", "cat-file", "--batch"],
+                cwd=self.workdir,
+                input="".join(f"{spec}\n" for spec in specs).encode(),
+                capture_output=True,
+                check=False,
+            )
+            if proc.returncode != 0:
+                raise ValueError(proc.stderr.decode(errors="replace").strip())
+            out, pos = proc.stdout, 0
+            blobs: List[Optional[bytes]] = []
+            for _ in specs:
+                end = out.index(b"\n", pos)
+                header = out[pos:end]
+                pos = end + 1
+                if header.endswith((b" missing", b" ambiguous")):
+                    blobs.append(None)
+                    continue
+                _, kind, size = header.split()
+                data = out[pos : pos + int(size)]
+                pos += int(size) + 1
+                # a submodule or directory at that path has no text to diff
+                blobs.append(data if kind == b"blob" else None)
+            return blobs
+
+        return await loop.run_in_executor(None, _read)
@@ -0,0 +1,145 @@
+import re
+from pathlib import Path
+from typing import List, Optional, Pattern, Tuple
+
+from ..config import settings
+
+IGNORE_FILES = (".gitignore", ".devxignore")
+
+
+def _translate(glob: str) -> str:
+    """Regex source for a gitignore glob (no leading/trailing slash)."""
+    out = []
+    i, n = 0, len(glob)
+    while i < n:
+        c = glob[i]
+        if glob.startswith("**/", i):
+            out.append("(?:.*/)?")
+            i += 3
+            continue
+        if glob.startswith("/**", i) and i + 3 == n:
+            out.append("/.*")
+            i += 3
+            continue
+        if glob.startswith("**", i):
+            out.append(".*")
+            i += 2
+            continue
+        if c == "*":
+            out.append("[^/]*")
+        elif c == "?":
+            out.append("[^/]")
+        elif c == "[":
+            j = glob.find("]", i + 2)
+            if j == -1:
+                out.append(re.escape(c))
+            else:
+                body = glob[i + 1 : j]
+                if body[0] in "!^":
+                    body = "^" + body[1:]
+                out.append("[" + body.replace("\\", "\\\\") + "]")
+                i = j
+        elif c == "\\" and i + 1 < n:
+            i += 1
+            out.append(re.escape(glob[i]))
+        else:
+            out.append(re.escape(c))
+        i += 1
+    return "".join(out)
+
+
+class _Rule:
+    __slots__ = ("base", "regex", "negated", "dir_only")
+
+    def __init__(self, base: str, regex: Pattern[str], negated: bool, dir_only: bool) -> None:
+        self.base = base
+        self.regex = regex
+        self.negated = negated
+        self.dir_only = dir_only
+
+
+def parse_rule(line: str, base: str = "") -> Optional[_Rule]:
+    """Compile one gitignore line relative to ``base`` (a root-relative dir)."""
+    line = line.rstrip("\n")
+    if not line.strip() or line.startswith("#"):
+        return None
+    if not line.endswith("\\ "):
+        line = line.rstrip(" ")
+    negated = line.startswith("!")
+    if negated or line.startswith("\\!") or line.startswith("\\#"):
+        line = line[1:]
+    dir_only = line.endswith("/")
+    line = line.rstrip("/")
+    if not line:
+        return None
+    anchored = "/" in line
+    line = line.lstrip("/")
+    source = _translate(line)
+    if not anchored:
+        source = "(?:.*/)?" + source
+    return _Rule(base, re.compile(source + r"\Z", re.DOTALL), negated, dir_only)
+
+
+class IgnoreRules:
+    """Gitignore-style filter shared by full scans and incremental updates.
+
+    Rules come from ``settings.INDEX_IGNORE`` at the project root plus every
+    ``.gitignore`` / ``.devxignore`` on the way down; later (deeper) rules win
+    and ``!pattern`` re-includes. Paths are project-root relative with ``/``.
+    """
+
+    def __init__(self, root: Path | str, rules: Tuple[_Rule, ...] = ()) -> None:
+        self.root = Path(root)
+        self.rules = rules
+
+    @classmethod
+    def defaults(cls, root: Path | str) -> "IgnoreRules":
+        patterns = [p for p in settings.INDEX_IGNORE.split(",") if p.strip()]
+        return cls(root, tuple(r for r in (parse_rule(p.strip()) for p in patterns) if r))
+
+    def descend(self, rel_dir: str) -> "IgnoreRules":
+        """Rules in effect inside ``rel_dir``, including its own ignore files."""
+        added: List[_Rule] = []
+        for name in IGNORE_FILES:
+            try:
+                with open(self.root / rel_dir / name, encoding="utf-8", errors="replace") as f:
+                    added.extend(r for r in (parse_rule(l, rel_dir) for l in f) if r)
+            except OSError:
+                continue
+        return IgnoreRules(self.root, self.rules + tuple(added)) if added else self
+
+    def ignored(self, rel: str, is_dir: bool) -> bool:
+        result = False
+        for rule in self.rules:
+            if rule.dir_only and not is_dir:
+                continue
+            if rule.base:
+                if not rel.startswith(rule.base + "/"):
+                    continue
+                target = rel[len(rule.base) + 1 :]
+            else:
+                target = rel
+            if rule.regex.match(target):
+                result = not rule.negated
+        return result
+
+    @classmethod
+    def check(cls, root: Path | str, rel: str, is_dir: bool) -> Tuple[bool, "IgnoreRules"]:
+        """Whether ``rel`` or any ancestor is ignored, plus the rules of its parent dir."""
+        rules = cls.defaults(root).descend("")
+        parts = rel.strip("/").split("/")
+        for i in range(1, len(parts)):
+            ancestor = "/".join(parts[:i])
+            if rules.ignored(ancestor, True):
+                return True, rules
+            rules = rules.descend(ancestor)
+        return rules.ignored("/".join(parts), is_dir), rules
+
+
+def is_binary(path: Path | str, sniff: int = 8192) -> bool:
+    """Heuristic used by git: a NUL byte in the first few KiB."""
+    try:
+        with open(path, "rb") as f:
+            return b"\0" in f.read(sniff)
+    except OSError:
+        return False
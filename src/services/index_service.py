@@ -1,108 +1,745 @@
 import asyncio
-import hashlib
-from datetime import datetime
+import base64
+import functools
+import json
+import os
+import socket
+import time
+import uuid
+from datetime import datetime, timedelta
 from pathlib import Path
-from typing import Any, Callable, Optional
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, List, Optional, Tuple
 
-from sqlmodel import select, delete
+import structlog
+from sqlalchemy import or_, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlmodel import select
 
+from ..config import settings
 from ..db import async_session
-from ..models import FileMeta
+from ..models import FileMeta, FileTombstone, IndexState
+from ..utils import metrics
+from ..utils.metrics import HitCounter
+from .file_meta_store import FileMetaStore
+from .fs_service import FileMeta as FileStat, FSService
+from .ignore_rules import IGNORE_FILES, IgnoreRules
+from .query_cache import QueryCache, cache_key
+from .scanner import ScannedFile, TreeScanner
+from .symbol_service import detect_lang, extract_file_symbols, lang_aliases, normalize_lang
 
 try:  # pragma: no cover - optional dependency
     import indexer_rs
 except Exception:  # pragma: no cover
     indexer_rs = None
 
-ProgressCallback = Callable[[int, str], Any]
+ProgressCallback = Callable[[int, str, dict], Any]
+
+log = structlog.get_logger()
+
+_dedup_total = metrics.counter("index.dedup")
+
+# segment temp files younger than this may still be written by index_file
+_SEGMENT_TMP_GRACE_S = 3600
+
+# missing paths per lookup; each adds a LIKE term to one OR expression
+_LOOKUP_CHUNK = 200
+
+# shared by every IndexService in the process
+query_cache = QueryCache()
+
+
+async def _notify(progress_cb: ProgressCallback, percent: int, path: str, stats: dict) -> None:
+    if asyncio.iscoroutinefunction(progress_cb):
+        await progress_cb(percent, path, stats)
+    else:  # pragma: no cover - sync callbacks
+        progress_cb(percent, path, stats)
+
+
+def encode_cursor(offset: int) -> str:
+    return base64.urlsafe_b64encode(f"o:{offset}".encode()).decode().rstrip("=")
+
+
+def _decode(cursor: str, kind: str) -> str:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        prefix, value = raw.split(":", 1)
+    except Exception as exc:
+        raise ValueError("invalid cursor") from exc
+    if prefix != kind:
+        raise ValueError("invalid cursor")
+    return value
+
+
+def decode_cursor(cursor: str | None) -> int:
+    if not cursor:
+        return 0
+    try:
+        offset = int(_decode(cursor, "o"))
+    except ValueError as exc:
+        raise ValueError("invalid cursor") from exc
+    if offset < 0:
+        raise ValueError("invalid cursor")
+    return offset
+
+
+def encode_search_cursor(score: float, path: str) -> str:
+    """Keyset cursor: the (score, path) of the last hit on a page."""
+    raw = f"k:{score!r}:{path}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_search_cursor(cursor: str | None) -> Optional[Tuple[float, str]]:
+    if not cursor:
+        return None
+    score, sep, path = _decode(cursor, "k").partition(":")
+    try:
+        value = float(score)
+    except ValueError as exc:
+        raise ValueError("invalid cursor") from exc
+    if not sep or value != value:
+        raise ValueError("invalid cursor")
+    return value, path
+
+
+def _hit(result: tuple) -> Dict[str, Any]:
+    path, score, snippets = result
+    return {
+        "path": path,
+        "score": round(score, 4),
+        "snippets": [
+            {"line": line, "text": text, "matches": [list(m) for m in matches]}
+            for line, text, matches in snippets
+        ],
+    }
+
+
+def _outermost(paths: List[str]) -> List[str]:
+    """``paths`` without those below another one of them."""
+    present = set(paths)
+    return [
+        p for p in paths
+        if not any(p[:i] in present for i, c in enumerate(p) if c == "/")
+    ]
+
+
+def _lease_owner() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+def _lease_expiry() -> datetime:
+    return datetime.utcnow() + timedelta(seconds=settings.INDEX_LEASE_TTL_S)
 
 
 class IndexService:
     async def build_index(
-        self, project_id: int, progress_cb: Optional[ProgressCallback] = None
+        self,
+        project_id: int,
+        progress_cb: Optional[ProgressCallback] = None,
+        lease_id: Optional[str] = None,
     ) -> dict:
-        """(Re)build index incrementally for a project."""
+        """(Re)build index incrementally for a project.
+
+        The tree is walked, stat'ed and hashed by :class:`TreeScanner` on a
+        thread pool; changed files are handed to the indexer as soon as they
+        are found instead of after the whole tree has been hashed.
+
+        Only one build per project runs at a time: others return
+        ``{"status": "in_progress"}``. The lease is renewed by a heartbeat
+        for the whole build. ``lease_id`` (the Celery task id) names its
+        owner, so a redelivered task whose worker died holding the lease
+        takes it back at once instead of waiting for it to expire. Every
+        committed batch records a checkpoint, and a build that follows an
+        interrupted one only redoes files committed after the last
+        checkpoint (everything before is already in ``FileMeta``) and
+        always re-merges the postings.
+        """
 
         if indexer_rs is None:
             return {}
 
-        root = Path(f"/projects/{project_id}")
+        root = self.project_root(project_id)
         if not root.exists():
             return {}
 
-        loop = asyncio.get_event_loop()
+        owner = lease_id or _lease_owner()
+        async with async_session() as session:
+            holder = await self._acquire_lease(session, project_id, owner)
+        if holder != owner:
+            return {"status": "in_progress", "lease_owner": holder}
+
+        heartbeat = asyncio.ensure_future(self._heartbeat(project_id, owner))
+        finished = False
+        try:
+            result = await self._build(project_id, root, owner, progress_cb)
+            finished = True
+            return result
+        finally:
+            heartbeat.cancel()
+            await self._release_lease(project_id, owner, "done" if finished else "running")
+
+    async def _build(
+        self, project_id: int, root: Path, owner: str, progress_cb: Optional[ProgressCallback]
+    ) -> dict:
+        scanner = TreeScanner(root)
+        index_dir = str(self.index_dir(project_id))
+        dedup = HitCounter()
 
         async with async_session() as session:
+            state = (
+                await session.execute(
+                    select(IndexState).where(IndexState.project_id == project_id)
+                )
+            ).scalar_one()
+            resumed = state.status == "running"
+            base_batch = state.checkpoint_batch if resumed else 0
+            base_files = state.checkpoint_files if resumed else 0
+            resumed_from = (
+                {"batch": base_batch, "files": base_files, "path": state.checkpoint_path}
+                if resumed
+                else None
+            )
+            await session.execute(
+                update(IndexState)
+                .where(IndexState.project_id == project_id)
+                .values(
+                    status="running",
+                    checkpoint_batch=base_batch,
+                    checkpoint_files=base_files,
+                    checkpoint_generation=state.generation,
+                )
+            )
+            await session.commit()
+
+            async def checkpoint(s: FileMetaStore) -> None:
+                await session.execute(
+                    update(IndexState)
+                    .where(IndexState.project_id == project_id, IndexState.lease_owner == owner)
+                    .values(
+                        checkpoint_batch=base_batch + s.commits + 1,
+                        checkpoint_files=base_files + s.written,
+                        checkpoint_path=s.last_path,
+                        lease_expires_at=_lease_expiry(),
+                    )
+                )
+
             existing = await session.execute(
-                select(FileMeta).where(FileMeta.project_id == project_id)
+                select(FileMeta.path, FileMeta.size, FileMeta.mtime).where(
+                    FileMeta.project_id == project_id
+                )
+            )
+            known = {path: (size, mtime) for path, size, mtime in existing.all()}
+            # merges only run under the lease, so nothing else can publish this
+            store = FileMetaStore(
+                session, project_id, checkpoint=checkpoint, generation=state.generation + 1
             )
-            meta_map = {m.path: m for m in existing.scalars().all()}
-
-            files_on_disk = [p for p in root.rglob("*") if p.is_file()]
-            changed = []
-            for file_path in files_on_disk:
-                rel = str(file_path.relative_to(root))
-                stat = file_path.stat()
-                meta = meta_map.get(rel)
-                if meta and meta.size == stat.st_size and meta.mtime == stat.st_mtime:
+
+            current_paths = set()
+            total = 0
+            percent = 0
+            async for item in scanner.scan(known):
+                current_paths.add(item.rel)
+                if not item.changed:
                     continue
-                content = file_path.read_bytes()
-                file_hash = hashlib.sha256(content).hexdigest()
-                changed.append((file_path, rel, stat, file_hash))
-
-            total = len(changed)
-            for idx, (file_path, rel, stat, file_hash) in enumerate(changed, start=1):
-                await loop.run_in_executor(None, indexer_rs.build_index, str(file_path))
-                meta = meta_map.get(rel)
-                now = datetime.utcnow()
-                if meta:
-                    meta.size = stat.st_size
-                    meta.mtime = stat.st_mtime
-                    meta.hash = file_hash
-                    meta.last_indexed_at = now
-                else:
-                    meta = FileMeta(
-                        project_id=project_id,
-                        path=rel,
-                        size=stat.st_size,
-                        mtime=stat.st_mtime,
-                        hash=file_hash,
-                        lang=file_path.suffix.lstrip(".") or None,
-                        symbols_count=0,
-                        last_indexed_at=now,
-                    )
-                session.add(meta)
-                await session.commit()
+                await self._index_file(store, item, dedup)
+                total += 1
                 if progress_cb:
-                    percent = int(idx * 100 / total) if total else 100
-                    if asyncio.iscoroutinefunction(progress_cb):
-                        await progress_cb(percent, rel)
-                    else:  # pragma: no cover - sync callbacks
-                        progress_cb(percent, rel)
-
-            current_paths = {str(p.relative_to(root)) for p in files_on_disk}
-            stale = set(meta_map.keys()) - current_paths
-            for rel in stale:
-                await session.execute(
-                    delete(FileMeta).where(
-                        FileMeta.project_id == project_id, FileMeta.path == rel
+                    # the walk is still fanning out, so never report going backwards
+                    stats = scanner.stats
+                    percent = max(percent, int(stats.checked * 100 / max(stats.discovered, 1)))
+                    await _notify(progress_cb, percent, item.rel, stats.snapshot())
+
+            removed = await store.delete_paths(set(known) - current_paths)
+            await store.flush()
+
+            # an interrupted build may have committed rows it never merged
+            if total or removed or resumed or not (Path(index_dir) / "postings.bin").exists():
+                await self._merge(session, project_id, index_dir, store.generation)
+
+        if progress_cb:
+            await _notify(progress_cb, 100, "", scanner.stats.snapshot())
+        result = {
+            "indexed": total,
+            "removed": removed,
+            "commits": store.commits,
+            "throughput": scanner.stats.snapshot(),
+            "dedup": dedup.snapshot(),
+            "skipped": scanner.stats.skipped_report(),
+            "resumed_from": resumed_from,
+        }
+        self._write_report(project_id, result)
+        return result
+
+    async def _acquire_lease(
+        self, session: AsyncSession, project_id: int, owner: str
+    ) -> Optional[str]:
+        """Take the project's build lease if free, expired or already ``owner``'s; return its holder."""
+        now = datetime.utcnow()
+        stmt = (
+            update(IndexState)
+            .where(
+                IndexState.project_id == project_id,
+                or_(
+                    IndexState.lease_owner.is_(None),
+                    IndexState.lease_expires_at < now,
+                    IndexState.lease_owner == owner,
+                ),
+            )
+            .values(lease_owner=owner, lease_expires_at=_lease_expiry())
+        )
+        if (await session.execute(stmt)).rowcount:
+            await session.commit()
+            return owner
+        holder = (
+            await session.execute(
+                select(IndexState.lease_owner).where(IndexState.project_id == project_id)
+            )
+        ).first()
+        if holder is not None:
+            await session.rollback()
+            return holder[0]
+        session.add(
+            IndexState(project_id=project_id, lease_owner=owner, lease_expires_at=_lease_expiry())
+        )
+        try:
+            await session.commit()
+        except IntegrityError:  # another build created the row first
+            await session.rollback()
+            return None
+        return owner
+
+    async def _heartbeat(self, project_id: int, owner: str) -> None:
+        """Renew the lease every third of its TTL until cancelled.
+
+        Batches renew it too, but a walk without changes or a long merge
+        commits nothing for a while.
+        """
+        interval = max(settings.INDEX_LEASE_TTL_S / 3, 0.05)
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                async with async_session() as session:
+                    renewed = await session.execute(
+                        update(IndexState)
+                        .where(IndexState.project_id == project_id, IndexState.lease_owner == owner)
+                        .values(lease_expires_at=_lease_expiry())
                     )
-                )
-            if stale:
-                await session.commit()
+                    await session.commit()
+            except Exception as e:  # retried on the next beat
+                log.warning("index.lease_heartbeat_failed", project_id=project_id, error=str(e))
+                continue
+            if not renewed.rowcount:
+                log.warning("index.lease_lost", project_id=project_id, owner=owner)
+                return
 
-        return {"indexed": total}
+    async def _release_lease(self, project_id: int, owner: str, status: Optional[str] = None) -> None:
+        """Drop ``owner``'s lease; ``status`` (if given) records how the build ended."""
+        values: Dict[str, Any] = {"lease_owner": None, "lease_expires_at": None}
+        if status is not None:
+            values["status"] = status
+        # fresh session: the build's own may be unusable after an error
+        async with async_session() as session:
+            await session.execute(
+                update(IndexState)
+                .where(IndexState.project_id == project_id, IndexState.lease_owner == owner)
+                .values(**values)
+            )
+            await session.commit()
+
+    async def apply_changes(self, project_id: int, paths: Iterable[str]) -> dict:
+        """Apply per-file index deltas for ``paths`` relative to the project root.
+
+        Existing files are re-hashed and re-indexed, directories are scanned,
+        and paths that no longer exist are dropped together with anything
+        indexed below them. Paths that are ignored, binary or too large are
+        dropped the same way. The batch is published as a delta overlay (see
+        :meth:`_merge`), so its cost follows the number of changed files.
+
+        Batches take the project's build lease, so they never merge while a
+        build does; while one holds it ``{"status": "in_progress"}`` is
+        returned and the caller retries the paths later.
+
+        A change to an ignore file reconciles the whole project instead.
+        """
 
-    async def search_index(
-        self, project_id: int, query: str, lang: str | None = None, path: str | None = None
-    ) -> Any:
         if indexer_rs is None:
-            return []
+            return {}
+
+        paths = sorted(set(paths))
+        if any(Path(rel).name in IGNORE_FILES for rel in paths):
+            return await self.build_index(project_id)
+
+        owner = _lease_owner()
+        async with async_session() as session:
+            holder = await self._acquire_lease(session, project_id, owner)
+        if holder != owner:
+            return {"status": "in_progress", "lease_owner": holder}
+        heartbeat = asyncio.ensure_future(self._heartbeat(project_id, owner))
+        try:
+            return await self._apply(project_id, paths)
+        finally:
+            heartbeat.cancel()
+            # an interrupted build stays "running" so its retry resumes
+            await self._release_lease(project_id, owner)
+
+    async def _apply(self, project_id: int, paths: List[str]) -> dict:
+        root = self.project_root(project_id)
+        index_dir = str(self.index_dir(project_id))
+        loop = asyncio.get_event_loop()
+        dedup = HitCounter()
+        scanner = TreeScanner(root)
+
+        changed: List[ScannedFile] = []
+        missing: List[str] = []
+        for rel in paths:
+            path = root / rel
+            is_dir = path.is_dir()
+            ignored, rules = await loop.run_in_executor(None, IgnoreRules.check, root, rel, is_dir)
+            if ignored:
+                # ignored files never get rows; a directory may hold rows from
+                # before it was ignored
+                if is_dir:
+                    missing.append(rel)
+            elif is_dir:
+                async for item in scanner.scan(start=rel, rules=rules):
+                    changed.append(item)
+            elif path.is_file():
+                item = await loop.run_in_executor(None, scanner.check_file, rel)
+                if item is None or item.skipped:
+                    missing.append(rel)
+                else:
+                    changed.append(item)
+            else:
+                missing.append(rel)
+
+        next_generation = await self.generation(project_id) + 1
+        async with async_session() as session:
+            store = FileMetaStore(session, project_id, generation=next_generation)
+            for item in changed:
+                await self._index_file(store, item, dedup)
+            gone: List[str] = []
+            roots = _outermost(missing)
+            for start in range(0, len(roots), _LOOKUP_CHUNK):
+                chunk = roots[start : start + _LOOKUP_CHUNK]
+                stmt = select(FileMeta.path).where(
+                    FileMeta.project_id == project_id,
+                    or_(
+                        FileMeta.path.in_(chunk),
+                        *(FileMeta.path.startswith(f"{m}/", autoescape=True) for m in chunk),
+                    ),
+                )
+                gone += (await session.execute(stmt)).scalars().all()
+            removed = await store.delete_paths(gone) if gone else 0
+            await store.flush()
+            if changed or removed:
+                await self._merge(
+                    session, project_id, index_dir, next_generation, incremental=True
+                )
+
+        return {"indexed": len(changed), "removed": removed, "dedup": dedup.snapshot()}
+
+    async def _tokenize(self, path: Path | str, file_hash: str, dedup: HitCounter) -> None:
+        """Tokenize into the shared segment store unless the content is already there."""
+        loop = asyncio.get_event_loop()
+        created = await loop.run_in_executor(
+            None, indexer_rs.index_file, str(self.segment_store()), str(path), file_hash
+        )
+        for c in (dedup, _dedup_total):
+            if created:
+                c.miss()
+            else:
+                c.hit()
+
+    async def _index_file(self, store: FileMetaStore, item: ScannedFile, dedup: HitCounter) -> None:
+        await self._tokenize(item.path, item.hash, dedup)
+        lang = detect_lang(item.path)
+        loop = asyncio.get_event_loop()
+        symbols = await loop.run_in_executor(None, extract_file_symbols, item.path, lang)
+        await store.upsert(
+            path=item.rel,
+            size=item.size,
+            mtime=item.mtime,
+            hash=item.hash,
+            lang=lang,
+            symbols_count=len(symbols),
+            last_indexed_at=datetime.utcnow(),
+            symbols=[vars(s) for s in symbols],
+        )
+
+    async def _merge(
+        self,
+        session: AsyncSession,
+        project_id: int,
+        index_dir: str,
+        generation: int,
+        incremental: bool = False,
+    ) -> None:
+        """Publish the committed ``FileMeta`` rows as index ``generation``.
+
+        ``generation`` is the one the rows were stamped with; callers hold
+        the project's lease, so it is still the next one.
+
+        A full merge rewrites ``postings.bin`` from every document. An
+        ``incremental`` one only rewrites ``delta.bin`` with the documents
+        written since the last full merge (and masks those and the removed
+        ones in ``postings.bin``), so it costs O(changes since then). Once
+        that set exceeds ``INDEX_DELTA_MAX_DOCS`` the merge is full again,
+        which also folds the overlay back in.
+        """
+        store = str(self.segment_store())
+        base = (
+            await session.execute(
+                select(IndexState.base_generation).where(IndexState.project_id == project_id)
+            )
+        ).scalar() or 0
+        if incremental and base and (Path(index_dir) / "postings.bin").exists():
+            result = await session.execute(
+                select(FileMeta.path, FileMeta.hash, FileMeta.size)
+                .where(FileMeta.project_id == project_id, FileMeta.generation > base)
+                .order_by(FileMeta.path)
+                .limit(settings.INDEX_DELTA_MAX_DOCS + 1)
+            )
+            docs = [tuple(d) for d in result.all()]
+            removed = (
+                await session.execute(
+                    select(FileTombstone.path)
+                    .where(FileTombstone.project_id == project_id, FileTombstone.generation > base)
+                    .limit(settings.INDEX_DELTA_MAX_DOCS + 1)
+                )
+            ).scalars().all()
+            if len(docs) + len(removed) <= settings.INDEX_DELTA_MAX_DOCS:
+                masked = sorted({path for path, _, _ in docs}.union(removed))
+                await self._write_postings(
+                    project_id, indexer_rs.build_delta, index_dir, store, docs, masked
+                )
+                await self._bump_generation(session, project_id, generation)
+                return
+
+        result = await session.execute(
+            select(FileMeta.path, FileMeta.hash, FileMeta.size)
+            .where(FileMeta.project_id == project_id)
+            .order_by(FileMeta.path)
+        )
+        docs = [tuple(d) for d in result.all()]
+        await self._write_postings(project_id, indexer_rs.build_index, index_dir, store, docs)
+        await self._bump_generation(session, project_id, generation, full=True)
+
+    async def _write_postings(
+        self, project_id: int, build: Callable[..., List[str]], index_dir: str, store: str, docs, *args
+    ) -> None:
         loop = asyncio.get_event_loop()
-        search_q = query
+        missing = await loop.run_in_executor(None, build, index_dir, store, docs, *args)
+        if not missing:
+            return
+        # unchanged files whose segment was collected (or predates the shared
+        # store) are tokenized again and the merge is repeated once
+        hashes = {path: file_hash for path, file_hash, _ in docs}
+        root = self.project_root(project_id)
+        for rel in missing:
+            try:
+                await self._tokenize(root / rel, hashes[rel], HitCounter())
+            except Exception:  # pragma: no cover - vanished since the scan
+                continue
+        await loop.run_in_executor(None, build, index_dir, store, docs, *args)
+
+    async def _bump_generation(
+        self, session: AsyncSession, project_id: int, generation: int, full: bool = False
+    ) -> None:
+        values = {"generation": generation, "updated_at": datetime.utcnow()}
+        if full:
+            values["base_generation"] = generation
+        stmt = (
+            update(IndexState)
+            .where(IndexState.project_id == project_id, IndexState.generation < generation)
+            .values(**values)
+        )
+        if not (await session.execute(stmt)).rowcount:
+            # only possible if the lease expired and another merge went first
+            await session.rollback()
+            raise RuntimeError(f"index generation {generation} was already published")
+        await session.commit()
+
+    async def generation(self, project_id: int) -> int:
+        """Current index generation of a project (0 if never indexed)."""
+        async with async_session() as session:
+            result = await session.execute(
+                select(IndexState.generation).where(IndexState.project_id == project_id)
+            )
+            return result.scalar() or 0
+
+    async def stat_file(
+        self,
+        fs: FSService,
+        project_id: int,
+        path: str,
+        session: Optional[AsyncSession] = None,
+    ) -> Optional[FileStat]:
+        """Current size/mtime/sha256 of a project file, reusing the indexed hash while unchanged.
+
+        Returns ``None`` if the path is not a file.
+        """
+        stmt = select(FileMeta).where(FileMeta.project_id == project_id, FileMeta.path == path)
+        if session is None:
+            async with async_session() as session:
+                row = (await session.execute(stmt)).scalars().first()
+        else:
+            row = (await session.execute(stmt)).scalars().first()
+        known = FileStat(size=row.size, mtime=row.mtime, hash=row.hash) if row else None
+        try:
+            return await fs.stat(path, known=known)
+        except (FileNotFoundError, IsADirectoryError, NotADirectoryError):
+            return None
+
+    async def gc_segments(self) -> int:
+        """Delete store segments no longer referenced by any project's FileMeta.
+
+        Temp files (``<hash>.tmp<pid>-<n>``) belong to an ``index_file`` still
+        writing its segment; they are only removed once older than
+        ``_SEGMENT_TMP_GRACE_S``, i.e. left behind by a crashed writer.
+        """
+        async with async_session() as session:
+            live = set((await session.execute(select(FileMeta.hash).distinct())).scalars().all())
+        store = self.segment_store()
+
+        def _sweep() -> int:
+            removed = 0
+            cutoff = time.time() - _SEGMENT_TMP_GRACE_S
+            for seg in store.glob("*/*"):
+                if ".tmp" in seg.name:
+                    try:
+                        if seg.stat().st_mtime >= cutoff:
+                            continue
+                    except OSError:  # renamed into place meanwhile
+                        continue
+                elif seg.name in live:
+                    continue
+                seg.unlink(missing_ok=True)
+                removed += 1
+            return removed
+
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(None, _sweep)
+
+    def _write_report(self, project_id: int, result: dict) -> None:
+        keys = ("indexed", "removed", "throughput", "skipped", "resumed_from")
+        report = {k: result[k] for k in keys}
+        path = self.index_dir(project_id) / "report.json"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(report))
+
+    def index_report(self, project_id: int) -> Optional[dict]:
+        """Summary of the last full build, including bytes skipped per filter."""
+        try:
+            return json.loads((self.index_dir(project_id) / "report.json").read_text())
+        except (OSError, ValueError):
+            return None
+
+    @staticmethod
+    def project_root(project_id: int) -> Path:
+        return Path(settings.PROJECTS_ROOT) / str(project_id)
+
+    @staticmethod
+    def index_dir(project_id: int) -> Path:
+        return Path(settings.INDEX_DIR) / str(project_id)
+
+    @staticmethod
+    def segment_store() -> Path:
+        return Path(settings.INDEX_DIR) / "objects"
+
+    async def _allowed_paths(
+        self, project_id: int, lang: str | None, path: str | None
+    ) -> Optional[List[str]]:
+        """Resolve ``lang`` and ``path`` (a path prefix) against :class:`FileMeta`."""
+        if not (lang or path):
+            return None
+        stmt = select(FileMeta.path).where(FileMeta.project_id == project_id)
         if lang:
-            search_q += f" lang:{lang}"
+            # depends on normalize_lang(lang) only, like the cache key
+            stmt = stmt.where(FileMeta.lang.in_(sorted(lang_aliases(lang))))
         if path:
-            search_q += f" path:{path}"
-        result = await loop.run_in_executor(None, indexer_rs.search_index, search_q)
-        return memoryview(result) if hasattr(result, "__buffer__") else result
+            stmt = stmt.where(FileMeta.path.startswith(path.lstrip("/"), autoescape=True))
+        async with async_session() as session:
+            return list((await session.execute(stmt)).scalars().all())
+
+    async def search_index(
+        self,
+        project_id: int,
+        query: str,
+        lang: str | None = None,
+        path: str | None = None,
+        limit: int = 50,
+        cursor: str | None = None,
+    ) -> Dict[str, Any]:
+        """Return one page of BM25-ranked hits and the cursor of the next page.
+
+        The cursor is a keyset on the last hit's (score, path), so the indexer
+        only keeps the ``limit`` hits ranked after it however deep the page.
+        Pages are cached per index generation, see :class:`QueryCache`.
+        Raises ``ValueError`` for a malformed ``cursor``.
+        """
+        after = decode_search_cursor(cursor)
+        page: Dict[str, Any] = {"hits": [], "next_cursor": None}
+        if indexer_rs is None:
+            return page
+        key = cache_key(
+            project_id,
+            await self.generation(project_id),
+            query,
+            lang=normalize_lang(lang) if lang else None,
+            path=path.lstrip("/") if path else None,
+            limit=limit,
+            after=list(after) if after else None,
+        )
+        cached = await query_cache.get(key)
+        if cached is not None:
+            return cached
+        allowed = await self._allowed_paths(project_id, lang, path)
+        if allowed == []:
+            return page
+        loop = asyncio.get_event_loop()
+        search = functools.partial(
+            indexer_rs.search_index,
+            str(self.index_dir(project_id)),
+            str(self.project_root(project_id)),
+            query,
+            allowed,
+            limit + 1,
+            after=after,
+        )
+        result = await loop.run_in_executor(None, search)
+        page["hits"] = [_hit(r) for r in result[:limit]]
+        if len(result) > limit:
+            last = result[limit - 1]
+            page["next_cursor"] = encode_search_cursor(last[1], last[0])
+        await query_cache.set(key, page)
+        return page
+
+    async def iter_search(
+        self,
+        project_id: int,
+        query: str,
+        lang: str | None = None,
+        path: str | None = None,
+        limit: int = 50,
+        chunk_size: int = 64,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Yield hits as candidate chunks are verified, best first within a chunk."""
+        if indexer_rs is None:
+            return
+        allowed = await self._allowed_paths(project_id, lang, path)
+        if allowed == []:
+            return
+        loop = asyncio.get_event_loop()
+        index_dir = str(self.index_dir(project_id))
+        root = str(self.project_root(project_id))
+        docs = await loop.run_in_executor(None, indexer_rs.candidates, index_dir, query, allowed)
+        sent = 0
+        for start in range(0, len(docs), chunk_size):
+            scored = await loop.run_in_executor(
+                None, indexer_rs.score_docs, index_dir, root, query, docs[start : start + chunk_size]
+            )
+            for r in scored:
+                yield _hit(r)
+                sent += 1
+                if sent >= limit:
+                    return
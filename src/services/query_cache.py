@@ -0,0 +1,89 @@
+import hashlib
+import json
+import string
+from typing import Any, Optional
+
+import structlog
+
+from ..config import settings
+from ..utils import metrics
+from ..utils.cache import LRUCache
+
+try:  # pragma: no cover - optional dependency
+    from redis import asyncio as aioredis
+except Exception:  # pragma: no cover
+    aioredis = None
+
+log = structlog.get_logger()
+
+_KEY_PREFIX = "devinx:search:"
+
+
+_ASCII_LOWER = str.maketrans(string.ascii_uppercase, string.ascii_lowercase)
+
+
+def normalize_query(query: str) -> str:
+    """Same term set the indexer searches for: ASCII-lowercased, deduplicated, sorted.
+
+    Only ASCII is folded, like the indexer's matcher; ``"Ä"`` and ``"ä"``
+    are different queries.
+    """
+    return " ".join(sorted({t.translate(_ASCII_LOWER) for t in query.split()}))
+
+
+def cache_key(project_id: int, generation: int, query: str, **filters: Any) -> str:
+    raw = json.dumps(
+        [project_id, generation, normalize_query(query), sorted(filters.items())],
+        separators=(",", ":"),
+    )
+    return _KEY_PREFIX + hashlib.sha1(raw.encode()).hexdigest()
+
+
+class QueryCache:
+    """Search result cache: an in-process LRU in front of optional Redis.
+
+    Keys embed the project's index generation, so a rebuild makes old
+    entries unreachable; they age out of the LRU and expire in Redis. With
+    ``SEARCH_CACHE_REDIS`` the API and worker processes share hits. Redis
+    errors degrade to the local cache only.
+    """
+
+    def __init__(
+        self,
+        maxsize: Optional[int] = None,
+        ttl: Optional[int] = None,
+        use_redis: Optional[bool] = None,
+    ) -> None:
+        self.ttl = ttl or settings.SEARCH_CACHE_TTL_S
+        self.counter = metrics.counter("search.cache")
+        self.local = LRUCache(maxsize or settings.SEARCH_CACHE_SIZE, self.ttl, self.counter)
+        if use_redis is None:
+            use_redis = settings.SEARCH_CACHE_REDIS
+        self._redis = None
+        if use_redis and aioredis is not None:
+            self._redis = aioredis.from_url(settings.REDIS_URL)
+
+    async def get(self, key: str) -> Optional[Any]:
+        value = self.local.get(key)
+        if value is not None or self._redis is None:
+            return value
+        try:
+            raw = await self._redis.get(key)
+        except Exception as e:
+            log.warning("search_cache.redis_error", op="get", error=str(e))
+            return None
+        if raw is None:
+            return None
+        self.counter.incr("redis_hits")
+        value = json.loads(raw)
+        self.local.set(key, value)
+        return value
+
+    async def set(self, key: str, value: Any) -> None:
+        self.local.set(key, value)
+        if self._redis is None:
+            return
+        try:
+            await self._redis.set(key, json.dumps(value), ex=self.ttl)
+        except Exception as e:
+            log.warning("search_cache.redis_error", op="set", error=str(e))
@@ -0,0 +1,262 @@
+import asyncio
+import hashlib
+import os
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import AsyncIterator, Deque, Dict, List, Optional, Tuple
+
+from ..config import settings
+from .ignore_rules import IgnoreRules, is_binary
+
+SKIP_REASONS = ("ignored", "binary", "too_large")
+
+
+@dataclass
+class ScannedFile:
+    """A regular file found under the scan root.
+
+    ``hash`` is only populated when the file changed relative to the known
+    (size, mtime) pair passed to :meth:`TreeScanner.scan`. ``skipped`` names
+    the filter that excluded the file from indexing, if any.
+    """
+
+    path: Path
+    rel: str
+    size: int
+    mtime: float
+    hash: Optional[str] = None
+    skipped: Optional[str] = None
+
+    @property
+    def changed(self) -> bool:
+        return self.hash is not None
+
+
+@dataclass
+class ScanStats:
+    discovered: int = 0
+    checked: int = 0
+    files: int = 0
+    changed: int = 0
+    bytes_hashed: int = 0
+    started: float = field(default_factory=time.monotonic)
+    skipped: Dict[str, Dict[str, int]] = field(
+        default_factory=lambda: {r: {"files": 0, "bytes": 0} for r in SKIP_REASONS}
+    )
+    skipped_dirs: int = 0
+
+    def skip(self, reason: str, size: int, files: int = 1) -> None:
+        self.skipped[reason]["files"] += files
+        self.skipped[reason]["bytes"] += size
+
+    def snapshot(self) -> Dict[str, float]:
+        elapsed = max(time.monotonic() - self.started, 1e-6)
+        return {
+            "files": self.files,
+            "changed": self.changed,
+            "elapsed_s": round(elapsed, 3),
+            "files_per_s": round(self.files / elapsed, 1),
+            "mb_per_s": round(self.bytes_hashed / elapsed / (1 << 20), 2),
+        }
+
+    def skipped_report(self) -> Dict[str, object]:
+        """Files and bytes excluded per reason.
+
+        ``ignored`` includes everything below pruned directories, which is
+        sized with a stat-only pass; ``ignored_dirs`` counts the pruned roots.
+        """
+        return {
+            **{reason: dict(v) for reason, v in self.skipped.items()},
+            "ignored_dirs": self.skipped_dirs,
+            "bytes": sum(v["bytes"] for v in self.skipped.values()),
+        }
+
+
+@dataclass
+class _Listing:
+    subdirs: List[str]
+    files: List[str]
+    rules: IgnoreRules
+    ignored_files: int = 0
+    ignored_bytes: int = 0
+    ignored_dirs: int = 0
+
+
+def tree_size(path: Path | str) -> Tuple[int, int]:
+    """(files, bytes) below ``path`` from directory entries only; symlinks are not followed."""
+    files = size = 0
+    stack = [str(path)]
+    while stack:
+        try:
+            with os.scandir(stack.pop()) as it:
+                for entry in it:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            stack.append(entry.path)
+                        elif entry.is_file(follow_symlinks=False):
+                            files += 1
+                            size += entry.stat(follow_symlinks=False).st_size
+                    except OSError:
+                        continue
+        except OSError:
+            continue
+    return files, size
+
+
+def hash_file(path: Path | str, chunk_size: int = 1 << 20) -> str:
+    """SHA-256 of a file read in fixed-size chunks."""
+    digest = hashlib.sha256()
+    buf = bytearray(chunk_size)
+    view = memoryview(buf)
+    with open(path, "rb", buffering=0) as f:
+        while True:
+            n = f.readinto(buf)
+            if not n:
+                break
+            digest.update(view[:n])
+    return digest.hexdigest()
+
+
+class TreeScanner:
+    """Walk, stat and hash a directory tree on a bounded thread pool.
+
+    Directory listings and per-file stat/hash jobs are both executed on the
+    pool; at most ``workers * 4`` jobs are in flight so memory stays flat on
+    very large trees. Results are yielded as soon as each job completes.
+
+    Ignored directories (see :class:`IgnoreRules`) are pruned before they are
+    listed and only sized for the skipped report; binary and oversized files
+    are stat'ed but never hashed.
+    """
+
+    def __init__(
+        self,
+        root: Path | str,
+        workers: Optional[int] = None,
+        chunk_size: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+    ) -> None:
+        self.root = Path(root)
+        self.workers = workers or settings.INDEX_SCAN_WORKERS
+        self.chunk_size = chunk_size or settings.INDEX_HASH_CHUNK_SIZE
+        self.max_bytes = max_bytes or settings.INDEX_MAX_FILE_BYTES
+        self.stats = ScanStats()
+
+    def _list_dir(self, rel_dir: str, parent_rules: IgnoreRules) -> _Listing:
+        rules = parent_rules.descend(rel_dir)
+        listing = _Listing([], [], rules)
+        try:
+            with os.scandir(self.root / rel_dir) as it:
+                for entry in it:
+                    rel = os.path.join(rel_dir, entry.name) if rel_dir else entry.name
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            if rules.ignored(rel, True):
+                                listing.ignored_dirs += 1
+                                files, size = tree_size(entry.path)
+                                listing.ignored_files += files
+                                listing.ignored_bytes += size
+                            else:
+                                listing.subdirs.append(rel)
+                        elif entry.is_file():
+                            if rules.ignored(rel, False):
+                                listing.ignored_files += 1
+                                listing.ignored_bytes += entry.stat().st_size
+                            else:
+                                listing.files.append(rel)
+                    except OSError:
+                        continue
+        except OSError:
+            pass
+        return listing
+
+    def check_file(
+        self, rel: str, known: Optional[Tuple[int, float]] = None, hash_files: bool = True
+    ) -> Optional[ScannedFile]:
+        """Stat ``rel`` and hash it unless it matches ``known`` or is filtered out.
+
+        Returns ``None`` if the file vanished.
+        """
+        path = self.root / rel
+        try:
+            st = path.stat()
+        except OSError:  # vanished between listing and stat
+            return None
+        item = ScannedFile(path=path, rel=rel, size=st.st_size, mtime=st.st_mtime)
+        if st.st_size > self.max_bytes:
+            item.skipped = "too_large"
+            return item
+        if known is not None and known == (st.st_size, st.st_mtime):
+            return item
+        if is_binary(path):
+            item.skipped = "binary"
+            return item
+        if not hash_files:
+            return item
+        try:
+            item.hash = hash_file(path, self.chunk_size)
+        except OSError:
+            return None
+        return item
+
+    async def scan(
+        self,
+        known: Optional[Dict[str, Tuple[int, float]]] = None,
+        start: str = "",
+        rules: Optional[IgnoreRules] = None,
+        hash_files: bool = True,
+    ) -> AsyncIterator[ScannedFile]:
+        """Yield every indexable file below ``start``, hashing those not matching ``known``.
+
+        ``rules`` are the ignore rules of ``start``'s parent directory; they
+        default to the configured project-wide rules. Without ``hash_files``
+        nothing is hashed; the same files are yielded as with it.
+        """
+
+        known = known or {}
+        rules = rules or IgnoreRules.defaults(self.root)
+        loop = asyncio.get_running_loop()
+        backlog: Deque[Tuple[str, str, IgnoreRules]] = deque([("dir", start, rules)])
+        pending: Dict[asyncio.Future, str] = {}
+        max_inflight = self.workers * 4
+
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="scan") as pool:
+            while backlog or pending:
+                while backlog and len(pending) < max_inflight:
+                    kind, rel, dir_rules = backlog.popleft()
+                    if kind == "dir":
+                        fut = loop.run_in_executor(pool, self._list_dir, rel, dir_rules)
+                    else:
+                        fut = loop.run_in_executor(
+                            pool, self.check_file, rel, known.get(rel), hash_files
+                        )
+                    pending[fut] = kind
+
+                done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for fut in done:
+                    kind = pending.pop(fut)
+                    if kind == "dir":
+                        listing = fut.result()
+                        self.stats.discovered += len(listing.files)
+                        self.stats.skipped_dirs += listing.ignored_dirs
+                        if listing.ignored_files:
+                            self.stats.skip("ignored", listing.ignored_bytes, listing.ignored_files)
+                        # files first keeps hashing busy while the walk fans out
+                        backlog.extend(("file", f, listing.rules) for f in listing.files)
+                        backlog.extend(("dir", d, listing.rules) for d in listing.subdirs)
+                        continue
+                    item = fut.result()
+                    if item is None:
+                        continue
+                    self.stats.checked += 1
+                    if item.skipped:
+                        self.stats.skip(item.skipped, item.size)
+                        continue
+                    self.stats.files += 1
+                    if item.changed:
+                        self.stats.changed += 1
+                        self.stats.bytes_hashed += item.size
+                    yield item
@@ -0,0 +1,283 @@
+import difflib
+import re
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+from sqlmodel import func, select
+
+from ..db import async_session
+from ..models import Symbol
+
+LANGUAGES = {
+    "py": "python",
+    "pyi": "python",
+    "ts": "typescript",
+    "tsx": "typescript",
+    "mts": "typescript",
+    "js": "javascript",
+    "jsx": "javascript",
+    "mjs": "javascript",
+    "go": "go",
+    "rs": "rust",
+}
+
+# files larger than this are indexed but not parsed for symbols
+MAX_SYMBOL_FILE_BYTES = 2 << 20
+
+
+def detect_lang(path: str | Path) -> Optional[str]:
+    """Language name for a path, falling back to its bare suffix."""
+    suffix = Path(path).suffix.lstrip(".").lower()
+    return LANGUAGES.get(suffix, suffix or None)
+
+
+def normalize_lang(lang: str) -> str:
+    """Accept either a suffix (``py``) or a language name (``python``)."""
+    return LANGUAGES.get(lang.lower(), lang.lower())
+
+
+def lang_aliases(lang: str) -> Set[str]:
+    """Every stored ``lang`` value meaning the same language as ``lang``.
+
+    Rows indexed before language detection store the bare suffix.
+    """
+    name = normalize_lang(lang)
+    return {name, *(suffix for suffix, n in LANGUAGES.items() if n == name)}
+
+
+@dataclass
+class SymbolDef:
+    name: str
+    kind: str
+    line: int
+    column: int
+    container: Optional[str] = None
+
+
+def _indent(line: str) -> int:
+    return len(line) - len(line.lstrip(" \t"))
+
+
+class _Scopes:
+    """Indentation-based stack of enclosing definitions.
+
+    ``current`` returns the innermost enclosing name and whether it is a
+    type-like container (class/impl/trait) rather than a function body.
+    """
+
+    def __init__(self) -> None:
+        self._stack: List[Tuple[int, str, bool]] = []
+
+    def enter(self, indent: int, name: str, is_type: bool) -> None:
+        self._stack.append((indent, name, is_type))
+
+    def current(self, indent: int) -> Tuple[Optional[str], bool]:
+        while self._stack and self._stack[-1][0] >= indent:
+            self._stack.pop()
+        if not self._stack:
+            return None, False
+        return self._stack[-1][1], self._stack[-1][2]
+
+
+_PY_DEF = re.compile(r"^[ \t]*(?:async[ \t]+)?(def|class)[ \t]+([A-Za-z_]\w*)")
+
+
+def _python(lines: List[str]) -> List[SymbolDef]:
+    out: List[SymbolDef] = []
+    scopes = _Scopes()
+    for n, line in enumerate(lines, start=1):
+        m = _PY_DEF.match(line)
+        if not m:
+            continue
+        indent = _indent(line)
+        container, in_type = scopes.current(indent)
+        keyword, name = m.groups()
+        if keyword == "class":
+            out.append(SymbolDef(name, "class", n, m.start(2) + 1, container))
+        else:
+            kind = "method" if in_type else "function"
+            out.append(SymbolDef(name, kind, n, m.start(2) + 1, container))
+        scopes.enter(indent, name, keyword == "class")
+    return out
+
+
+_TS_PATTERNS = [
+    (re.compile(r"^\s*(?:export\s+)?(?:default\s+)?(?:declare\s+)?(?:async\s+)?function\s*\*?\s*([A-Za-z_$][\w$]*)"), "function"),
+    (re.compile(r"^\s*(?:export\s+)?(?:default\s+)?(?:declare\s+)?(?:abstract\s+)?class\s+([A-Za-z_$][\w$]*)"), "class"),
+    (re.compile(r"^\s*(?:export\s+)?(?:declare\s+)?interface\s+([A-Za-z_$][\w$]*)"), "interface"),
+    (re.compile(r"^\s*(?:export\s+)?(?:declare\s+)?type\s+([A-Za-z_$][\w$]*)\s*(?:<[^=]*>)?\s*="), "type"),
+    (re.compile(r"^\s*(?:export\s+)?(?:declare\s+)?(?:const\s+)?enum\s+([A-Za-z_$][\w$]*)"), "enum"),
+    (re.compile(r"^\s*(?:export\s+)?(?:const|let|var)\s+([A-Za-z_$][\w$]*)\s*(?::[^=]+)?=\s*(?:async\s+)?(?:function\b|\([^)]*\)\s*(?::[^=]+)?=>|[A-Za-z_$][\w$]*\s*=>)"), "function"),
+]
+_TS_METHOD = re.compile(
+    r"^\s+(?:(?:public|private|protected|static|readonly|async|override|abstract|get|set)\s+)*\*?\s*([A-Za-z_$#][\w$]*)\s*(?:<[^>]*>)?\s*\([^;]*$"
+)
+_TS_NOT_METHODS = {"if", "for", "while", "switch", "catch", "return", "function", "constructor", "with", "new", "super"}
+
+
+def _typescript(lines: List[str]) -> List[SymbolDef]:
+    out: List[SymbolDef] = []
+    cls: Optional[str] = None
+    depth = 0
+    cls_depth = 0
+    for n, line in enumerate(lines, start=1):
+        matched = False
+        for pattern, kind in _TS_PATTERNS:
+            m = pattern.match(line)
+            if m:
+                out.append(SymbolDef(m.group(1), kind, n, m.start(1) + 1, cls if depth > cls_depth else None))
+                if kind == "class":
+                    cls, cls_depth = m.group(1), depth
+                matched = True
+                break
+        if not matched and cls and depth == cls_depth + 1:
+            m = _TS_METHOD.match(line)
+            if m and m.group(1) not in _TS_NOT_METHODS:
+                out.append(SymbolDef(m.group(1), "method", n, m.start(1) + 1, cls))
+        depth += line.count("{") - line.count("}")
+        if cls and depth <= cls_depth and "}" in line:
+            cls = None
+    return out
+
+
+_GO_FUNC = re.compile(r"^func\s*(?:\(\s*\w*\s*\*?\s*([A-Za-z_]\w*)(?:\[[^\]]*\])?\s*\)\s*)?([A-Za-z_]\w*)")
+_GO_TYPE = re.compile(r"^(?:type\s+|\s+)([A-Za-z_]\w*)(?:\[[^\]]*\])?\s+(struct|interface)\b")
+
+
+def _go(lines: List[str]) -> List[SymbolDef]:
+    out: List[SymbolDef] = []
+    in_type_block = False
+    for n, line in enumerate(lines, start=1):
+        if line.startswith("type ("):
+            in_type_block = True
+            continue
+        if in_type_block and line.startswith(")"):
+            in_type_block = False
+            continue
+        m = _GO_FUNC.match(line)
+        if m:
+            receiver, name = m.groups()
+            kind = "method" if receiver else "function"
+            out.append(SymbolDef(name, kind, n, m.start(2) + 1, receiver))
+            continue
+        if line.startswith("type ") or (in_type_block and line[:1] in " \t"):
+            m = _GO_TYPE.match(line)
+            if m:
+                out.append(SymbolDef(m.group(1), m.group(2), n, m.start(1) + 1))
+    return out
+
+
+_RS_ITEM = re.compile(
+    r"^[ \t]*(?:pub(?:\([^)]*\))?\s+)?(?:(?:async|const|unsafe|extern(?:\s+\"[^\"]*\")?)\s+)*(fn|struct|enum|trait|type|mod)\s+([A-Za-z_]\w*)"
+)
+_RS_IMPL = re.compile(r"^[ \t]*(?:unsafe\s+)?impl\b(?:\s*<[^>]*>)?\s+(?:[\w:<>, ]+\s+for\s+)?([A-Za-z_][\w:]*)")
+
+
+def _rust(lines: List[str]) -> List[SymbolDef]:
+    out: List[SymbolDef] = []
+    scopes = _Scopes()
+    for n, line in enumerate(lines, start=1):
+        indent = _indent(line)
+        m = _RS_IMPL.match(line)
+        if m:
+            scopes.current(indent)
+            scopes.enter(indent, m.group(1).split("::")[-1], True)
+            continue
+        m = _RS_ITEM.match(line)
+        if not m:
+            continue
+        keyword, name = m.groups()
+        container, in_type = scopes.current(indent)
+        if keyword == "fn":
+            kind = "method" if in_type else "function"
+        else:
+            kind = {"type": "type", "mod": "module"}.get(keyword, keyword)
+        out.append(SymbolDef(name, kind, n, m.start(2) + 1, container))
+        if keyword in ("fn", "trait", "mod"):
+            scopes.enter(indent, name, keyword == "trait")
+    return out
+
+
+_EXTRACTORS: Dict[str, Callable[[List[str]], List[SymbolDef]]] = {
+    "python": _python,
+    "typescript": _typescript,
+    "javascript": _typescript,
+    "go": _go,
+    "rust": _rust,
+}
+
+
+def extract_symbols(text: str, lang: Optional[str]) -> List[SymbolDef]:
+    extractor = _EXTRACTORS.get(lang or "")
+    if extractor is None:
+        return []
+    return extractor(text.splitlines())
+
+
+def extract_file_symbols(path: Path | str, lang: Optional[str]) -> List[SymbolDef]:
+    """Read and parse a file; unsupported, oversized or unreadable files yield nothing."""
+    if lang not in _EXTRACTORS:
+        return []
+    try:
+        with open(path, "rb") as f:
+            data = f.read(MAX_SYMBOL_FILE_BYTES + 1)
+    except OSError:
+        return []
+    if len(data) > MAX_SYMBOL_FILE_BYTES:
+        return []
+    return extract_symbols(data.decode("utf-8", errors="replace"), lang)
+
+
+def _subsequence_pattern(q: str) -> str:
+    escaped = [c.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") for c in q.lower()]
+    return "%" + "%".join(escaped) + "%"
+
+
+class SymbolService:
+    async def search(
+        self, project_id: int, q: str, kind: str | None = None, limit: int = 50
+    ) -> List[Dict[str, Any]]:
+        """Prefix matches first, then fuzzy (subsequence) matches ranked by similarity."""
+
+        def _base():
+            stmt = select(Symbol).where(Symbol.project_id == project_id)
+            return stmt.where(Symbol.kind == kind) if kind else stmt
+
+        async with async_session() as session:
+            prefix = (
+                await session.execute(
+                    _base()
+                    .where(Symbol.name.startswith(q, autoescape=True))
+                    .order_by(func.length(Symbol.name), Symbol.name, Symbol.path)
+                    .limit(limit)
+                )
+            ).scalars().all()
+            results = list(prefix)
+            if len(results) < limit:
+                seen = {s.id for s in results}
+                fuzzy = (
+                    await session.execute(
+                        _base()
+                        .where(func.lower(Symbol.name).like(_subsequence_pattern(q), escape="\\"))
+                        .limit(limit * 10)
+                    )
+                ).scalars().all()
+                ql = q.lower()
+                fuzzy = sorted(
+                    (s for s in fuzzy if s.id not in seen),
+                    key=lambda s: (-difflib.SequenceMatcher(None, ql, s.name.lower()).ratio(), s.name),
+                )
+                results += fuzzy[: limit - len(results)]
+
+        return [
+            {
+                "name": s.name,
+                "kind": s.kind,
+                "path": s.path,
+                "line": s.line,
+                "column": s.column,
+                "container": s.container,
+            }
+            for s in results
+        ]
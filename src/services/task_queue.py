@@ -1,10 +1,13 @@
 from celery import Celery
+from kombu import Queue
+from celery.signals import worker_process_init, worker_process_shutdown
 from ..config import settings
 from .index_service import IndexService
 from .diff_service import DiffService
+from .blob_store import blob_store
 from .fs_service import FSService
 from .ws_manager import ws_broadcast
-import asyncio
+from . import worker_runtime
 
 celery_app = Celery(
     "devinx",
@@ -12,56 +15,110 @@ celery_app = Celery(
     backend=settings.CELERY_RESULT_BACKEND,
 )
 
+# Separate lanes so a multi-minute index build never queues ahead of a
+# search or diff; see docs/OPERATIONS.md for the worker layout.
+QUEUE_INTERACTIVE = "interactive"
+QUEUE_INDEX = "bulk-index"
+QUEUE_DAG = "dag"
+
+# Redis priorities: 0 is consumed first, 9 last
+PRIORITY_HIGH = 0
+PRIORITY_DEFAULT = 5
+PRIORITY_LOW = 9
+
+celery_app.conf.update(
+    task_queues=(Queue(QUEUE_INTERACTIVE), Queue(QUEUE_INDEX), Queue(QUEUE_DAG)),
+    task_default_queue=QUEUE_INTERACTIVE,
+    task_routes={
+        "src.services.task_queue.index_task": {"queue": QUEUE_INDEX},
+        "src.services.task_queue.gc_index_segments_task": {"queue": QUEUE_INDEX},
+        "src.services.task_queue.gc_blobs_task": {"queue": QUEUE_INDEX},
+        "index_repo": {"queue": QUEUE_INDEX},
+        "implement_endpoints": {"queue": QUEUE_DAG},
+        "write_tests": {"queue": QUEUE_DAG},
+        "configure_ci": {"queue": QUEUE_DAG},
+    },
+    task_default_priority=PRIORITY_DEFAULT,
+    broker_transport_options={
+        "priority_steps": list(range(10)),
+        "sep": ":",
+        "queue_order_strategy": "priority",
+    },
+    # a busy worker must not hold back tasks another worker could start now
+    worker_prefetch_multiplier=1,
+)
+
+@worker_process_init.connect
+def _start_runtime(**_: object) -> None:
+    worker_runtime.start()
+
+
+@worker_process_shutdown.connect
+def _stop_runtime(**_: object) -> None:
+    worker_runtime.stop()
+
+
 index_service = IndexService()
 diff_service = DiffService()
 fs_service = FSService()
 
-@celery_app.task
-def index_task(project_id: int):
-    loop = asyncio.get_event_loop()
-
-    async def progress(percent: int, path: str) -> None:
+# acks_late + reject_on_worker_lost: a build killed mid-way (e.g. worker
+# restart during a deploy) is redelivered and resumes from its checkpoint; the
+# task id owns the build lease, so the redelivery can take it back at once
+@celery_app.task(bind=True, acks_late=True, reject_on_worker_lost=True)
+def index_task(self, project_id: int):
+    async def progress(percent: int, path: str, stats: dict | None = None) -> None:
         await ws_broadcast(
             {
                 "type": "job.progress",
                 "project_id": project_id,
-                "payload": {"percent": percent, "path": path},
+                "payload": {"percent": percent, "path": path, "throughput": stats or {}},
             }
         )
 
-    return loop.run_until_complete(
-        index_service.build_index(project_id, progress_cb=progress)
+    return worker_runtime.run(
+        index_service.build_index(project_id, progress_cb=progress, lease_id=self.request.id)
     )
 
-@celery_app.task
+@celery_app.task(priority=PRIORITY_LOW)
+def gc_index_segments_task():
+    return worker_runtime.run(index_service.gc_segments())
+
+@celery_app.task(priority=PRIORITY_HIGH)
 def search_task(project_id: int, query: str, lang: str | None = None, path: str | None = None):
-    loop = asyncio.get_event_loop()
-    return loop.run_until_complete(
-        index_service.search_index(project_id, query, lang=lang, path=path)
+    return worker_runtime.run(index_service.search_index(project_id, query, lang=lang, path=path))
+
+# Large arguments and results travel as blob_store refs (see BlobStore.pack),
+# so contents never go through the broker or the result backend.
+@celery_app.task(priority=PRIORITY_HIGH)
+def diff_task(project_id: int, before: str | dict, after: str | dict):
+    hunks = worker_runtime.run(
+        diff_service.compute_diff(blob_store.unpack(before), blob_store.unpack(after))
     )
+    return blob_store.pack(hunks)
 
-@celery_app.task
-def diff_task(project_id: int, before: str, after: str):
-    loop = asyncio.get_event_loop()
-    return loop.run_until_complete(diff_service.compute_diff(before, after))
-
-@celery_app.task
-def file_task(project_id: int, path: str, content: str | None = None):
-    loop = asyncio.get_event_loop()
+@celery_app.task(priority=PRIORITY_HIGH)
+def file_task(project_id: int, path: str, content: str | dict | None = None):
     if content is not None:
-        return loop.run_until_complete(fs_service.write_file(path, content.encode("utf-8")))
+        data = blob_store.unpack(content)
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        return worker_runtime.run(fs_service.write_file(path, data))
     else:
-        data = loop.run_until_complete(fs_service.read_file(path))
-        return data.tobytes().decode("utf-8")
+        return blob_store.pack(worker_runtime.run(fs_service.read_text(path)))
+
+@celery_app.task(priority=PRIORITY_LOW)
+def gc_blobs_task():
+    return blob_store.gc()
 
 
 # Build DAG related tasks
 
 
-@celery_app.task(name="index_repo")
-def index_repo(job_id: int, project_id: int, params: dict | None = None):
+@celery_app.task(name="index_repo", bind=True, acks_late=True, reject_on_worker_lost=True)
+def index_repo(self, job_id: int, project_id: int, params: dict | None = None):
     """Index the repository for a project."""
-    return asyncio.run(index_service.build_index(project_id))
+    return worker_runtime.run(index_service.build_index(project_id, lease_id=self.request.id))
 
 
 @celery_app.task(name="implement_endpoints")
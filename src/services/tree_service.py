@@ -0,0 +1,160 @@
+import asyncio
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import true
+from sqlmodel import select
+
+from ..config import settings
+from ..db import async_session
+from ..models import FileMeta, FileTombstone
+from ..utils import metrics
+from ..utils.cache import LRUCache
+from .ignore_rules import IgnoreRules
+from .index_service import IndexService, decode_cursor, encode_cursor
+from .scanner import TreeScanner
+
+# listings are immutable per (project, generation), so they never need a TTL
+_listings = LRUCache(settings.TREE_CACHE_SIZE, counter=metrics.counter("tree.cache"))
+# walks of unindexed projects, reused by the later pages of a listing
+_walks = LRUCache(
+    settings.TREE_CACHE_SIZE, ttl=settings.TREE_WALK_TTL_S, counter=metrics.counter("tree.walks")
+)
+
+
+def _file(path: str, size: int, mtime: float, file_hash: Optional[str]) -> Dict[str, Any]:
+    return {"path": path, "type": "file", "size": size, "mtime": mtime, "hash": file_hash}
+
+
+def build_tree(
+    rows: List[Tuple[str, int, float, Optional[str]]], prefix: str, depth: Optional[int]
+) -> List[Dict[str, Any]]:
+    """Flatten indexed files below ``prefix`` into path-ordered file and dir entries.
+
+    Directories carry the number and total size of the files below them;
+    with ``depth`` only entries at most that many levels below ``prefix`` are
+    listed.
+    """
+    base = prefix + "/" if prefix else ""
+    dirs: Dict[str, Dict[str, Any]] = {}
+    entries: List[Dict[str, Any]] = []
+    for path, size, mtime, file_hash in rows:
+        parts = path[len(base) :].split("/")
+        for i in range(1, len(parts)):
+            if depth is not None and i > depth:
+                break
+            name = base + "/".join(parts[:i])
+            entry = dirs.get(name)
+            if entry is None:
+                entry = dirs[name] = {"path": name, "type": "dir", "files": 0, "size": 0}
+                entries.append(entry)
+            entry["files"] += 1
+            entry["size"] += size
+        if depth is None or len(parts) <= depth:
+            entries.append(_file(path, size, mtime, file_hash))
+    entries.sort(key=lambda e: e["path"])
+    return entries
+
+
+class TreeService:
+    """Paginated listings of a project's files.
+
+    Once a project is indexed, listings come from ``FileMeta`` and are
+    cached per index generation, so paging through an unchanged tree costs
+    one query. They contain indexable files only: ignored, binary and
+    oversized files are not in ``FileMeta``. With ``since`` only files
+    written or dropped after that generation are returned; clients keep the
+    ``generation`` of their last listing and pass it back. Changes that are
+    committed but not yet merged may be returned twice.
+
+    Before the first merge (generation 0, e.g. without ``indexer_rs``) the
+    project directory is walked instead with the build's ignore rules and
+    filters, without hashes, and ``since`` returns the full listing. A first
+    page always walks again; later pages reuse that walk for up to
+    ``TREE_WALK_TTL_S``.
+    """
+
+    def __init__(self) -> None:
+        self.index = IndexService()
+
+    async def tree(
+        self,
+        project_id: int,
+        path: str = "",
+        depth: Optional[int] = None,
+        limit: int = 1000,
+        cursor: Optional[str] = None,
+        since: Optional[int] = None,
+    ) -> Dict[str, Any]:
+        if since is not None and depth is not None:
+            raise ValueError("depth cannot be combined with since")
+        offset = decode_cursor(cursor)
+        prefix = path.strip("/")
+        generation = await self.index.generation(project_id)
+        key = (project_id, generation, prefix, depth, since)
+        if generation == 0:
+            walk_key = (project_id, prefix, depth)
+            entries = _walks.get(walk_key) if cursor else None
+            if entries is None:
+                entries = build_tree(await self._walk(project_id, prefix), prefix, depth)
+                _walks.set(walk_key, entries)
+        else:
+            entries = _listings.get(key)
+            if entries is None:
+                if since is None:
+                    entries = build_tree(await self._files(project_id, prefix), prefix, depth)
+                else:
+                    entries = await self._changes(project_id, prefix, since)
+                _listings.set(key, entries)
+        page = entries[offset : offset + limit]
+        more = offset + limit < len(entries)
+        return {
+            "generation": generation,
+            "entries": page,
+            "next_cursor": encode_cursor(offset + limit) if more else None,
+        }
+
+    async def _walk(self, project_id: int, prefix: str) -> List[tuple]:
+        """What the first build will index below ``prefix``, unhashed."""
+        if ".." in prefix.split("/"):
+            raise ValueError("path escapes the project")
+        root = self.index.project_root(project_id)
+        if not root.is_dir():
+            return []
+        rules = None
+        if prefix:
+            if not (root / prefix).is_dir():
+                return []
+            loop = asyncio.get_event_loop()
+            ignored, rules = await loop.run_in_executor(None, IgnoreRules.check, root, prefix, True)
+            if ignored:
+                return []
+        scanner = TreeScanner(root)
+        files = [item async for item in scanner.scan(start=prefix, rules=rules, hash_files=False)]
+        return sorted((f.rel, f.size, f.mtime, None) for f in files)
+
+    @staticmethod
+    def _under(column, prefix: str):
+        return column.startswith(prefix + "/", autoescape=True) if prefix else true()
+
+    async def _files(self, project_id: int, prefix: str, since: Optional[int] = None) -> List[tuple]:
+        stmt = select(FileMeta.path, FileMeta.size, FileMeta.mtime, FileMeta.hash).where(
+            FileMeta.project_id == project_id, self._under(FileMeta.path, prefix)
+        )
+        if since is not None:
+            stmt = stmt.where(FileMeta.generation > since)
+        async with async_session() as session:
+            return [tuple(r) for r in (await session.execute(stmt.order_by(FileMeta.path))).all()]
+
+    async def _changes(self, project_id: int, prefix: str, since: int) -> List[Dict[str, Any]]:
+        entries = [_file(*row) for row in await self._files(project_id, prefix, since)]
+        async with async_session() as session:
+            removed = await session.execute(
+                select(FileTombstone.path).where(
+                    FileTombstone.project_id == project_id,
+                    FileTombstone.generation > since,
+                    self._under(FileTombstone.path, prefix),
+                )
+            )
+            entries += [{"path": p, "type": "file", "deleted": True} for p in removed.scalars()]
+        entries.sort(key=lambda e: e["path"])
+        return entries
@@ -0,0 +1,158 @@
+"""Incremental index updates driven by filesystem events.
+
+Run with ``python -m src.services.watcher``. All projects under
+``PROJECTS_ROOT`` are watched with a single recursive watcher; each burst of
+events is coalesced and applied as one :meth:`IndexService.apply_changes`
+batch per project, so no full rescan is needed after a patch lands. Batches
+for a project whose build is running are kept and retried every
+``INDEX_WATCH_MAX_DELAY_MS`` until the build has released its lease.
+"""
+import asyncio
+import os
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import AsyncIterator, Dict, Optional, Set, Tuple
+
+import structlog
+
+from ..config import settings
+from .index_service import IndexService
+
+try:  # pragma: no cover - optional dependency (inotify on Linux)
+    import watchfiles
+except Exception:  # pragma: no cover
+    watchfiles = None
+
+log = structlog.get_logger()
+
+
+class PollingWatcher:
+    """Fallback change source that diffs (size, mtime) snapshots of a tree."""
+
+    def __init__(self, root: Path | str, interval: float = 0.25) -> None:
+        self.root = Path(root)
+        self.interval = interval
+
+    def _snapshot(self) -> Dict[str, Tuple[int, int]]:
+        snap: Dict[str, Tuple[int, int]] = {}
+        for dirpath, dirnames, filenames in os.walk(self.root):
+            for name in filenames:
+                path = os.path.join(dirpath, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                snap[path] = (st.st_size, st.st_mtime_ns)
+        return snap
+
+    async def changes(self, quiet_ms: int, max_delay_ms: int) -> AsyncIterator[Set[str]]:
+        """Yield sets of changed absolute paths.
+
+        A batch is released once a poll finds nothing new (``quiet_ms``) or the
+        oldest pending change is ``max_delay_ms`` old, whichever comes first.
+        """
+        loop = asyncio.get_event_loop()
+        prev = await loop.run_in_executor(None, self._snapshot)
+        pending: Set[str] = set()
+        first_seen = 0.0
+        last_seen = 0.0
+        while True:
+            await asyncio.sleep(self.interval)
+            cur = await loop.run_in_executor(None, self._snapshot)
+            delta = {p for p in prev.keys() | cur.keys() if prev.get(p) != cur.get(p)}
+            prev = cur
+            now = time.monotonic()
+            if delta:
+                if not pending:
+                    first_seen = now
+                pending |= delta
+                last_seen = now
+            if pending and (
+                (now - last_seen) * 1000 >= quiet_ms or (now - first_seen) * 1000 >= max_delay_ms
+            ):
+                yield pending
+                pending = set()
+
+
+class IndexWatcher:
+    def __init__(
+        self,
+        index_service: Optional[IndexService] = None,
+        root: Optional[str | Path] = None,
+        quiet_ms: Optional[int] = None,
+        max_delay_ms: Optional[int] = None,
+    ) -> None:
+        self.index_service = index_service or IndexService()
+        self.root = Path(root or settings.PROJECTS_ROOT)
+        self.quiet_ms = quiet_ms or settings.INDEX_WATCH_QUIET_MS
+        self.max_delay_ms = max_delay_ms or settings.INDEX_WATCH_MAX_DELAY_MS
+        self.deferred: Dict[int, Set[str]] = defaultdict(set)
+
+    async def _changes(self) -> AsyncIterator[Set[str]]:
+        if watchfiles is not None and not settings.INDEX_WATCH_FORCE_POLLING:
+            async for batch in watchfiles.awatch(
+                self.root, step=self.quiet_ms, debounce=self.max_delay_ms
+            ):
+                yield {path for _change, path in batch}
+        else:
+            async for batch in PollingWatcher(self.root).changes(self.quiet_ms, self.max_delay_ms):
+                yield batch
+
+    def group_by_project(self, paths: Set[str]) -> Dict[int, Set[str]]:
+        """Map absolute paths to ``{project_id: {relative paths}}``.
+
+        Anything not below a numeric project directory (e.g. the index dir)
+        is ignored.
+        """
+        grouped: Dict[int, Set[str]] = defaultdict(set)
+        for path in paths:
+            try:
+                rel = Path(path).relative_to(self.root)
+            except ValueError:
+                continue
+            if len(rel.parts) < 2 or not rel.parts[0].isdigit():
+                continue
+            grouped[int(rel.parts[0])].add(str(Path(*rel.parts[1:])))
+        return grouped
+
+    async def apply(self, project_id: int, rels: Set[str]) -> None:
+        """Apply ``rels`` plus anything deferred for the project; defer them all again if a build runs."""
+        rels = rels | self.deferred.pop(project_id, set())
+        started = time.monotonic()
+        try:
+            result = await self.index_service.apply_changes(project_id, rels)
+        except Exception as e:  # pragma: no cover - keep watching
+            log.error("index_watch.failed", project_id=project_id, error=str(e))
+            return
+        if result.get("status") == "in_progress":
+            self.deferred[project_id] |= rels
+            log.info("index_watch.deferred", project_id=project_id, paths=len(rels))
+            return
+        log.info(
+            "index_watch.applied",
+            project_id=project_id,
+            paths=len(rels),
+            elapsed_ms=round((time.monotonic() - started) * 1000, 1),
+            **result,
+        )
+
+    async def _retry_deferred(self) -> None:
+        while True:
+            await asyncio.sleep(self.max_delay_ms / 1000)
+            for project_id in list(self.deferred):
+                await self.apply(project_id, set())
+
+    async def run(self) -> None:
+        log.info("index_watch.start", root=str(self.root), inotify=watchfiles is not None)
+        retry = asyncio.ensure_future(self._retry_deferred())
+        try:
+            async for batch in self._changes():
+                for project_id, rels in self.group_by_project(batch).items():
+                    await self.apply(project_id, rels)
+        finally:
+            retry.cancel()
+
+
+if __name__ == "__main__":  # pragma: no cover - manual entrypoint
+    asyncio.run(IndexWatcher().run())
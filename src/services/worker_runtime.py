@@ -0,0 +1,65 @@
+"""Long-lived asyncio runtime for sync code such as Celery tasks.
+
+Each process gets one event loop running forever on a daemon thread.
+Sync callers hand coroutines to it with :func:`run` instead of creating a
+loop per call (``asyncio.run``), so the shared async DB engine in
+:mod:`src.db` keeps its pooled connections on the loop that opened them.
+Any thread can call :func:`run`; calls from several threads interleave on
+the one loop.
+
+Celery workers start the runtime on ``worker_process_init`` (after the
+fork, dropping pooled connections inherited from the parent) and stop it
+on ``worker_process_shutdown``. Elsewhere it starts on first use.
+"""
+import asyncio
+import os
+import threading
+from typing import Any, Awaitable, Optional
+
+from ..db import engine
+
+_lock = threading.Lock()
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_thread: Optional[threading.Thread] = None
+_pid: Optional[int] = None
+
+
+def start() -> asyncio.AbstractEventLoop:
+    """Start this process's loop thread if it is not running yet and return the loop."""
+    global _loop, _thread, _pid
+    with _lock:
+        if _loop is not None and _pid == os.getpid() and _thread.is_alive():
+            return _loop
+        if _pid is not None and _pid != os.getpid():
+            # forked child: the loop thread did not survive, and connections
+            # belong to the parent; forget them without closing the sockets
+            engine.sync_engine.dispose(close=False)
+        loop = asyncio.new_event_loop()
+        thread = threading.Thread(target=loop.run_forever, name="worker-loop", daemon=True)
+        thread.start()
+        _loop, _thread, _pid = loop, thread, os.getpid()
+        return loop
+
+
+def run(coro: Awaitable[Any], timeout: Optional[float] = None) -> Any:
+    """Run ``coro`` on the process loop and block until it finishes."""
+    loop = start()
+    if threading.current_thread() is _thread:
+        raise RuntimeError("worker_runtime.run() called from the runtime loop itself")
+    return asyncio.run_coroutine_threadsafe(coro, loop).result(timeout)
+
+
+def stop() -> None:
+    """Dispose of pooled connections on the loop, then stop and close it."""
+    global _loop, _thread, _pid
+    with _lock:
+        loop, thread = _loop, _thread
+        if loop is None or _pid != os.getpid():
+            return
+        _loop = _thread = _pid = None
+    try:
+        asyncio.run_coroutine_threadsafe(engine.dispose(), loop).result(10)
+    finally:
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join(10)
+        loop.close()
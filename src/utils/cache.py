@@ -0,0 +1,98 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional, Tuple
+
+from .metrics import HitCounter
+
+_MISSING = object()
+
+
+class LRUCache:
+    """Thread-safe bounded LRU with an optional per-entry TTL.
+
+    Hits and misses are recorded on ``counter`` (pass a named
+    :func:`metrics.counter` to have them show up in ``GET /metrics``).
+
+    With ``weigh`` (e.g. an estimate of an entry's size in bytes) the sum of
+    entry weights is also kept under ``maxweight``; a single entry heavier
+    than that is not cached at all.
+    """
+
+    def __init__(
+        self,
+        maxsize: int,
+        ttl: Optional[float] = None,
+        counter: Optional[HitCounter] = None,
+        maxweight: Optional[int] = None,
+        weigh: Optional[Callable[[Any], int]] = None,
+    ) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.counter = counter or HitCounter()
+        self.maxweight = maxweight
+        self.weigh = weigh
+        self.weight = 0
+        self._lock = threading.Lock()
+        self._data: "OrderedDict[Hashable, Tuple[float, Any, int]]" = OrderedDict()
+
+    def _drop(self, key: Hashable) -> None:
+        entry = self._data.pop(key, None)
+        if entry is not None:
+            self.weight -= entry[2]
+
+    def get(
+        self,
+        key: Hashable,
+        default: Any = None,
+        validate: Optional[Callable[[Any], bool]] = None,
+    ) -> Any:
+        """Return the cached value, dropping it if expired or ``validate`` rejects it."""
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is not _MISSING:
+                expires, value, _ = entry
+                if expires and expires < time.monotonic():
+                    self._drop(key)
+                    self.counter.incr("expired")
+                elif validate is not None and not validate(value):
+                    self._drop(key)
+                    self.counter.incr("stale")
+                else:
+                    self._data.move_to_end(key)
+                    self.counter.hit()
+                    return value
+        self.counter.miss()
+        return default
+
+    def set(self, key: Hashable, value: Any) -> None:
+        expires = time.monotonic() + self.ttl if self.ttl else 0.0
+        weight = self.weigh(value) if self.weigh else 0
+        with self._lock:
+            self._drop(key)
+            if self.maxweight is not None and weight > self.maxweight:
+                self.counter.incr("too_large")
+                return
+            self._data[key] = (expires, value, weight)
+            self.weight += weight
+            while len(self._data) > self.maxsize or (
+                self.maxweight is not None and self.weight > self.maxweight
+            ):
+                _, (_, _, evicted) = self._data.popitem(last=False)
+                self.weight -= evicted
+                self.counter.incr("evictions")
+
+    def pop(self, key: Hashable) -> None:
+        with self._lock:
+            self._drop(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self.weight = 0
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._data
+
+    def __len__(self) -> int:
+        return len(self._data)
@@ -0,0 +1,52 @@
+import threading
+from typing import Dict
+
+
+class HitCounter:
+    """Thread-safe hit/miss counter reported by ``GET /metrics``."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.extra: Dict[str, int] = {}
+
+    def hit(self, n: int = 1) -> None:
+        with self._lock:
+            self.hits += n
+
+    def miss(self, n: int = 1) -> None:
+        with self._lock:
+            self.misses += n
+
+    def incr(self, key: str, n: int = 1) -> None:
+        with self._lock:
+            self.extra[key] = self.extra.get(key, 0) + n
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def snapshot(self) -> Dict[str, float]:
+        with self._lock:
+            data = {"hits": self.hits, "misses": self.misses, **self.extra}
+        data["hit_rate"] = round(self.hit_rate, 4)
+        return data
+
+
+_counters: Dict[str, HitCounter] = {}
+_counters_lock = threading.Lock()
+
+
+def counter(name: str) -> HitCounter:
+    with _counters_lock:
+        if name not in _counters:
+            _counters[name] = HitCounter()
+        return _counters[name]
+
+
+def snapshot() -> Dict[str, Dict[str, float]]:
+    with _counters_lock:
+        items = list(_counters.items())
+    return {name: c.snapshot() for name, c in items}
@@ -0,0 +1,48 @@
+import os
+import time
+
+from src.services.blob_store import BlobStore, is_ref
+
+
+def test_pack_inlines_small_values_and_dedups_large_ones(tmp_path):
+    store = BlobStore(tmp_path, inline_max=16)
+    assert store.pack("short") == "short"
+    assert store.pack(None) is None
+
+    text = "x" * 100
+    ref = store.pack(text)
+    assert is_ref(ref) and ref["kind"] == "text" and ref["size"] == 100
+    hits = store.counter.hits
+    assert store.pack(text) == ref  # content addressed: stored once
+    assert store.counter.hits == hits + 1
+    assert store.unpack(ref) == text
+
+    hunks = [{"lines": ["+" + "y" * 40]}]
+    assert store.unpack(store.pack(hunks)) == hunks
+    assert store.unpack(store.pack(b"\0" * 32)) == b"\0" * 32
+
+
+def test_gc_removes_untouched_blobs(tmp_path):
+    store = BlobStore(tmp_path, inline_max=0, ttl=60)
+    old = store.put(b"old")
+    fresh = store.put(b"fresh")
+    path = tmp_path / old["blob"][:2] / old["blob"]
+    past = time.time() - 120
+    os.utime(path, (past, past))
+    assert store.gc() == 1
+    assert not path.exists()
+    assert store.get(fresh) == b"fresh"
+
+
+def test_diff_task_takes_and_returns_refs(monkeypatch, tmp_path):
+    from src.services import task_queue
+
+    store = BlobStore(tmp_path, inline_max=8)
+    monkeypatch.setattr(task_queue, "blob_store", store)
+    before = store.pack("hello\nworld\n")
+    after = store.pack("hello\nthere\nworld\n")
+    assert is_ref(before) and is_ref(after)
+
+    result = task_queue.diff_task(1, before, after)
+    assert is_ref(result) and result["kind"] == "json"
+    assert store.unpack(result)[0]["lines"] == [" hello", "+there", " world"]
@@ -21,3 +21,121 @@ async def test_diff_endpoint_returns_hunks():
             "lines": [" hello", "+there", " world"],
         }
     ]
+
+
+@pytest.mark.asyncio
+async def test_diff_endpoint_intraline():
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        resp = await ac.post(
+            "/api/projects/1/diff",
+            json={"before": "a b c\n", "after": "a x c\n", "intraline": "word"},
+        )
+        bad = await ac.post("/api/projects/1/diff", json={"before": "", "intraline": "line"})
+    assert resp.json()["hunks"][0]["intraline"] == [
+        {"old": 0, "new": 1, "old_ranges": [[2, 3]], "new_ranges": [[2, 3]]}
+    ]
+    assert bad.status_code == 422
+
+
+def test_revision_diff_streams_files_with_renames(monkeypatch, tmp_path):
+    import json
+    import subprocess
+
+    from fastapi.testclient import TestClient
+
+    monkeypatch.setattr("src.services.index_service.settings.PROJECTS_ROOT", str(tmp_path))
+    repo = tmp_path / "5"
+    repo.mkdir()
+
+    def git(*args):
+        subprocess.run(
+            ["git", "-c", "user.name=t", "-c", "user.email=t@t", *args],
+            cwd=repo, check=True, capture_output=True,
+        )
+
+    git("init", "-q")
+    (repo / "a.txt").write_text("one\ntwo\n")
+    (repo / "old.txt").write_text("".join(f"line {i}\n" for i in range(20)))
+    git("add", "-A")
+    git("commit", "-qm", "base")
+    git("tag", "base")
+    (repo / "a.txt").write_text("one\n2\n")
+    git("mv", "old.txt", "new.txt")
+    git("commit", "-qam", "head")
+    (repo / "a.txt").write_text("uno\n2\n")
+
+    client = TestClient(app)
+    resp = client.get("/api/projects/5/diff/revisions", params={"base": "base", "head": "HEAD"})
+    assert resp.status_code == 200
+    entries = [json.loads(line) for line in resp.text.splitlines()]
+    assert entries[-1] == {"done": True, "count": 2}
+    by_path = {e["path"]: e for e in entries[:-1]}
+    assert by_path["a.txt"]["hunks"][0]["lines"] == [" one", "-two", "+2"]
+    assert by_path["new.txt"] == {
+        "status": "renamed", "path": "new.txt", "old_path": "old.txt", "similarity": 100, "hunks": []
+    }
+
+    resp = client.get("/api/projects/5/diff/revisions", params={"base": "HEAD", "path": "a.txt"})
+    [entry, done] = [json.loads(line) for line in resp.text.splitlines()]
+    assert entry["hunks"][0]["lines"] == ["-one", "+uno", " 2"]
+
+    assert client.get("/api/projects/5/diff/revisions", params={"base": "nope"}).status_code == 400
+    assert client.get("/api/projects/5/diff/revisions", params={"base": "--output=x"}).status_code == 400
+
+    # unreadable working-tree files are reported, not diffed as deletions
+    (tmp_path / "secret.txt").write_text("secret\n")
+    (repo / "a.txt").unlink()
+    (repo / "a.txt").symlink_to(tmp_path / "secret.txt")
+    (repo / "new.txt").unlink()
+    (repo / "new.txt").mkdir()
+    resp = client.get("/api/projects/5/diff/revisions", params={"base": "HEAD"})
+    by_path = {e["path"]: e for e in map(json.loads, resp.text.splitlines()) if "path" in e}
+    assert by_path["a.txt"] == {
+        "status": "type_changed", "path": "a.txt", "error": "Path escapes root directory"
+    }
+    assert by_path["new.txt"]["status"] == "deleted" and by_path["new.txt"]["hunks"]
+
+
+def test_diff_paths_reuse_cached_hunks(monkeypatch, tmp_path):
+    from fastapi.testclient import TestClient
+
+    monkeypatch.setattr("src.services.index_service.settings.PROJECTS_ROOT", str(tmp_path))
+    (tmp_path / "6").mkdir()
+    (tmp_path / "6" / "a.txt").write_text("a\nb\n")
+    (tmp_path / "6" / "b.txt").write_text("a\nc\n")
+    client = TestClient(app)
+    payload = {"before_path": "a.txt", "after_path": "b.txt"}
+    first = client.post("/api/projects/6/diff", json=payload).json()["hunks"]
+    assert first[0]["lines"] == [" a", "-b", "+c"]
+
+    async def no_read(self, path, *args, **kwargs):  # pragma: no cover - must not run
+        raise AssertionError("file read on a cache hit")
+
+    monkeypatch.setattr("src.services.fs_service.FSService.read_text", no_read)
+    assert client.post("/api/projects/6/diff", json=payload).json()["hunks"] == first
+    missing = client.post("/api/projects/6/diff", json={"before_path": "nope.txt"})
+    assert missing.status_code == 404
+
+
+def test_diff_endpoint_ops_format():
+    from fastapi.testclient import TestClient
+
+    client = TestClient(app)
+    resp = client.post(
+        "/api/projects/1/diff",
+        json={"before": "hello\nworld\n", "after": "hello\nthere\nworld\n", "format": "ops"},
+    )
+    assert resp.json()["hunks"] == [
+        {
+            "old_start": 1,
+            "old_lines": 2,
+            "new_start": 1,
+            "new_lines": 3,
+            "ops": [[" ", 1], ["+", 1], [" ", 1]],
+        }
+    ]
+    bad = client.post(
+        "/api/projects/1/diff", json={"before": "a", "format": "ops", "intraline": "word"}
+    )
+    assert bad.status_code == 400
@@ -18,3 +18,98 @@ async def test_compute_diff_known_sample():
         }
     ]
 
+
+
+@pytest.mark.asyncio
+async def test_compute_diff_empty_ranges_and_identical_input(monkeypatch):
+    monkeypatch.setattr("src.services.diff_service.diff_rs", None)
+    service = DiffService()
+    assert await service.compute_diff("a\nb\n", "a\nb\n") == []
+    hunks = await service.compute_diff("a\nb\n", "")
+    assert hunks == [
+        {"old_start": 1, "old_lines": 2, "new_start": 0, "new_lines": 0, "lines": ["-a", "-b"]}
+    ]
+
+
+def _apply(a, hunks):
+    out, pos = [], 0
+    for old_start, old_lines, _, _, lines in hunks:
+        start = old_start - 1 if old_lines else old_start
+        out += a[pos:start]
+        out += [l[1:] for l in lines if l[0] != "-"]
+        pos = start + old_lines
+    return out + a[pos:]
+
+
+@pytest.mark.parametrize("algorithm", ["myers", "patience"])
+def test_native_hunks_reproduce_target(algorithm):
+    import random
+
+    diff_rs = pytest.importorskip("diff_rs")
+    from src.services.diff_service import difflib_hunks, ops_to_lines
+
+    rng = random.Random(7)
+    for _ in range(200):
+        a = [rng.choice("abc") for _ in range(rng.randint(0, 20))]
+        b = [rng.choice("abc") for _ in range(rng.randint(0, 20))]
+        hunks = diff_rs.compute_hunks(a, b, 3, algorithm)
+        assert _apply(a, hunks) == b
+        ops = diff_rs.compute_ops(a, b, 3, algorithm)
+        assert [ops_to_lines(a, b, h[0], h[2], h[4]) for h in ops] == [h[4] for h in hunks]
+        assert _apply(a, difflib_hunks(a, b, 3)) == b
+
+
+@pytest.mark.asyncio
+async def test_intraline_word_and_char_ranges(monkeypatch):
+    service = DiffService()
+    before = "keep\nfoo = bar(1)\nx\n"
+    after = "keep\nfoo = baz(1)\nx\n"
+    [hunk] = await service.compute_diff(before, after, intraline="word")
+    assert hunk["lines"][1:3] == ["-foo = bar(1)", "+foo = baz(1)"]
+    assert hunk["intraline"] == [{"old": 1, "new": 2, "old_ranges": [[6, 9]], "new_ranges": [[6, 9]]}]
+
+    [hunk] = await service.compute_diff(before, after, intraline="char")
+    assert hunk["intraline"][0]["old_ranges"] == [[8, 9]]
+
+    monkeypatch.setattr("src.services.diff_service.settings.DIFF_INTRALINE_MAX_CHARS", 10)
+    [hunk] = await service.compute_diff(before, after, intraline="word")
+    assert hunk["intraline"] == []  # over budget: line-level only
+
+
+@pytest.mark.asyncio
+async def test_diff_cache_reuses_hunks_and_skips_loaders():
+    from src.services import diff_service as mod
+
+    service = DiffService()
+    before, after = "cache\nme\n", "cache\nyou\n"
+    hits = mod._diff_cache.counter.hits
+    first = await service.compute_diff(before, after)
+    assert await service.compute_diff(before, after) is first
+    assert await service.compute_diff(before, after, intraline="char") is not first
+    assert mod._diff_cache.counter.hits == hits + 1
+
+    async def unreachable():  # pragma: no cover - must not run on a hit
+        raise AssertionError("loader called on a cache hit")
+
+    known = mod._sha256(before)
+    assert await service.compute_diff(unreachable, after, before_hash=known) is first
+
+
+@pytest.mark.asyncio
+async def test_compact_ops_expand_to_lines(monkeypatch):
+    from src.services.diff_service import ops_to_lines
+
+    monkeypatch.setattr("src.services.diff_service.diff_rs", None)
+    service = DiffService()
+    before = "".join(f"{i}\n" for i in range(30))
+    after = before.replace("3\n", "three\n").replace("20\n", "")
+    full = await service.compute_diff(before, after)
+    compact = await service.compute_diff(before, after, compact=True)
+    assert compact[0]["ops"] == [(" ", 3), ("-", 1), ("+", 1), (" ", 3)]
+    a, b = before.splitlines(), after.splitlines()
+    for hunk, ref in zip(compact, full):
+        header = {k: v for k, v in hunk.items() if k != "ops"}
+        assert header == {k: v for k, v in ref.items() if k != "lines"}
+        assert ops_to_lines(a, b, hunk["old_start"], hunk["new_start"], hunk["ops"]) == ref["lines"]
+    with pytest.raises(ValueError):
+        await service.compute_diff(before, after, compact=True, intraline="word")
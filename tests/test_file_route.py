@@ -0,0 +1,70 @@
+import hashlib
+
+from fastapi.testclient import TestClient
+
+from src.main import app
+
+
+def test_put_then_get_with_range_and_etag(monkeypatch, tmp_path):
+    monkeypatch.setattr("src.services.index_service.settings.PROJECTS_ROOT", str(tmp_path))
+    client = TestClient(app)
+    body = bytes(range(256)) * 1024
+    digest = hashlib.sha256(body).hexdigest()
+
+    resp = client.put("/api/projects/21/files/src/blob.bin", content=iter([body[:1000], body[1000:]]))
+    assert resp.status_code == 201
+    assert resp.json() == {"project_id": 21, "path": "src/blob.bin", "size": len(body), "hash": digest}
+    assert (tmp_path / "21" / "src" / "blob.bin").read_bytes() == body
+    assert [p.name for p in (tmp_path / "21" / "src").iterdir()] == ["blob.bin"]
+
+    resp = client.get("/api/projects/21/files/src/blob.bin")
+    assert resp.status_code == 200 and resp.content == body
+    assert resp.headers["etag"] == f'"{digest}"'
+
+    resp = client.get("/api/projects/21/files/src/blob.bin", headers={"Range": "bytes=10-19"})
+    assert resp.status_code == 206 and resp.content == body[10:20]
+    assert resp.headers["content-range"] == f"bytes 10-19/{len(body)}"
+    resp = client.get("/api/projects/21/files/src/blob.bin", headers={"Range": "bytes=-5"})
+    assert resp.content == body[-5:]
+    resp = client.get("/api/projects/21/files/src/blob.bin", headers={"Range": f"bytes={len(body)}-"})
+    assert resp.status_code == 416
+
+    resp = client.get("/api/projects/21/files/src/blob.bin", headers={"If-None-Match": f'"{digest}"'})
+    assert resp.status_code == 304
+
+    resp = client.put("/api/projects/21/files/src/blob.bin", content=b"new", headers={"If-Match": '"stale"'})
+    assert resp.status_code == 412
+    resp = client.put("/api/projects/21/files/src/blob.bin", content=b"new", headers={"If-Match": f'"{digest}"'})
+    assert resp.status_code == 200 and resp.json()["size"] == 3
+
+
+def test_file_routes_reject_missing_and_escaping_paths(monkeypatch, tmp_path):
+    monkeypatch.setattr("src.services.index_service.settings.PROJECTS_ROOT", str(tmp_path))
+    client = TestClient(app)
+    assert client.get("/api/projects/22/files/nope.txt").status_code == 404
+    assert client.put("/api/projects/22/files/..%2F23%2Fx.txt", content=b"x").status_code == 403
+
+
+def test_batch_write_route(monkeypatch, tmp_path):
+    monkeypatch.setattr("src.services.index_service.settings.PROJECTS_ROOT", str(tmp_path))
+    client = TestClient(app)
+    resp = client.post(
+        "/api/projects/24/files",
+        json={
+            "files": [
+                {"path": "a.txt", "content": "alpha"},
+                {"path": "bin/b.dat", "content": "AAEC", "encoding": "base64"},
+            ]
+        },
+    )
+    assert resp.status_code == 200
+    assert [w["path"] for w in resp.json()["written"]] == ["a.txt", "bin/b.dat"]
+    assert (tmp_path / "24" / "bin" / "b.dat").read_bytes() == b"\x00\x01\x02"
+
+    resp = client.post(
+        "/api/projects/24/files",
+        json={"files": [{"path": "c.dat", "content": "not base64!", "encoding": "base64"}]},
+    )
+    assert resp.status_code == 422
+    assert resp.json()["detail"]["path"] == "c.dat"
+    assert not (tmp_path / "24" / "c.dat").exists()
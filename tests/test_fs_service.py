@@ -15,3 +15,201 @@ async def test_write_and_read_round_trip(tmp_path):
     assert bytes(data) == content
     assert str(file_path.resolve()) in service.meta
 
+
+
+@pytest.mark.asyncio
+async def test_read_file_returns_buffer_for_any_size(monkeypatch, tmp_path):
+    monkeypatch.setattr("src.services.fs_service.fsops_rs", None)
+    monkeypatch.setattr("src.services.fs_service.MMAP_THRESHOLD", 64)
+    service = FSService(root=tmp_path)
+    (tmp_path / "empty").write_bytes(b"")
+    (tmp_path / "latin1.txt").write_bytes("caf\xe9".encode("latin-1"))
+    (tmp_path / "big.bin").write_bytes(bytes(range(256)) * 4)
+
+    for name, expected in [
+        ("empty", b""),
+        ("latin1.txt", b"caf\xe9"),
+        ("big.bin", bytes(range(256)) * 4),
+    ]:
+        data = await service.read_file(name)
+        assert isinstance(data, memoryview) and data.readonly
+        assert data == expected
+
+    assert await service.read_text("latin1.txt", encoding="latin-1") == "café"
+    with pytest.raises(UnicodeDecodeError):
+        await service.read_text("latin1.txt")
+
+
+@pytest.mark.asyncio
+async def test_write_many_fsyncs_each_directory_once(monkeypatch, tmp_path):
+    from src.services import fs_service
+
+    synced = []
+    real_fsync_dir = fs_service._fsync_dir
+    monkeypatch.setattr(
+        fs_service, "_fsync_dir", lambda path: synced.append(path) or real_fsync_dir(path)
+    )
+    service = FSService(root=tmp_path)
+    files = [(f"pkg/m{i}.py", f"# {i}".encode()) for i in range(20)]
+    files += [("docs/readme.md", b"hi"), ("top.txt", b"top"), ("a/b/c/deep.txt", b"deep")]
+
+    result = await service.write_many(files)
+
+    assert not result.errors and len(result.written) == 23
+    # every new dir's entry is synced in its parent, intermediate ones included
+    expected = [".", "a", "a/b", "a/b/c", "docs", "pkg"]
+    assert sorted(p.relative_to(tmp_path).as_posix() for p in synced) == expected
+    assert result.dir_fsyncs == len(expected)
+    assert (tmp_path / "pkg" / "m7.py").read_bytes() == b"# 7"
+    assert sorted(p.name for p in (tmp_path / "docs").iterdir()) == ["readme.md"]
+
+
+@pytest.mark.asyncio
+async def test_write_many_reports_per_file_errors(tmp_path):
+    service = FSService(root=tmp_path)
+    (tmp_path / "blocker").write_text("a file, not a dir")
+
+    result = await service.write_many([("ok.txt", b"ok"), ("blocker/x.txt", b"x")])
+    assert list(result.written) == ["ok.txt"] and list(result.errors) == ["blocker/x.txt"]
+
+    (tmp_path / "ok.txt").write_text("old")
+    result = await service.write_many(
+        [("ok.txt", b"new"), ("blocker/x.txt", b"x")], transactional=True
+    )
+    assert result.rolled_back and not result.written
+    assert (tmp_path / "ok.txt").read_text() == "old"
+
+
+@pytest.mark.asyncio
+async def test_write_many_transaction_rolls_back_renames(monkeypatch, tmp_path):
+    import os
+
+    service = FSService(root=tmp_path)
+    (tmp_path / "keep.txt").write_text("old")
+    real_replace = os.replace
+    calls = []
+
+    def flaky_replace(src, dst):
+        calls.append(dst)
+        if str(dst).endswith("new.txt"):
+            raise OSError("disk full")
+        return real_replace(src, dst)
+
+    monkeypatch.setattr("src.services.fs_service.os.replace", flaky_replace)
+    result = await service.write_many(
+        [("keep.txt", b"replaced"), ("new.txt", b"x")], transactional=True
+    )
+
+    assert result.rolled_back and result.errors == {"new.txt": "disk full"}
+    assert (tmp_path / "keep.txt").read_text() == "old"
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["keep.txt"]
+
+
+@pytest.mark.asyncio
+async def test_write_file_is_atomic_on_failure(monkeypatch, tmp_path):
+    import hashlib
+
+    monkeypatch.setattr("src.services.fs_service.fsops_rs", None)
+    service = FSService(root=tmp_path)
+    meta = await service.write_file("data.bin", b"\xff\x00binary")
+    assert meta.hash == hashlib.sha256(b"\xff\x00binary").hexdigest()
+
+    def failing_replace(src, dst):
+        raise OSError("rename failed")
+
+    monkeypatch.setattr("src.services.fs_service.os.replace", failing_replace)
+    with pytest.raises(OSError):
+        await service.write_file("data.bin", b"new")
+    assert (tmp_path / "data.bin").read_bytes() == b"\xff\x00binary"
+    assert [p.name for p in tmp_path.iterdir()] == ["data.bin"]
+
+
+@pytest.mark.asyncio
+async def test_content_cache_shared_and_validated(monkeypatch, tmp_path):
+    import os
+
+    from src.services import fs_service
+
+    monkeypatch.setattr("src.services.fs_service.fsops_rs", None)
+    path = tmp_path / "contract.json"
+    path.write_text('{"v": 1}')
+    stats = fs_service._content_cache.counter
+
+    assert bytes(await FSService(root=tmp_path).read_file("contract.json")) == b'{"v": 1}'
+    hits = stats.hits
+    opened = []
+    real_open = open
+    with monkeypatch.context() as m:
+        m.setattr("builtins.open", lambda *a, **k: opened.append(a) or real_open(*a, **k))
+        assert bytes(await FSService(root=tmp_path).read_file("contract.json")) == b'{"v": 1}'
+    assert stats.hits == hits + 1 and opened == []  # other instance, no disk read
+
+    path.write_text('{"v": 22}')  # changed behind our back: size differs
+    os.utime(path, ns=(0, 12345))
+    assert bytes(await FSService(root=tmp_path).read_file("contract.json")) == b'{"v": 22}'
+
+    await FSService(root=tmp_path).write_file("contract.json", b"{}")
+    assert bytes(await FSService(root=tmp_path).read_file("contract.json")) == b"{}"
+    assert str(path.resolve()) in FSService(root=tmp_path).meta
+
+
+def test_lru_cache_is_bounded():
+    from src.utils.cache import LRUCache
+
+    cache = LRUCache(maxsize=3)
+    for i in range(10):
+        cache.set(i, i)
+    assert len(cache) == 3 and cache.counter.snapshot()["evictions"] == 7
+    assert cache.get(9, validate=lambda v: v != 9) is None
+    assert cache.counter.snapshot()["stale"] == 1 and 9 not in cache
+
+
+def test_safe_path_fast_path_detects_symlink_swaps(tmp_path):
+    from fastapi import HTTPException
+
+    root = tmp_path / "root"
+    outside = tmp_path / "outside"
+    (root / "a").mkdir(parents=True)
+    outside.mkdir()
+    service = FSService(root=root)
+
+    assert service._safe_path("a/x.txt") == root.resolve() / "a" / "x.txt"
+    assert service._safe_path("a/new/x.txt") == root.resolve() / "a" / "new" / "x.txt"
+
+    (root / "a" / "link").symlink_to(outside / "secret")
+    with pytest.raises(HTTPException):
+        service._safe_path("a/link")
+
+    (root / "a").rename(root / "old")
+    (root / "a").symlink_to(outside, target_is_directory=True)
+    with pytest.raises(HTTPException):
+        service._safe_path("a/x.txt")
+
+    for bad in ("../outside/x", "/etc/passwd", "old/../../outside"):
+        with pytest.raises(HTTPException):
+            service._safe_path(bad)
+
+
+def test_safe_path_rejects_ancestor_replaced_by_symlink(tmp_path):
+    from fastapi import HTTPException
+
+    root = tmp_path / "root"
+    outside = tmp_path / "outside"
+    (root / "a" / "b").mkdir(parents=True)
+    (root / "a" / "b" / "x.txt").write_text("x")
+    outside.mkdir()
+    service = FSService(root=root)
+    assert service._safe_path("a/b/x.txt") == root.resolve() / "a" / "b" / "x.txt"
+
+    # the same directory (and inode) as before, now reached through a symlink
+    (root / "a").rename(outside / "a")
+    (root / "a").symlink_to(outside / "a", target_is_directory=True)
+    assert (root / "a" / "b").stat().st_ino == (outside / "a" / "b").stat().st_ino
+    for path in ("a/b/x.txt", "a/b/new.txt", "a/b"):
+        with pytest.raises(HTTPException):
+            service._safe_path(path)
+
+    # symlinks that stay inside root are still followed
+    (root / "real").mkdir()
+    (root / "inside").symlink_to(root / "real", target_is_directory=True)
+    assert service._safe_path("inside/y.txt") == root.resolve() / "real" / "y.txt"
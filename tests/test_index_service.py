@@ -2,7 +2,7 @@ from pathlib import Path
 
 import pytest
 
-from src.services.index_service import IndexService
+from src.services.index_service import IndexService, encode_cursor
 
 
 @pytest.mark.asyncio
@@ -15,8 +15,12 @@ async def test_incremental_indexing(monkeypatch):
     calls = []
 
     class DummyIndexer:
-        def build_index(self, path: str):  # pragma: no cover - stub
+        def index_file(self, store: str, path: str, file_hash: str):  # pragma: no cover - stub
             calls.append(path)
+            return True
+
+        def build_index(self, index_dir: str, store: str, docs):  # pragma: no cover - stub
+            return []
 
     monkeypatch.setattr(
         "src.services.index_service.indexer_rs", DummyIndexer()
@@ -28,3 +32,649 @@ async def test_incremental_indexing(monkeypatch):
 
     await service.build_index(1)
     assert len(calls) == 1  # unchanged file skipped
+
+
+@pytest.mark.asyncio
+async def test_batched_upsert_and_stale_delete(monkeypatch, tmp_path):
+    from sqlmodel import select
+
+    from src.db import async_session
+    from src.models import FileMeta
+
+    monkeypatch.setattr("src.services.index_service.settings.PROJECTS_ROOT", str(tmp_path))
+    monkeypatch.setattr("src.services.file_meta_store.settings.INDEX_BATCH_SIZE", 2)
+    project_dir = tmp_path / "7"
+    project_dir.mkdir()
+    for name in ("a.py", "b.py", "c.py"):
+        (project_dir / name).write_text(name)
+
+    merged = []
+
+    class DummyIndexer:
+        def index_file(self, store: str, path: str, file_hash: str):  # pragma: no cover - stub
+            return True
+
+        def build_index(self, index_dir: str, store: str, docs):  # pragma: no cover - stub
+            merged.append([d[0] for d in docs])
+            return []
+
+    monkeypatch.setattr("src.services.index_service.indexer_rs", DummyIndexer())
+
+    service = IndexService()
+    result = await service.build_index(7)
+    assert result["indexed"] == 3
+    assert result["commits"] == 2  # batch of two, then the remainder
+
+    (project_dir / "a.py").write_text("changed content")
+    (project_dir / "c.py").unlink()
+    result = await service.build_index(7)
+    assert result == {**result, "indexed": 1, "removed": 1, "commits": 1}
+
+    async with async_session() as session:
+        rows = (
+            await session.execute(select(FileMeta).where(FileMeta.project_id == 7))
+        ).scalars().all()
+    assert {r.path: r.size for r in rows} == {"a.py": len("changed content"), "b.py": 4}
+    assert merged[-1] == ["a.py", "b.py"]
+
+
+@pytest.mark.asyncio
+async def test_search_applies_structured_filters(monkeypatch):
+    from sqlmodel import delete
+
+    from src.db import async_session
+    from src.models import FileMeta
+
+    async def _clear():
+        async with async_session() as session:
+            await session.execute(delete(FileMeta).where(FileMeta.project_id == 8))
+            await session.commit()
+
+    await _clear()
+    try:
+        async with async_session() as session:
+            session.add(FileMeta(project_id=8, path="src/app.py", size=1, mtime=0, hash="a", lang="py"))
+            session.add(FileMeta(project_id=8, path="src/app.ts", size=1, mtime=0, hash="b", lang="ts"))
+            session.add(FileMeta(project_id=8, path="docs/x.py", size=1, mtime=0, hash="c", lang="py"))
+            await session.commit()
+
+        seen = {}
+
+        class DummyIndexer:
+            def search_index(self, index_dir, root, query, paths, limit, after=None):  # pragma: no cover - stub
+                seen.update(query=query, paths=paths)
+                return [(p, 1.5, [(1, "def app", [(4, 7)])]) for p in paths or []]
+
+        monkeypatch.setattr("src.services.index_service.indexer_rs", DummyIndexer())
+
+        page = await IndexService().search_index(8, "app", lang="py", path="src/")
+        assert seen == {"query": "app", "paths": ["src/app.py"]}
+        assert page["hits"] == [
+            {
+                "path": "src/app.py",
+                "score": 1.5,
+                "snippets": [{"line": 1, "text": "def app", "matches": [[4, 7]]}],
+            }
+        ]
+        assert page["next_cursor"] is None
+        assert (await IndexService().search_index(8, "app", lang="go"))["hits"] == []
+    finally:
+        await _clear()
+
+
+@pytest.mark.asyncio
+async def test_search_cursor_pagination(monkeypatch):
+    ranked = [(f"f{i}.py", 10.0 - i // 2, []) for i in range(5)]
+    calls = []
+
+    class DummyIndexer:
+        def search_index(self, index_dir, root, query, paths, limit, after=None):  # pragma: no cover - stub
+            calls.append(after)
+            rest = [r for r in ranked if after is None or (-r[1], r[0]) > (-after[0], after[1])]
+            return rest[:limit]
+
+    monkeypatch.setattr("src.services.index_service.indexer_rs", DummyIndexer())
+    service = IndexService()
+
+    seen, cursor = [], None
+    while True:
+        page = await service.search_index(1, "x", limit=2, cursor=cursor)
+        seen += [h["path"] for h in page["hits"]]
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    assert seen == [r[0] for r in ranked]
+    # each page resumes after the last hit, ties on score broken by path
+    assert calls == [None, (10.0, "f1.py"), (9.0, "f3.py")]
+
+    for bad in ("not-a-cursor", encode_cursor(3)):
+        with pytest.raises(ValueError):
+            await service.search_index(1, "x", cursor=bad)
+
+
+@pytest.mark.asyncio
+async def test_apply_changes_updates_and_removes(monkeypatch, tmp_path):
+    from sqlmodel import select
+
+    from src.db import async_session
+    from src.models import FileMeta
+
+    monkeypatch.setattr("src.services.index_service.settings.PROJECTS_ROOT", str(tmp_path))
+    project_dir = tmp_path / "9"
+    (project_dir / "pkg").mkdir(parents=True)
+    (project_dir / "pkg" / "a.py").write_text("a")
+    (project_dir / "b.py").write_text("b")
+
+    indexed, merges = [], []
+
+    class DummyIndexer:
+        def index_file(self, store: str, path: str, file_hash: str):  # pragma: no cover - stub
+            indexed.append(path)
+            return True
+
+        def build_index(self, index_dir: str, store: str, docs):  # pragma: no cover - stub
+            merges.append(sorted(d[0] for d in docs))
+            return []
+
+    monkeypatch.setattr("src.services.index_service.indexer_rs", DummyIndexer())
+    service = IndexService()
+
+    result = await service.apply_changes(9, ["pkg", "b.py"])
+    assert (result["indexed"], result["removed"]) == (2, 0)
+    assert merges == [["b.py", "pkg/a.py"]]
+
+    (project_dir / "pkg" / "a.py").unlink()
+    (project_dir / "pkg").rmdir()
+    result = await service.apply_changes(9, ["pkg"])
+    assert (result["indexed"], result["removed"]) == (0, 1)
+    assert merges[-1] == ["b.py"]
+
+    # a checkout touching .git and deleting many paths stays within SQL limits
+    (project_dir / ".git" / "objects").mkdir(parents=True)
+    burst = [f".git/objects/{i:04x}" for i in range(300)] + [f"gone/{i}.py" for i in range(1500)]
+    for rel in burst[:300]:
+        (project_dir / rel).write_text("blob")
+    result = await service.apply_changes(9, burst)
+    assert (result["indexed"], result["removed"]) == (0, 0)
+
+    async with async_session() as session:
+        paths = (
+            await session.execute(select(FileMeta.path).where(FileMeta.project_id == 9))
+        ).scalars().all()
+    assert paths == ["b.py"]
+
+
+@pytest.mark.asyncio
+async def test_identical_content_is_tokenized_once(monkeypatch, tmp_path):
+    monkeypatch.setattr("src.services.index_service.settings.PROJECTS_ROOT", str(tmp_path))
+    for project_id in (11, 12):
+        vendor = tmp_path / str(project_id) / "vendor"
+        vendor.mkdir(parents=True)
+        (vendor / "lib.js").write_text("module.exports = 1")
+    (tmp_path / "12" / "own.js").write_text("project specific")
+
+    segments = set()
+    tokenized = []
+    merges = {}
+
+    class DummyIndexer:
+        def index_file(self, store: str, path: str, file_hash: str):  # pragma: no cover - stub
+            if file_hash in segments:
+                return False
+            segments.add(file_hash)
+            tokenized.append(path)
+            return True
+
+        def build_index(self, index_dir: str, store: str, docs):  # pragma: no cover - stub
+            merges.setdefault(index_dir, 0)
+            merges[index_dir] += 1
+            return [p for p, h, _ in docs if h not in segments]
+
+    monkeypatch.setattr("src.services.index_service.indexer_rs", DummyIndexer())
+    service = IndexService()
+
+    first = await service.build_index(11)
+    second = await service.build_index(12)
+    assert first["dedup"]["misses"] == 1
+    assert second["dedup"] == {"hits": 1, "misses": 1, "hit_rate": 0.5}
+    assert len(tokenized) == 2
+
+    # a segment lost to GC is rebuilt on the next merge even if the file is unchanged
+    segments.clear()
+    (tmp_path / "12" / "new.js").write_text("new")
+    await service.build_index(12)
+    assert merges[str(service.index_dir(12))] == 3
+    assert sorted(p.rsplit("/", 1)[-1] for p in tokenized[2:]) == ["lib.js", "new.js", "own.js"]
+
+
+@pytest.mark.asyncio
+async def test_gc_segments_keeps_inflight_temp_files(monkeypatch, tmp_path):
+    import os
+    import time
+
+    monkeypatch.setattr("src.services.index_service.settings.INDEX_DIR", str(tmp_path))
+    service = IndexService()
+    shard = service.segment_store() / "ab"
+    shard.mkdir(parents=True)
+    for name in ("abdead", "abdead.tmp42-0", "abcafe.tmp7-3"):
+        (shard / name).write_bytes(b"")
+    old = time.time() - 2 * 3600
+    os.utime(shard / "abcafe.tmp7-3", (old, old))
+
+    assert await service.gc_segments() == 2
+    assert sorted(p.name for p in shard.iterdir()) == ["abdead.tmp42-0"]
+
+
+@pytest.mark.asyncio
+async def test_ignored_paths_are_not_indexed(monkeypatch, tmp_path):
+    from sqlmodel import select
+
+    from src.db import async_session
+    from src.models import FileMeta
+
+    monkeypatch.setattr("src.services.index_service.settings.PROJECTS_ROOT", str(tmp_path))
+    monkeypatch.setattr("src.services.index_service.settings.INDEX_DIR", str(tmp_path / ".index"))
+    project_dir = tmp_path / "12"
+    (project_dir / "node_modules" / "left-pad").mkdir(parents=True)
+    (project_dir / "node_modules" / "left-pad" / "index.js").write_text("module.exports = 1")
+    (project_dir / "app.js").write_text("require('left-pad')")
+    (project_dir / "logo.png").write_bytes(b"\0" * 10)
+
+    class DummyIndexer:
+        def index_file(self, store, path, file_hash):  # pragma: no cover - stub
+            return True
+
+        def build_index(self, index_dir, store, docs):  # pragma: no cover - stub
+            return []
+
+    monkeypatch.setattr("src.services.index_service.indexer_rs", DummyIndexer())
+    service = IndexService()
+    result = await service.build_index(12)
+    assert result["indexed"] == 1
+    assert result["skipped"]["binary"] == {"files": 1, "bytes": 10}
+    assert service.index_report(12)["skipped"]["ignored_dirs"] == 1
+
+    # watcher deltas inside ignored dirs are dropped, new ignore rules reconcile
+    assert (await service.apply_changes(12, ["node_modules/left-pad/index.js"]))["indexed"] == 0
+    (project_dir / ".gitignore").write_text("*.js\n")
+    result = await service.apply_changes(12, [".gitignore"])
+    assert result["removed"] == 1
+
+    async with async_session() as session:
+        paths = (
+            await session.execute(select(FileMeta.path).where(FileMeta.project_id == 12))
+        ).scalars().all()
+    assert paths == [".gitignore"]
+
+
+@pytest.mark.asyncio
+async def test_search_cache_invalidated_by_generation(monkeypatch, tmp_path):
+    from src.services import index_service as mod
+
+    monkeypatch.setattr("src.services.index_service.settings.PROJECTS_ROOT", str(tmp_path))
+    monkeypatch.setattr("src.services.index_service.settings.INDEX_DIR", str(tmp_path / ".index"))
+    (tmp_path / "13").mkdir()
+    (tmp_path / "13" / "a.py").write_text("alpha")
+    searches = []
+
+    class DummyIndexer:
+        def index_file(self, store, path, file_hash):  # pragma: no cover - stub
+            return True
+
+        def build_index(self, index_dir, store, docs):  # pragma: no cover - stub
+            return []
+
+        def search_index(self, index_dir, root, query, paths, limit, after=None):  # pragma: no cover - stub
+            searches.append(query)
+            return [("a.py", 1.0, [])]
+
+    monkeypatch.setattr("src.services.index_service.indexer_rs", DummyIndexer())
+    service = IndexService()
+    await service.build_index(13)
+    generation = await service.generation(13)
+    hits_before = mod.query_cache.counter.hits
+
+    first = await service.search_index(13, "Alpha  beta")
+    assert await service.search_index(13, "beta alpha") == first  # normalized key
+    assert len(searches) == 1
+    assert mod.query_cache.counter.hits == hits_before + 1
+
+    (tmp_path / "13" / "b.py").write_text("beta")
+    await service.apply_changes(13, ["b.py"])
+    assert await service.generation(13) == generation + 1
+    await service.search_index(13, "alpha beta")
+    assert len(searches) == 2
+
+
+def test_search_cache_key_matches_search_semantics():
+    from src.services.query_cache import cache_key
+    from src.services.symbol_service import lang_aliases
+
+    # the indexer folds ASCII only
+    assert cache_key(1, 1, "Straße") == cache_key(1, 1, "STRAßE")
+    assert cache_key(1, 1, "Ärger") != cache_key(1, 1, "ärger")
+    # every spelling of a language filters on the same stored values
+    assert lang_aliases("py") == lang_aliases("python") == {"py", "pyi", "python"}
+
+
+def test_lru_cache_ttl_and_eviction(monkeypatch):
+    from src.utils.cache import LRUCache
+
+    now = [100.0]
+    monkeypatch.setattr("src.utils.cache.time.monotonic", lambda: now[0])
+    cache = LRUCache(maxsize=2, ttl=10)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)  # evicts least recently used "b"
+    assert cache.get("b") is None and cache.get("c") == 3
+    now[0] += 11
+    assert cache.get("a") is None
+    snap = cache.counter.snapshot()
+    assert snap["hits"] == 2 and snap["evictions"] == 1 and snap["expired"] == 1
+
+
+def test_lru_cache_weight_cap():
+    from src.utils.cache import LRUCache
+
+    cache = LRUCache(maxsize=10, maxweight=10, weigh=len)
+    cache.set("a", "aaaa")
+    cache.set("b", "bbbb")
+    cache.set("c", "cccc")  # 12 > 10: evicts "a"
+    assert "a" not in cache and cache.weight == 8
+    cache.set("big", "x" * 11)  # never fits
+    assert "big" not in cache and cache.counter.snapshot()["too_large"] == 1
+    cache.pop("b")
+    assert cache.weight == 4
+
+
+@pytest.mark.asyncio
+async def test_interrupted_build_resumes_from_checkpoint(monkeypatch, tmp_path):
+    from src.db import async_session
+    from src.models import IndexState
+
+    monkeypatch.setattr("src.services.index_service.settings.PROJECTS_ROOT", str(tmp_path))
+    monkeypatch.setattr("src.services.index_service.settings.INDEX_DIR", str(tmp_path / ".index"))
+    monkeypatch.setattr("src.services.file_meta_store.settings.INDEX_BATCH_SIZE", 2)
+    project_dir = tmp_path / "14"
+    project_dir.mkdir()
+    for name in ("a.py", "b.py", "c.py"):
+        (project_dir / name).write_text(name)
+
+    tokenized, merges = [], []
+
+    class DummyIndexer:
+        crash_after = 2
+
+        def index_file(self, store, path, file_hash):  # pragma: no cover - stub
+            if len(tokenized) == self.crash_after:
+                raise RuntimeError("worker lost")
+            tokenized.append(path)
+            return True
+
+        def build_index(self, index_dir, store, docs):  # pragma: no cover - stub
+            merges.append(len(docs))
+            Path(index_dir).mkdir(parents=True, exist_ok=True)
+            (Path(index_dir) / "postings.bin").write_bytes(b"")
+            return []
+
+    indexer = DummyIndexer()
+    monkeypatch.setattr("src.services.index_service.indexer_rs", indexer)
+    service = IndexService()
+    with pytest.raises(RuntimeError):
+        await service.build_index(14)
+
+    async with async_session() as session:
+        state = await session.get(IndexState, 14)
+    assert (state.status, state.lease_owner, state.checkpoint_batch) == ("running", None, 1)
+    assert state.checkpoint_files == 2 and merges == []
+
+    indexer.crash_after = None
+    result = await service.build_index(14)
+    assert result["indexed"] == 1  # the two committed files are not redone
+    assert result["resumed_from"]["batch"] == 1 and result["resumed_from"]["files"] == 2
+    assert merges == [3]
+
+    result = await service.build_index(14)
+    assert result["resumed_from"] is None and merges == [3]
+
+
+@pytest.mark.asyncio
+async def test_concurrent_builds_are_deduplicated(monkeypatch, tmp_path):
+    import asyncio
+    import threading
+
+    monkeypatch.setattr("src.services.index_service.settings.PROJECTS_ROOT", str(tmp_path))
+    monkeypatch.setattr("src.services.index_service.settings.INDEX_DIR", str(tmp_path / ".index"))
+    (tmp_path / "15").mkdir()
+    (tmp_path / "15" / "a.py").write_text("a")
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    class DummyIndexer:
+        def index_file(self, store, path, file_hash):  # pragma: no cover - stub
+            calls.append(path)
+            started.set()
+            release.wait(5)
+            return True
+
+        def build_index(self, index_dir, store, docs):  # pragma: no cover - stub
+            return []
+
+    monkeypatch.setattr("src.services.index_service.indexer_rs", DummyIndexer())
+    service = IndexService()
+    first = asyncio.ensure_future(service.build_index(15))
+    while not started.is_set():
+        await asyncio.sleep(0.01)
+    second = await service.build_index(15)
+    release.set()
+    assert second["status"] == "in_progress" and second["lease_owner"]
+    assert (await first)["indexed"] == 1
+    assert len(calls) == 1
+    assert "indexed" in await service.build_index(15)  # lease released afterwards
+
+
+@pytest.mark.asyncio
+async def test_redelivered_task_takes_back_its_lease(monkeypatch, tmp_path):
+    from src.db import async_session
+    from src.models import IndexState
+
+    monkeypatch.setattr("src.services.index_service.settings.PROJECTS_ROOT", str(tmp_path))
+    monkeypatch.setattr("src.services.index_service.settings.INDEX_DIR", str(tmp_path / ".index"))
+    monkeypatch.setattr("src.services.file_meta_store.settings.INDEX_BATCH_SIZE", 2)
+    project_dir = tmp_path / "16"
+    project_dir.mkdir()
+    for name in ("a.py", "b.py", "c.py"):
+        (project_dir / name).write_text(name)
+    tokenized = []
+
+    class DummyIndexer:
+        crash_after = 2
+
+        def index_file(self, store, path, file_hash):  # pragma: no cover - stub
+            if len(tokenized) == self.crash_after:
+                raise SystemExit("worker killed")
+            tokenized.append(path)
+            return True
+
+        def build_index(self, index_dir, store, docs):  # pragma: no cover - stub
+            return []
+
+    indexer = DummyIndexer()
+    monkeypatch.setattr("src.services.index_service.indexer_rs", indexer)
+    service = IndexService()
+
+    # a killed process never reaches its finally: the lease stays held
+    async def _never_released(*args):
+        pass
+
+    killed = IndexService()
+    killed._release_lease = _never_released
+    with pytest.raises(SystemExit):
+        await killed.build_index(16, lease_id="task-1")
+    async with async_session() as session:
+        state = await session.get(IndexState, 16)
+    assert (state.status, state.lease_owner) == ("running", "task-1")
+
+    indexer.crash_after = None
+    assert (await service.build_index(16, lease_id="task-2"))["status"] == "in_progress"
+    result = await service.build_index(16, lease_id="task-1")  # the redelivery
+    assert result["indexed"] == 1 and result["resumed_from"]["files"] == 2
+
+
+@pytest.mark.asyncio
+async def test_lease_is_renewed_while_merging(monkeypatch, tmp_path):
+    import asyncio
+    import threading
+
+    monkeypatch.setattr("src.services.index_service.settings.PROJECTS_ROOT", str(tmp_path))
+    monkeypatch.setattr("src.services.index_service.settings.INDEX_DIR", str(tmp_path / ".index"))
+    monkeypatch.setattr("src.services.index_service.settings.INDEX_LEASE_TTL_S", 0.3)
+    (tmp_path / "17").mkdir()
+    (tmp_path / "17" / "a.py").write_text("a")
+    merging, release = threading.Event(), threading.Event()
+
+    class DummyIndexer:
+        def index_file(self, store, path, file_hash):  # pragma: no cover - stub
+            return True
+
+        def build_index(self, index_dir, store, docs):  # pragma: no cover - stub
+            merging.set()
+            release.wait(5)
+            return []
+
+    monkeypatch.setattr("src.services.index_service.indexer_rs", DummyIndexer())
+    service = IndexService()
+    first = asyncio.ensure_future(service.build_index(17, lease_id="task-1"))
+    while not merging.is_set():
+        await asyncio.sleep(0.01)
+    await asyncio.sleep(0.6)  # two TTLs into a merge that commits nothing
+    second = await service.build_index(17, lease_id="task-2")
+    release.set()
+    assert second["status"] == "in_progress"
+    assert "indexed" in await first
+
+
+@pytest.mark.asyncio
+async def test_apply_changes_publishes_delta_overlay(monkeypatch, tmp_path):
+    monkeypatch.setattr("src.services.index_service.settings.PROJECTS_ROOT", str(tmp_path))
+    monkeypatch.setattr("src.services.index_service.settings.INDEX_DIR", str(tmp_path / ".index"))
+    monkeypatch.setattr("src.services.index_service.settings.INDEX_DELTA_MAX_DOCS", 3)
+    project_dir = tmp_path / "18"
+    project_dir.mkdir()
+    (project_dir / "a.py").write_text("a")
+    (project_dir / "b.py").write_text("b")
+    merges, deltas = [], []
+
+    class DummyIndexer:
+        def index_file(self, store, path, file_hash):  # pragma: no cover - stub
+            return True
+
+        def build_index(self, index_dir, store, docs):  # pragma: no cover - stub
+            Path(index_dir).mkdir(parents=True, exist_ok=True)
+            (Path(index_dir) / "postings.bin").write_bytes(b"")
+            merges.append([d[0] for d in docs])
+            return []
+
+        def build_delta(self, index_dir, store, docs, masked):  # pragma: no cover - stub
+            deltas.append(([d[0] for d in docs], masked))
+            return []
+
+    monkeypatch.setattr("src.services.index_service.indexer_rs", DummyIndexer())
+    service = IndexService()
+    await service.build_index(18)
+    assert merges == [["a.py", "b.py"]]
+
+    (project_dir / "a.py").write_text("a2")
+    await service.apply_changes(18, ["a.py"])
+    (project_dir / "b.py").unlink()
+    await service.apply_changes(18, ["b.py"])
+    # the overlay holds every change since the full merge, not only the batch
+    assert deltas == [(["a.py"], ["a.py"]), (["a.py"], ["a.py", "b.py"])]
+    assert len(merges) == 1
+
+    for name in ("c.py", "d.py"):
+        (project_dir / name).write_text(name)
+    await service.apply_changes(18, ["c.py", "d.py"])
+    assert merges[-1] == ["a.py", "c.py", "d.py"] and len(deltas) == 2
+
+    (project_dir / "c.py").write_text("c2")
+    await service.apply_changes(18, ["c.py"])
+    assert deltas[-1] == (["c.py"], ["c.py"])
+
+
+@pytest.mark.asyncio
+async def test_apply_changes_waits_for_running_build(monkeypatch, tmp_path):
+    import asyncio
+    import threading
+
+    monkeypatch.setattr("src.services.index_service.settings.PROJECTS_ROOT", str(tmp_path))
+    monkeypatch.setattr("src.services.index_service.settings.INDEX_DIR", str(tmp_path / ".index"))
+    (tmp_path / "19").mkdir()
+    (tmp_path / "19" / "a.py").write_text("a")
+    merging, release = threading.Event(), threading.Event()
+    merges = []
+
+    class DummyIndexer:
+        def index_file(self, store, path, file_hash):  # pragma: no cover - stub
+            return True
+
+        def build_index(self, index_dir, store, docs):  # pragma: no cover - stub
+            merges.append([d[0] for d in docs])
+            merging.set()
+            release.wait(5)
+            return []
+
+    monkeypatch.setattr("src.services.index_service.indexer_rs", DummyIndexer())
+    service = IndexService()
+    build = asyncio.ensure_future(service.build_index(19, lease_id="task-1"))
+    while not merging.is_set():
+        await asyncio.sleep(0.01)
+    (tmp_path / "19" / "b.py").write_text("b")
+    result = await service.apply_changes(19, ["b.py"])
+    release.set()
+    assert result == {"status": "in_progress", "lease_owner": "task-1"}
+    assert "indexed" in await build
+    assert len(merges) == 1
+
+    result = await service.apply_changes(19, ["b.py"])
+    assert result["indexed"] == 1 and merges[-1] == ["a.py", "b.py"]
+
+
+@pytest.mark.asyncio
+async def test_rows_are_stamped_with_the_published_generation(monkeypatch, tmp_path):
+    from sqlmodel import select
+
+    from src.db import async_session
+    from src.models import FileMeta
+
+    monkeypatch.setattr("src.services.index_service.settings.PROJECTS_ROOT", str(tmp_path))
+    monkeypatch.setattr("src.services.index_service.settings.INDEX_DIR", str(tmp_path / ".index"))
+    (tmp_path / "20").mkdir()
+    (tmp_path / "20" / "a.py").write_text("a")
+
+    class DummyIndexer:
+        def index_file(self, store, path, file_hash):  # pragma: no cover - stub
+            return True
+
+        def build_index(self, index_dir, store, docs):  # pragma: no cover - stub
+            return []
+
+    monkeypatch.setattr("src.services.index_service.indexer_rs", DummyIndexer())
+    service = IndexService()
+    await service.build_index(20)
+    (tmp_path / "20" / "b.py").write_text("b")
+    await service.apply_changes(20, ["b.py"])
+
+    generation = await service.generation(20)
+    async with async_session() as session:
+        stamped = (
+            await session.execute(
+                select(FileMeta.generation).where(FileMeta.project_id == 20, FileMeta.path == "b.py")
+            )
+        ).scalar_one()
+        assert stamped == generation
+        # a merge that lost its lease never publishes a generation twice
+        with pytest.raises(RuntimeError):
+            await service._bump_generation(session, 20, generation)
+    assert await service.generation(20) == generation
@@ -0,0 +1,74 @@
+import hashlib
+
+import pytest
+
+from src.services.scanner import TreeScanner, hash_file
+
+
+def test_hash_file_matches_sha256(tmp_path):
+    data = b"x" * 5000
+    path = tmp_path / "blob.bin"
+    path.write_bytes(data)
+    assert hash_file(path, chunk_size=1024) == hashlib.sha256(data).hexdigest()
+
+
+@pytest.mark.asyncio
+async def test_scan_hashes_only_changed_files(tmp_path):
+    (tmp_path / "a.py").write_text("a")
+    (tmp_path / "pkg").mkdir()
+    (tmp_path / "pkg" / "b.py").write_text("b")
+    st = (tmp_path / "a.py").stat()
+
+    scanner = TreeScanner(tmp_path, workers=2)
+    items = {i.rel: i async for i in scanner.scan({"a.py": (st.st_size, st.st_mtime)})}
+
+    assert set(items) == {"a.py", "pkg/b.py"}
+    assert not items["a.py"].changed
+    assert items["pkg/b.py"].hash == hashlib.sha256(b"b").hexdigest()
+    stats = scanner.stats.snapshot()
+    assert stats["files"] == 2 and stats["changed"] == 1
+
+
+def test_ignore_rules_gitignore_semantics(tmp_path):
+    from src.services.ignore_rules import IgnoreRules
+
+    (tmp_path / ".gitignore").write_text("# build output\n*.log\n/dist/\n!keep.log\ndocs/**/*.tmp\n")
+    (tmp_path / "sub").mkdir()
+    (tmp_path / "sub" / ".devxignore").write_text("generated.py\n")
+    rules = IgnoreRules.defaults(tmp_path).descend("")
+
+    assert rules.ignored("a.log", False) and rules.ignored("x/y/a.log", False)
+    assert not rules.ignored("keep.log", False)
+    assert rules.ignored("dist", True) and not rules.ignored("lib/dist", True)
+    assert rules.ignored("docs/a/b/c.tmp", False) and not rules.ignored("c.tmp", False)
+    assert rules.ignored(".git", True) and rules.ignored("web/node_modules", True)
+    assert not rules.ignored("sub/generated.py", False)
+    assert rules.descend("sub").ignored("sub/generated.py", False)
+    assert IgnoreRules.check(tmp_path, "web/node_modules/x/index.js", False)[0]
+    assert IgnoreRules.check(tmp_path, "sub/generated.py", False)[0]
+    assert not IgnoreRules.check(tmp_path, "sub/real.py", False)[0]
+
+
+@pytest.mark.asyncio
+async def test_scan_skips_ignored_binary_and_large_files(tmp_path):
+    (tmp_path / ".gitignore").write_text("build/\n")
+    (tmp_path / "build").mkdir()
+    (tmp_path / "build" / "out.js").write_text("x" * 100)
+    (tmp_path / "node_modules" / "pkg").mkdir(parents=True)
+    (tmp_path / "node_modules" / "pkg" / "index.js").write_text("x")
+    (tmp_path / "app.log").write_text("log")
+    (tmp_path / "img.png").write_bytes(b"\x89PNG\0\0\0")
+    (tmp_path / "big.txt").write_text("y" * 64)
+    (tmp_path / "main.py").write_text("print(1)")
+
+    (tmp_path / ".devxignore").write_text("*.log\n")
+    scanner = TreeScanner(tmp_path, workers=2, max_bytes=32)
+    items = {i.rel async for i in scanner.scan()}
+
+    assert items == {".gitignore", ".devxignore", "main.py"}
+    report = scanner.stats.skipped_report()
+    # build/ and node_modules/ are pruned but still sized
+    assert report["ignored"] == {"files": 3, "bytes": 104}
+    assert report["binary"] == {"files": 1, "bytes": 7}
+    assert report["too_large"] == {"files": 1, "bytes": 64}
+    assert report["ignored_dirs"] == 2
@@ -1,3 +1,5 @@
+import json
+
 from fastapi.testclient import TestClient
 from src.main import app
 
@@ -6,8 +8,8 @@ def test_search_endpoint(monkeypatch):
     client = TestClient(app)
 
     class DummyIndexer:
-        def search_index(self, query: str):  # pragma: no cover - stub
-            return ["result"]
+        def search_index(self, index_dir, root, query, paths, limit, after=None):  # pragma: no cover - stub
+            return [("src/app.py", 2.0, [(3, f"{query} result", [(0, 4)])])]
 
     monkeypatch.setattr(
         "src.services.index_service.indexer_rs", DummyIndexer()
@@ -18,4 +20,36 @@ def test_search_endpoint(monkeypatch):
     data = response.json()
     assert data["project_id"] == 1
     assert data["query"] == "test"
-    assert data["hits"] == ["result"]
+    assert data["hits"] == [
+        {
+            "path": "src/app.py",
+            "score": 2.0,
+            "snippets": [{"line": 3, "text": "test result", "matches": [[0, 4]]}],
+        }
+    ]
+    assert data["next_cursor"] is None
+
+
+def test_search_endpoint_streams_ndjson(monkeypatch):
+    client = TestClient(app)
+
+    class DummyIndexer:
+        def candidates(self, index_dir, query, paths):  # pragma: no cover - stub
+            return [f"f{i}.py" for i in range(3)]
+
+        def score_docs(self, index_dir, root, query, docs):  # pragma: no cover - stub
+            return [(d, 1.0, []) for d in docs]
+
+    monkeypatch.setattr(
+        "src.services.index_service.indexer_rs", DummyIndexer()
+    )
+
+    response = client.get("/api/projects/1/search", params={"q": "x", "stream": "true", "limit": 2})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert [l["path"] for l in lines[:-1]] == ["f0.py", "f1.py"]
+    assert lines[-1] == {"done": True, "count": 2}
+
+    response = client.get("/api/projects/1/search", params={"q": "x", "stream": "true", "cursor": "abc"})
+    assert response.status_code == 400
@@ -0,0 +1,99 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from src.main import app
+from src.services.index_service import IndexService
+from src.services.symbol_service import extract_symbols
+
+
+def _names(text, lang):
+    return [(s.name, s.kind, s.container) for s in extract_symbols(text, lang)]
+
+
+def test_extract_python():
+    text = "class Foo:\n    def bar(self):\n        def inner():\n            pass\n\nasync def top():\n    pass\n"
+    assert _names(text, "python") == [
+        ("Foo", "class", None),
+        ("bar", "method", "Foo"),
+        ("inner", "function", "bar"),
+        ("top", "function", None),
+    ]
+    assert extract_symbols(text, "python")[1].line == 2
+
+
+def test_extract_typescript():
+    text = (
+        "export class Store<T> {\n"
+        "  constructor() {}\n"
+        "  async load(id: string): Promise<T> {\n"
+        "    if (id) {\n"
+        "      fetch(id);\n"
+        "    }\n"
+        "  }\n"
+        "}\n"
+        "export const make = (a: number) => a;\n"
+        "interface Props { a: string }\n"
+    )
+    assert _names(text, "typescript") == [
+        ("Store", "class", None),
+        ("load", "method", "Store"),
+        ("make", "function", None),
+        ("Props", "interface", None),
+    ]
+
+
+def test_extract_go_and_rust():
+    go = "type Server struct {\n}\nfunc (s *Server) Start() error {\n}\nfunc New() *Server {}\n"
+    assert _names(go, "go") == [
+        ("Server", "struct", None),
+        ("Start", "method", "Server"),
+        ("New", "function", None),
+    ]
+    rs = "pub struct Index {}\nimpl Index {\n    pub fn load() -> Self {}\n}\npub async fn run() {}\n"
+    assert _names(rs, "rust") == [
+        ("Index", "struct", None),
+        ("load", "method", "Index"),
+        ("run", "function", None),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_symbols_indexed_and_searchable(monkeypatch, tmp_path):
+    monkeypatch.setattr("src.services.index_service.settings.PROJECTS_ROOT", str(tmp_path))
+    project_dir = tmp_path / "11"
+    project_dir.mkdir()
+    (project_dir / "app.py").write_text("class UserService:\n    def get_user(self):\n        pass\n")
+    (project_dir / "util.go").write_text("func ParseUserName() {}\n")
+
+    class DummyIndexer:
+        def index_file(self, store, path, file_hash):  # pragma: no cover - stub
+            return True
+
+        def build_index(self, index_dir, store, docs):  # pragma: no cover - stub
+            return []
+
+    monkeypatch.setattr("src.services.index_service.indexer_rs", DummyIndexer())
+    service = IndexService()
+    await service.build_index(11)
+
+    client = TestClient(app)
+    data = client.get("/api/projects/11/symbols", params={"q": "get"}).json()
+    assert data["symbols"][0] == {
+        "name": "get_user",
+        "kind": "method",
+        "path": "app.py",
+        "line": 2,
+        "column": 9,
+        "container": "UserService",
+    }
+    fuzzy = client.get("/api/projects/11/symbols", params={"q": "usrsvc"}).json()["symbols"]
+    assert [s["name"] for s in fuzzy] == ["UserService"]
+    kinds = client.get("/api/projects/11/symbols", params={"q": "Pars", "kind": "function"}).json()
+    assert [s["path"] for s in kinds["symbols"]] == ["util.go"]
+
+    # re-indexing replaces, deleting the file drops its symbols
+    (project_dir / "app.py").write_text("def helper():\n    pass\n")
+    (project_dir / "util.go").unlink()
+    await service.build_index(11)
+    names = {s["name"] for s in client.get("/api/projects/11/symbols", params={"q": "e"}).json()["symbols"]}
+    assert names == {"helper"}
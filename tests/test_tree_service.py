@@ -0,0 +1,144 @@
+import pytest
+
+from src.services.index_service import IndexService
+from src.services.tree_service import TreeService, build_tree
+
+
+class DummyIndexer:
+    def index_file(self, store, path, file_hash):  # pragma: no cover - stub
+        return True
+
+    def build_index(self, index_dir, store, docs):  # pragma: no cover - stub
+        return []
+
+
+def test_build_tree_depth_and_dir_totals():
+    rows = [("a.py", 1, 0.0, "h1"), ("src/b.py", 2, 0.0, "h2"), ("src/pkg/c.py", 4, 0.0, "h3")]
+    full = build_tree(rows, "", None)
+    assert [e["path"] for e in full] == ["a.py", "src", "src/b.py", "src/pkg", "src/pkg/c.py"]
+    assert full[1] == {"path": "src", "type": "dir", "files": 2, "size": 6}
+
+    top = build_tree(rows, "", 1)
+    assert [(e["path"], e["type"]) for e in top] == [("a.py", "file"), ("src", "dir")]
+    assert [e["path"] for e in build_tree(rows[1:], "src", 1)] == ["src/b.py", "src/pkg"]
+
+
+@pytest.mark.asyncio
+async def test_tree_pages_and_changes_since_generation(monkeypatch, tmp_path):
+    monkeypatch.setattr("src.services.index_service.settings.PROJECTS_ROOT", str(tmp_path))
+    monkeypatch.setattr("src.services.index_service.settings.INDEX_DIR", str(tmp_path / ".index"))
+    monkeypatch.setattr("src.services.index_service.indexer_rs", DummyIndexer())
+    root = tmp_path / "21"
+    (root / "src").mkdir(parents=True)
+    for name in ("a.py", "src/b.py", "src/c.py"):
+        (root / name).write_text(name)
+
+    await IndexService().build_index(21)
+    service = TreeService()
+    first = await service.tree(21, limit=2)
+    assert [e["path"] for e in first["entries"]] == ["a.py", "src"]
+    rest = await service.tree(21, limit=2, cursor=first["next_cursor"])
+    assert [e["path"] for e in rest["entries"]] == ["src/b.py", "src/c.py"]
+    assert rest["next_cursor"] is None
+    generation = first["generation"]
+
+    (root / "src" / "b.py").write_text("changed")
+    (root / "src" / "c.py").unlink()
+    await IndexService().apply_changes(21, ["src/b.py", "src/c.py"])
+
+    delta = await service.tree(21, since=generation)
+    assert delta["generation"] == generation + 1
+    assert [(e["path"], e.get("deleted", False)) for e in delta["entries"]] == [
+        ("src/b.py", False),
+        ("src/c.py", True),
+    ]
+    assert (await service.tree(21, since=delta["generation"]))["entries"] == []
+
+    (root / "src" / "c.py").write_text("back")
+    await IndexService().apply_changes(21, ["src/c.py"])
+    delta = await service.tree(21, path="src", since=generation)
+    assert [e.get("deleted", False) for e in delta["entries"]] == [False, False]
+
+    with pytest.raises(ValueError):
+        await service.tree(21, depth=1, since=generation)
+
+
+@pytest.mark.asyncio
+async def test_unindexed_project_tree_is_walked(monkeypatch, tmp_path):
+    monkeypatch.setattr("src.services.index_service.settings.PROJECTS_ROOT", str(tmp_path))
+    monkeypatch.setattr("src.services.index_service.indexer_rs", None)
+    root = tmp_path / "23"
+    (root / "src").mkdir(parents=True)
+    (root / "src" / "a.py").write_text("a")
+    (root / "logo.png").write_bytes(b"\0" * 8)
+    (root / ".git").mkdir()
+    (root / ".git" / "HEAD").write_text("ref")
+    (root / "node_modules" / "m").mkdir(parents=True)
+    (root / "node_modules" / "m" / "i.js").write_text("m")
+    (root / ".gitignore").write_text("*.log\n")
+    (root / "src" / "debug.log").write_text("log")
+
+    service = TreeService()
+    assert await IndexService().build_index(23) == {}  # no native indexer
+    listing = await service.tree(23, limit=2)
+    # only what the first build will index: no ignored, binary or oversized files
+    assert listing["generation"] == 0
+    assert [(e["path"], e.get("size")) for e in listing["entries"]] == [
+        (".gitignore", 6),
+        ("src", 1),
+    ]
+
+    # later pages come from the same walk, a first page walks again
+    (root / "src" / "b.py").write_text("b")
+    page = await service.tree(23, limit=2, cursor=listing["next_cursor"])
+    assert [e["path"] for e in page["entries"]] == ["src/a.py"]
+    assert page["entries"][0]["hash"] is None and page["next_cursor"] is None
+    assert [e["path"] for e in (await service.tree(23, limit=2))["entries"]] == [
+        ".gitignore",
+        "src",
+    ]
+    page = await service.tree(23, limit=2, cursor=listing["next_cursor"])
+    assert [e["path"] for e in page["entries"]] == ["src/a.py", "src/b.py"]
+
+    assert [e["path"] for e in (await service.tree(23, path="src"))["entries"]] == [
+        "src/a.py",
+        "src/b.py",
+    ]
+    assert (await service.tree(23, path="node_modules"))["entries"] == []
+    with pytest.raises(ValueError):
+        await service.tree(23, path="../22")
+    assert (await service.tree(24))["entries"] == []
+
+
+@pytest.mark.asyncio
+async def test_delete_paths_tombstones_in_batches():
+    from sqlmodel import select
+
+    from src.db import async_session
+    from src.models import FileMeta, FileTombstone
+    from src.services.file_meta_store import FileMetaStore
+
+    paths = [f"node_modules/m{i}.js" for i in range(5)]
+    async with async_session() as session:
+        store = FileMetaStore(session, 22, batch_size=2, generation=1)
+        for p in paths:
+            await store.upsert(path=p, size=1, mtime=0.0, hash=p)
+        await store.flush()
+        statements = []
+        execute = session.execute
+
+        async def counting(stmt, *args, **kwargs):
+            statements.append(stmt)
+            return await execute(stmt, *args, **kwargs)
+
+        session.execute = counting
+        store.generation = 2
+        assert await store.delete_paths(paths) == 5
+        await store.flush()
+        assert len(statements) == 3 * 3  # FileMeta, Symbol, tombstones per chunk of 2
+        del session.execute
+        left = (await session.execute(select(FileMeta).where(FileMeta.project_id == 22))).all()
+        stones = (
+            await session.execute(select(FileTombstone.path).where(FileTombstone.project_id == 22))
+        ).scalars().all()
+    assert left == [] and sorted(stones) == paths
@@ -0,0 +1,53 @@
+import asyncio
+
+import pytest
+
+from src.services.watcher import IndexWatcher, PollingWatcher
+
+
+def test_group_by_project_ignores_non_project_paths(tmp_path):
+    watcher = IndexWatcher(root=tmp_path)
+    grouped = watcher.group_by_project(
+        {
+            str(tmp_path / "3" / "src" / "a.py"),
+            str(tmp_path / "3" / "b.py"),
+            str(tmp_path / "4" / "c.py"),
+            str(tmp_path / ".index" / "3" / "postings.bin"),
+            str(tmp_path / "3"),
+        }
+    )
+    assert grouped == {3: {"src/a.py", "b.py"}, 4: {"c.py"}}
+
+
+@pytest.mark.asyncio
+async def test_polling_watcher_coalesces_burst(tmp_path):
+    (tmp_path / "keep.txt").write_text("x")
+    changes = PollingWatcher(tmp_path, interval=0.02).changes(quiet_ms=10, max_delay_ms=1000)
+    first = asyncio.ensure_future(changes.__anext__())
+    await asyncio.sleep(0.05)
+    for i in range(5):
+        (tmp_path / f"f{i}.txt").write_text(str(i))
+    (tmp_path / "keep.txt").unlink()
+
+    batch = await asyncio.wait_for(first, timeout=2)
+    assert batch == {str(tmp_path / f"f{i}.txt") for i in range(5)} | {str(tmp_path / "keep.txt")}
+    await changes.aclose()
+
+
+@pytest.mark.asyncio
+async def test_batches_are_deferred_while_a_build_runs(tmp_path):
+    calls = []
+
+    class DummyIndexService:
+        async def apply_changes(self, project_id, paths):
+            calls.append((project_id, set(paths)))
+            if len(calls) == 1:
+                return {"status": "in_progress", "lease_owner": "task-1"}
+            return {"indexed": len(paths), "removed": 0}
+
+    watcher = IndexWatcher(index_service=DummyIndexService(), root=tmp_path)
+    await watcher.apply(3, {"a.py"})
+    assert watcher.deferred == {3: {"a.py"}}
+    await watcher.apply(3, {"b.py"})
+    assert calls[-1] == (3, {"a.py", "b.py"})
+    assert not watcher.deferred
@@ -0,0 +1,46 @@
+import asyncio
+import threading
+
+import pytest
+
+from src.services import worker_runtime
+
+
+def test_run_reuses_one_loop_across_calls_and_threads():
+    async def current_loop():
+        return asyncio.get_running_loop()
+
+    first = worker_runtime.run(current_loop())
+    assert worker_runtime.run(current_loop()) is first
+
+    seen = []
+    threads = [
+        threading.Thread(target=lambda: seen.append(worker_runtime.run(current_loop())))
+        for _ in range(4)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert seen == [first] * 4
+
+    async def nested():
+        return worker_runtime.run(current_loop())
+
+    with pytest.raises(RuntimeError):
+        worker_runtime.run(nested())
+
+
+def test_tasks_are_routed_to_their_lanes():
+    from src.services import task_queue as tq
+
+    def queue(task):
+        return tq.celery_app.amqp.router.route({}, task.name)["queue"].name
+
+    for task in (tq.search_task, tq.diff_task, tq.file_task):
+        assert queue(task) == tq.QUEUE_INTERACTIVE
+        assert task.priority == tq.PRIORITY_HIGH
+    for task in (tq.index_task, tq.index_repo, tq.gc_index_segments_task, tq.gc_blobs_task):
+        assert queue(task) == tq.QUEUE_INDEX
+    for task in (tq.implement_endpoints, tq.write_tests, tq.configure_ci):
+        assert queue(task) == tq.QUEUE_DAG